@@ -1,691 +1,836 @@
-import sqlite3
-from tkinter import *
-from tkinter import messagebox
-from datetime import date, datetime, timedelta
-
-
-# Connect to the SQLite database
-try:
-    connection = sqlite3.connect("Harsha_Hospital2.db", isolation_level=None)
-    cursor = connection.cursor()
-except sqlite3.Error as e:
-    messagebox.showerror("Database Error", f"An error occurred: {e}")
-
-# Dropping the existing doctor table if it exists
-try:
-    cursor.execute('DROP TABLE IF EXISTS doctor')
-except sqlite3.Error as e:
-    messagebox.showerror("Database Error", f"An error occurred: {e}")
-
-# Creating table for doctor 
-try:
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS doctor (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            gender TEXT,
-            exp INTEGER,
-            specialization TEXT NOT NULL
-        )
-    ''')
-except sqlite3.Error as e:
-    messagebox.showerror("Database Error", f"An error occurred: {e}")
-
-try:
-    cursor.execute('DROP TABLE IF EXISTS appointment')
-except sqlite3.Error as e:
-    messagebox.showerror("Database Error", f"An error occurred: {e}")
-
-# Creating table for appointment
-try:
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS appointment (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            doctor_id INTEGER NOT NULL,
-            time_slot DATETIME NOT NULL,
-            patient_name TEXT,
-            isBooked INTEGER NOT NULL DEFAULT 0,
-            FOREIGN KEY (doctor_id) REFERENCES doctor(id)
-        )
-    ''')
-except sqlite3.Error as e:
-    messagebox.showerror("Database Error", f"An error occurred: {e}")
-
-class Doctor:
-    id_name_dict = {}
-    logged_in_doctor = None
-    def __init__(self, name, specialization, gender, exp):
-        self.name = name
-        self.specialization = specialization
-        self.gender = gender
-        self.exp = exp
-        self.id = self.save_in_db()  # Save in DB after attributes are set
-
-    def save_in_db(self):
-        try:
-            cursor.execute('''INSERT INTO doctor (name, specialization, gender, exp)
-                              VALUES (?, ?, ?, ?)''', (self.name, self.specialization, self.gender, self.exp))
-            id = cursor.lastrowid
-            self.id_name_dict[id] = f"{id} Dr. {self.name}, {self.specialization} "
-            start_date = date.today() 
-            Appointment.define_slots(id, start_date)
-            return id
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"An error occurred: {e}")
-
-class Appointment:
-    @staticmethod
-    def define_slots(doctor_id, start_date):
-        slots = []
-        for i in range(9, 17):
-            for j in [0, 30]:
-                slot_time = datetime.combine(start_date, datetime.min.time()) + timedelta(hours=i, minutes=j)
-                slots.append((doctor_id, slot_time))
-        try:
-            cursor.executemany('INSERT INTO appointment (doctor_id, time_slot, isBooked) VALUES (?, ?, 0)', slots)
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"An error occurred: {e}")
-
-    @staticmethod
-    def book_appointment(patient_name, doctor_id, time_slot):
-        try:
-            cursor.execute("SELECT isBooked FROM appointment WHERE doctor_id = ? AND time_slot = ?", (doctor_id, time_slot))
-            value = cursor.fetchone()
-            if value and value[0] == 0:
-                cursor.execute("UPDATE appointment SET patient_name = ?, isBooked = 1 WHERE doctor_id = ? AND time_slot = ?", (patient_name, doctor_id, time_slot))
-                return cursor.rowcount > 0
-            return False
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"An error occurred: {e}")
-
-    @staticmethod
-    def view_all_appointments(doctor_id):
-        try:
-            cursor.execute("SELECT patient_name, time_slot FROM appointment WHERE doctor_id = ? AND isBooked != 0", (doctor_id,))
-            tuples_list = cursor.fetchall()
-            my_appointments = [f"\t\t\t\t\t\t{datetime.strptime(x[1], '%Y-%m-%d %H:%M:%S').strftime('%Y-%m-%d %H:%M')} \t\t\t  {x[0]}" for x in tuples_list]
-            my_appointments.insert(0, "\t\t\t\t\t\tTIME SLOT \t\t\t PATIENT NAME ")
-            my_appointments.insert(1, "\t\t\t\t\t\t*********** \t\t\t ***********")
-            return my_appointments
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"An error occurred: {e}")
-
-    @staticmethod
-    def view_free_slots(doctor_id):
-        try:
-            cursor.execute("SELECT time_slot FROM appointment WHERE doctor_id = ? AND isBooked == 0", (doctor_id,))
-            free_slots = cursor.fetchall()
-            return [datetime.strptime(slot[0], '%Y-%m-%d %H:%M:%S').strftime('%Y-%m-%d %H:%M') for slot in free_slots]
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"An error occurred: {e}")
-
-class Harsha_Hospital:
-    def __init__(self):
-        self.name = "Harsha Multi Speciality Hospital"
-        self.shortname = "Harsha Hospital"
-        self.address = "Doctors Lane, Nirmal, Telangana"
-        self.owner = self.mainDoctor = "Dr. Prashanth Kokkula"
-
-    @staticmethod
-    def greetings():
-        return "Welcome to Harsha MultiSpeciality Hospital"
-
-    @staticmethod
-    def get_doctors():
-        return Doctor.id_name_dict
-    
-    @staticmethod
-    def get_services():
-        return ["Orthopaedic", "Gynaecology", "General physician"]
-
-class Patient:
-    def __init__(self, name):
-        self.name = name
-
-    def book_appointment(self, doctor_id, time_slot):
-        success = Appointment.book_appointment(self.name, time_slot, doctor_id)
-        if success:
-            return f"Appointment successfully booked at {time_slot} with Dr. {Doctor.id_name_dict[doctor_id]}"
-        else:
-            return "Failed to book appointment. Please try another time slot."
-
-class Admin:
-    def __init__(self, name):
-        self.name = name
-
-    @staticmethod
-    def add_doctor(name, specialization, gender, exp):
-        try:
-            cursor.execute("select name from doctor")
-            existing_doctors = [x[0] for x in cursor.fetchall()]
-            
-            if name in existing_doctors:
-                messagebox.showerror("doctor name exists", "Give different name")
-                return False
-            else:
-                Doctor(name, specialization, gender, exp)
-                return True
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"An error occurred: {e}")
-
-    @staticmethod
-    def delete_doctor(name):
-        try:
-            cursor.execute("DELETE FROM doctor WHERE name = ?", (name,))
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"An error occurred: {e}")
-
-    @staticmethod
-    def view_appointments_of_all_doctors():
-        try:
-            cursor.execute('''SELECT doctor.name AS doctor_name, appointment.patient_name, appointment.time_slot
-                              FROM appointment
-                              JOIN doctor ON appointment.doctor_id = doctor.id
-                              WHERE appointment.isBooked != 0 ORDER BY time_slot''')
-            app_list = cursor.fetchall()
-            output_list = [f"{appointment[2]} \t\t\t {appointment[1]} \t\t\t Dr.{appointment[0]}" for appointment in app_list]
-            output_list.insert(0, "TIME SLOT \t\t\t PATIENT NAME \t\t\t DOCTOR NAME")
-            output_list.insert(1, "*********** \t\t\t *********** \t\t\t ***********")
-            return output_list
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"An error occurred: {e}")
-
-# $$$$$$$$$$$$$$$$$$$   CODE EXECUTION     $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
-
-# Adding doctors
-Admin.add_doctor("Prashanth", "Ortho", "Male", 4)
-Admin.add_doctor("Rahul", "General", "Male", 5)
-Admin.add_doctor("Rani", "Gyno", "Female", 1)
-Admin.add_doctor("Raju", "Dentist", "Male", 2)
-Admin.add_doctor("Laxmi", "Ortho", "Female", 3)
-Admin.add_doctor("Salla Arvind", "neuro_Surgeon", "male",1)
-
-# Creating patients and booking appointments
-
-
-time_format = '%Y-%m-%d %H:%M'
-
-Appointment.book_appointment("Naga", 3, datetime.strptime(str(date.today())+" 10:30", time_format))
-Appointment.book_appointment("Vinesh", 1, datetime.strptime(str(date.today())+" 09:30", time_format))
-Appointment.book_appointment("Rahul", 1, datetime.strptime(str(date.today())+" 11:30", time_format))
-Appointment.book_appointment("Nani", 4, datetime.strptime(str(date.today())+" 12:00", time_format))
-Appointment.book_appointment("Bujji", 2, datetime.strptime(str(date.today())+" 14:00", time_format))
-Appointment.book_appointment("Rishi", 5, datetime.strptime(str(date.today())+" 10:00", time_format))
-
-
-
-
-'''
-        
-
-# Fetch and print doctors from the database
-cursor.execute("SELECT * FROM doctor")
-print(cursor.fetchall())
-
-# Fetch and print all appointments
-hh = Harsha_Hospital()
-print(Harsha_Hospital.get_doctors())
-print(Harsha_Hospital.get_services())
-list_of_all_appointments = Admin.view_appointments_of_all_doctors()
-for appointment in list_of_all_appointments:
-    print(f"At {appointment[2]} patient: {appointment[1]} has an appointment with: {appointment[0]}")
-
-# Print all appointments of a specific doctor
-print(Appointment.view_all_appointments(1))
-
-'''#
-#$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$    front end   $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
-
-
-root = Tk()
-root.geometry("1210x900")
-root.title("Harsha Multi Speciality Hospital")
-root.configure(bg="#F0F8FF")
-
-icon_ico_path = "C:\\Users\\vinesh\\Desktop\\Capstone_project\\Hospital_Icon.ico"
-
-root.iconbitmap(icon_ico_path)
-
-def view_doctors():
-    doctors = "\n".join(list(Harsha_Hospital.get_doctors().values()))
-    messagebox.showinfo("View Available Doctors", doctors)
-
-def view_services():
-    messagebox.showinfo("Available Services", "Orthopaedic\nGynaecology\nGeneral Physician")
-
-menubar = Menu(root)
-
-# Adding menu items
-doctor_menu = Menu(menubar, tearoff=0)
-doctor_menu.add_command(label= "\n".join(list(Harsha_Hospital.get_doctors().values())), command=view_doctors)
-
-service_menu = Menu(menubar, tearoff=0)
-service_menu.add_command(label="Available Services", command=view_services)
-
-# Adding menu items to the menu bar
-menubar.add_cascade(label="Doctors", menu=doctor_menu)
-menubar.add_cascade(label="Services", menu=service_menu)
-
-# Configuring the root window to use the menu bar
-root.config(menu=menubar)
-
-header_frame = Frame(root, bg="#3498db")
-header_frame.pack(pady=5, padx=10,expand=True, fill='x')
-
-Label_pageIntro1 = Label(header_frame, text="Welcome to ", font=("Times New Roman", 20), bg="#3498db", fg="mediumspringgreen")
-Label_pageIntro1.pack()
-
-Label_pageIntro2 = Label(header_frame, text="HARSHA MULTI SPECIALITY HOSPITAL", font=("Times New Roman", 35, "bold"), bg="#3498db", fg="mediumspringgreen")
-Label_pageIntro2.pack(pady=10)
-
-Label_pageIntro3 = Label(header_frame, text="24 X 7 EMERGENCY AVAILABILITY", font=("Times New Roman", 20), bg="#3498db", fg="mediumspringgreen")
-Label_pageIntro3.pack()
-# defining all the available frames 
-
-
-Appointment_Booking_frame = Frame(root,bg="#F0F8FF")
-Doctor_login_page_frame = Frame(root,bg="#F0F8FF")
-Admin_login_page_frame = Frame(root,bg="#F0F8FF")
-doctor_page_frame = Frame(root,bg="#F0F8FF")
-admin_page_frame = Frame(root,bg="#F0F8FF")
-
-# choosing which page to show and hiding other pages
-
-def show_Page(Given_Page):
-    global Home_page_frame,Appointment_Booking_frame,doctor_page_frame,Admin_login_page_frame,Doctor_login_page_frame,admin_page_frame
-    for page in [Home_page_frame,Appointment_Booking_frame,doctor_page_frame,Admin_login_page_frame,Doctor_login_page_frame,admin_page_frame]:
-        page.pack_forget()
-    Given_Page.pack(expand=True, fill='both')
-
-# Preparing Home_page_frame
-
-# Home page frame
-Home_page_frame = Frame(root, bg="#F0F8FF")
-Home_page_frame.pack(pady=5, padx=20)
-
-Label_pageIntro4 = Label(Home_page_frame, text="AVAILABLE SERVICES", font=("Times New Roman", 18, "bold"), fg="#3498db", bg="#F0F8FF")
-Label_pageIntro4.pack(pady=20)
-
-buttonframe = Frame(Home_page_frame, bg="#F0F8FF")
-buttonframe.columnconfigure(0, weight=1)
-buttonframe.columnconfigure(1, weight=1)
-buttonframe.columnconfigure(2, weight=1)
-
-services = ["Orthopaedic", "Gynaecology", "General Physician"]
-for i, service in enumerate(services):
-    label = Label(buttonframe, text=service, font=("Times New Roman", 16, "bold"), padx=15, pady=10, fg="#008000", bg="#F0F8FF")
-    label.grid(row=0, column=i, padx=10, pady=10)
-
-buttonframe.pack()
-
-Book_Appointment_Button = Button(Home_page_frame, text="BOOK YOUR APPOINTMENT", font=("Times New Roman", 18, "bold"), bg="#008080", fg="white", bd=2, relief="raised", padx=20, pady=10, command=lambda: show_Page(Appointment_Booking_frame))
-Book_Appointment_Button.pack(padx=50, pady=40)
-
-Login_as_Admin_button = Button(Home_page_frame, text="Admin Login", font=("Times New Roman", 14, "bold"), fg="white", bg="#2980b9", bd=2, relief="raised", padx=15, pady=8, command=lambda: show_Page(Admin_login_page_frame))
-Login_as_Admin_button.pack(pady=15)
-
-Login_as_Doctor_button = Button(Home_page_frame, text="Doctor Login", font=("Times New Roman", 14, "bold"), fg="white", bg="#2980b9", bd=2, relief="raised", padx=15, pady=8, command=lambda: show_Page(Doctor_login_page_frame))
-Login_as_Doctor_button.pack(pady=15)
-
-
-#preparing appointment page frame 
-#----------------------------------------------------------------------------------------------------
-
-#Appointment_Booking_frame = Frame(root, bg="#F0F8FF")  # Light blue background for the frame
-Appointment_Booking_frame.pack(expand=True, fill='both')  # Make the frame fill the entire window
-
-# Title Label
-Label_AppointmentPage1 = Label(Appointment_Booking_frame, text="Book Appointment", font=("Times New Roman", 23), bg="#F0F8FF", fg="#008080")  # Teal color text
-Label_AppointmentPage1.pack(pady=40)
-
-# Input frame for the form
-text_Input_Frame = Frame(Appointment_Booking_frame, bg="#F0F8FF")
-text_Input_Frame.columnconfigure(0, weight=1)
-text_Input_Frame.columnconfigure(1, weight=1)
-
-# Name entry
-Label_Name = Label(text_Input_Frame, text="Name            :", font=("Times New Roman", 17), bg="#F0F8FF", fg="#006400")  # Dark green color text
-Label_Name.grid(row=0, column=0, padx=10, pady=5, sticky=E)
-Label_TextBox = Entry(text_Input_Frame, width=18, font=('Times New Roman', 16), bd=1, bg="#F0F8FF")
-Label_TextBox.grid(row=0, column=1, padx=10, pady=5)
-
-# Doctor selection
-docter_choosed = StringVar(text_Input_Frame)
-docter_choosed.set("choose the doctor")
-
-Label_SelectDoctor = Label(text_Input_Frame, text="select Doctor    :", font=("Times New Roman", 17), bg="#F0F8FF", fg="#006400")  # Dark green color text
-Label_SelectDoctor.grid(row=1, column=0, padx=10, pady=5, sticky=E)
-Label_DropDown = OptionMenu(text_Input_Frame, docter_choosed, *(list(Harsha_Hospital.get_doctors().values())))
-Label_DropDown.config(width=18, font=("Times New Roman", 15), bg="#F0F8FF" )
-Label_DropDown.grid(row=1, column=1, padx=10, pady=5)
-
-# Mapping doctor names to IDs
-id_of_doctors = {v: k for k, v in Harsha_Hospital.get_doctors().items()}
-
-# Time slot selection
-Choosed_timeslot = StringVar(text_Input_Frame)
-Choosed_timeslot.set("View Free Slots")
-Label_Time_slot = Label(text_Input_Frame, text="select Time Slot :", font=("Times New Roman", 17), bg="#F0F8FF", fg="#006400")  # Dark green color text
-Label_Time_slot.grid(row=2, column=0, padx=10, pady=5, sticky=E)
-
-# Update time slots on doctor selection
-def on_selection_change(*args):
-    selected_value = docter_choosed.get()
-    if selected_value != "choose the doctor":
-        doctor_id = id_of_doctors[selected_value]
-        free_slots = Appointment.view_free_slots(doctor_id)
-        Label_timeSlotDropDown = OptionMenu(text_Input_Frame, Choosed_timeslot, *free_slots)
-        Label_timeSlotDropDown.config(width=18, font=("Times New Roman", 15), bg="#F0F8FF")
-        Label_timeSlotDropDown.grid(row=2, column=1, padx=10, pady=5)
-
-selected_value = docter_choosed.get()
-docter_choosed.trace('w', on_selection_change)
-
-# Pack the input frame
-text_Input_Frame.pack()
-
-def show_confirmation_popup(patient_name, doctor_name, timeslot):
-    messagebox.showinfo("Appointment Confirmation", f"Appointment successfully booked!\n\nName: {patient_name}\nDoctor: {doctor_name}\nTime Slot: {timeslot}")
-    back_to_home_fromAppointment()
-
-def back_to_home_fromAppointment():
-    Label_TextBox.delete(0,END)
-    docter_choosed.set("choose the doctor")
-    show_Page(Home_page_frame)
-
-# Function to book appointment
-def book_appointment2():
-    patient_name = Label_TextBox.get()
-    selected_doctor = docter_choosed.get()
-    selected_timeslot = Choosed_timeslot.get()
-    if patient_name and selected_doctor != "choose the doctor" and selected_timeslot != "View Free Slots":
-        doctor_id = id_of_doctors[selected_doctor]
-        time_slot = datetime.strptime(selected_timeslot, '%Y-%m-%d %H:%M')
-        if Appointment.book_appointment(patient_name, doctor_id, time_slot):
-            connection.commit()
-            show_confirmation_popup(patient_name, selected_doctor, selected_timeslot)
-        else:
-            messagebox.showerror("Booking Failed", "This time slot is already booked.")
-    else:
-        messagebox.showerror("Data required", "Fill all data")
-
-
-# Submit button
-Submit_Appointment_Button = Button(Appointment_Booking_frame, text="BOOK SLOT", font=("Times New Roman", 18), command=book_appointment2, bg="#008080", fg="white")  # Teal background, white text
-Submit_Appointment_Button.pack(pady=40)
-
-Back_Button = Button(Appointment_Booking_frame, text="Go Back", command=back_to_home_fromAppointment, font=("Times New Roman", 18), bg="black", fg="white")  # Black background, white text
-Back_Button.pack(pady=20)
-
-
-# Doctor_login_frame
-
-Doctor_id_passwords = {y: str(x) * 8 for x, y in Doctor.id_name_dict.items()}
-
-Label_Doctor_login_page1 = Label(Doctor_login_page_frame, text="Doctor Login Page", font=("Times New Roman", 23), bg="#F0F8FF", fg="#008080").pack(pady=30)
-
-Doctor_login_Frame = Frame(Doctor_login_page_frame, bg="#F0F8FF")
-
-Doctor_login_Frame.columnconfigure(0, weight=1)
-Doctor_login_Frame.columnconfigure(1, weight=1)
-
-Label_Name = Label(Doctor_login_Frame, text="Select Name       :", font=("Times New Roman", 17), bg="#F0F8FF").grid(row=0, column=0, padx=10, pady=5, sticky=E)
-
-docter_choosed2 = StringVar(Doctor_login_Frame)
-docter_choosed2.set("Select Your User name")
-
-Label_DropDown = OptionMenu(Doctor_login_Frame, docter_choosed2, *(list(Doctor_id_passwords.keys())))
-Label_DropDown.config(width=18, font=("Times New Roman", 15), bg="#F0F8FF" )
-Label_DropDown.grid(row=0, column=1, padx=10, pady=5)
-
-Label_Name = Label(Doctor_login_Frame, text="Enter Password  :", font=("Times New Roman", 17), bg="#F0F8FF").grid(row=1, column=0, padx=10, pady=5, sticky=E)
-Password_Entry = Entry(Doctor_login_Frame, width=18, font=('Times New Roman', 16), bg="#F0F8FF", bd=1, show="*")
-Password_Entry.grid(row=1, column=1, padx=10, pady=15)
-Doctor_login_Frame.pack()
-
-def set_logged_doctor(doctorUsername):
-    Doctor.logged_in_doctor = doctorUsername
-
-
-
-def clear_fields():
-    docter_choosed2.set("Select Your User name")
-    Password_Entry.delete(0, 'end')
-
-# Login function
-def login():
-    username = docter_choosed2.get()
-    password = Password_Entry.get()
-    if username in Doctor_id_passwords and password == Doctor_id_passwords[username]:
-        set_logged_doctor(username)
-        # Show success message (optional)
-        # messagebox.showinfo("Login Successful", "You have successfully logged in.")
-        show_Page(doctor_page_frame)
-        # Clear input fields after successful login
-        clear_fields()
-    else:
-        messagebox.showerror("Login Failed", "Invalid username or password.")
-        # Clear password field on login failure
-        Password_Entry.delete(0, 'end')
-
-# Back button command to clear fields and go back to Home page
-def back_to_home():
-    clear_fields()
-    show_Page(Home_page_frame)
-
-Login_Button = Button(Doctor_login_page_frame, text="Login", font=("Times New Roman", 18), command=login, fg="white", bg="#2980b9")
-Login_Button.pack(pady=20)
-Back_Button = Button(Doctor_login_page_frame, text="Go Back", command=back_to_home, font=("Times New Roman", 18), bg="black", fg="white")
-Back_Button.pack(pady=20)
-
-Doctor_login_page_frame.pack(expand=True, fill='both')
-
-
-
-# preparing admin login frame
-
-Admin_Id_password = {"Admin" : 00000000}
-
-Label_Admin_login_page1 = Label(Admin_login_page_frame,text="Admin Login Page", font=("Times New Roman", 23), bg="#F0F8FF", fg="#008080").pack(pady=10)
-admin_login_Frame = Frame(Admin_login_page_frame,bg="#F0F8FF")
-admin_login_Frame.columnconfigure(0,weight=1)
-admin_login_Frame.columnconfigure(1,weight=1)
-
-def clearAdminLogin_fields():
-    Admin_username.delete(0, 'end')
-    Admin_Password.delete(0, 'end')
-
-def back_to_homeFromAdmin():
-    clearAdminLogin_fields()
-    show_Page(Home_page_frame)
-
-
-def admin_login():
-    username = Admin_username.get()
-    password = Admin_Password.get()
-    if username == "Admin" and password == "00000000":
-        #messagebox.showinfo("Login Successful", "You have successfully logged in.")
-        clearAdminLogin_fields()
-        show_Page(admin_page_frame)
-    else:
-        messagebox.showerror("Login Failed", "Invalid username or password.")
-        clearAdminLogin_fields()
-
-Label(admin_login_Frame,text="Enter User name :", font=("Times New Roman", 17), bg="#F0F8FF").grid(row=0, column=0, padx=10, pady=5, sticky=E)
-Admin_username = Entry(admin_login_Frame,width=18,font=('Times New Roman', 16))
-Admin_username.grid(row=0, column=1, padx=10, pady=15)
-
-Label(admin_login_Frame,text="Enter Password  :", font=("Times New Roman", 17), bg="#F0F8FF").grid(row=1, column=0, padx=10, pady=5, sticky=E)
-Admin_Password = Entry(admin_login_Frame,width=18,font=('Times New Roman', 16),show="*")
-Admin_Password.grid(row=1, column=1, padx=10, pady=15)
-admin_login_Frame.pack()
-Login_Button = Button(Admin_login_page_frame,text="Login",font=("Times New Roman",18),command=admin_login, fg="white", bg="#2980b9").pack(pady=30)
-
-Back_Button = Button(Admin_login_page_frame, text="Go Back", command=back_to_homeFromAdmin,font=("Times New Roman", 18), bg="black", fg="white")
-Back_Button.pack(pady=20)
-
-Admin_login_page_frame.pack(expand=True, fill='both')
-
-
-# prepareing doctor page
-name_id_dict = {x:y for y,x in Doctor.id_name_dict.items()}
-
-def back_to_home_fromDoctor():
-    text_output.config(state=NORMAL)
-    text_output.delete(1.0, END)
-    text_output.config(state=DISABLED)
-    show_Page(Home_page_frame)
-
-def view_Appointments():
-    doctor_id = name_id_dict.get(Doctor.logged_in_doctor)  # Retrieve doctor's ID
-    if doctor_id is not None:
-        appointments = Appointment.view_all_appointments(doctor_id)
-        appointment_text = "\n".join(appointments)  # Concatenate appointments with newline
-
-        # Update the Text widget with the fetched appointments
-        text_output.config(state=NORMAL)  
-        text_output.delete(1.0, END)  
-        text_output.insert(END, appointment_text)  
-        text_output.config(state=DISABLED)  # Disable editing state again (read-only)
-
-# Creating doctor page GUI components
-Label_Doctor_page1 = Label(doctor_page_frame, text="Doctor Page", font=("Times New Roman", 23),bg="#F0F8FF", fg="#008080")
-Label_Doctor_page1.pack()
-
-
-label_result2 = Label(doctor_page_frame, text="Today's Appointments", font=("Times New Roman", 15), bg="#F0F8FF")
-label_result2.pack()
-
-# Creating a scrollbar
-scrollbar = Scrollbar(doctor_page_frame, orient=VERTICAL)
-scrollbar.pack(side=RIGHT, fill=Y)
-
-# Text widget for displaying appointments
-text_output = Text(doctor_page_frame, height=10, width=50, font=("Times New Roman", 12), wrap=WORD, yscrollcommand=scrollbar.set)
-text_output.pack(fill=BOTH, expand=True)
-
-# Configuring the scrollbar to work with the text widget
-scrollbar.config(command=text_output.yview)
-
-# Button to trigger fetching and displaying appointments
-View_Appointments_button = Button(doctor_page_frame, text="View Appointments", font=("Times New Roman", 18), command=view_Appointments, bg="#008080",fg="white")
-View_Appointments_button.pack(pady=20)
-# Back button
-Back_Button = Button(doctor_page_frame, text="Go Back", command=back_to_home_fromDoctor, font=("Times New Roman", 18), bg="black", fg="white")
-Back_Button.pack(side="bottom")
-
-# preparing admin page
-
-
-
-Label_Admin_page1 = Label(admin_page_frame,text="Admin Page", font=("Times New Roman", 23), bg="#F0F8FF", fg="#008080").pack(pady=20)
-
-Admin_choice_Frame = Frame(admin_page_frame,bg="#F0F8FF")
-Admin_choice_Frame.columnconfigure(0,weight=1)
-Admin_choice_Frame.columnconfigure(1,weight=1)
-
-text_Input_Frame2 = Frame(admin_page_frame,bg="#F0F8FF")
-
-text_Input_Frame2.columnconfigure(0,weight=1)
-text_Input_Frame2.columnconfigure(1,weight=1)
-text_Input_Frame2.columnconfigure(2,weight=1)
-
-List_of_options = ["Add Doctor", "Delete Doctor","View Appointments of all doctors"]
-option_Choosed = StringVar(text_Input_Frame2)
-option_Choosed.set("What do you want to do")
-
-Label_SelectOption = Label(Admin_choice_Frame,text="Choice    :", font=("Times New Roman", 17), bg="#F0F8FF").grid(row=0, column=0, padx=10, pady=5, sticky=E)
-Label_DropDown = OptionMenu(Admin_choice_Frame,option_Choosed,*List_of_options)
-Label_DropDown.config(font=("Times New Roman", 15), bg="#F0F8FF"  )
-Label_DropDown.grid(row=0, column=1, padx=10, pady=5)
-
-Admin_choice_Frame.pack()
-admin_page_frame.pack(expand=True, fill="both")
-
-def clear_previous_widgets():
-    for widget in text_Input_Frame2.winfo_children():
-        widget.destroy()
-
-def onSelectionChange(*args):
-    clear_previous_widgets()
-    selected_value = option_Choosed.get()
-    if selected_value == "Add Doctor":
-        def addDoctor(name,specialization,gender,age):
-            if Label_nameEntry.get() and Admin.add_doctor(name,specialization,gender,age):
-                messagebox.showinfo("Doctor Added", f"Doctor successfully added!\n\nName: {name}\nspecialization: {specialization}\ngender: {gender}")
-                show_Page(Home_page_frame)
-            else:
-                messagebox.showinfo("No Docter", f"Give Doctor details")
-
-    
-        Label(text_Input_Frame2,text="Enter doctor name     :", font=("Times New Roman", 17), bg="#F0F8FF").grid(row=1, column=0, padx=10, pady=5, sticky=E)
-        Label(text_Input_Frame2,text="Enter doctor specilization :", font=("Times New Roman", 17), bg="#F0F8FF").grid(row=2, column=0, padx=10, pady=5, sticky=E)
-        Label(text_Input_Frame2,text="Enter doctor Gender     :", font=("Times New Roman", 17), bg="#F0F8FF").grid(row=3, column=0, padx=10, pady=5, sticky=E)
-        Label(text_Input_Frame2,text="Enter doctor experience    :", font=("Times New Roman", 17), bg="#F0F8FF").grid(row=4, column=0, padx=10, pady=5, sticky=E)
-        Label_nameEntry = Entry(text_Input_Frame2,width=18,font=('Times New Roman', 16), bg="#F0F8FF", bd=1)
-        Label_nameEntry.grid(row=1, column=1, padx=10, pady=15)
-        Label_SpecializationEntry = Entry(text_Input_Frame2,width=18,font=('Times New Roman', 16), bd=1, bg="#F0F8FF")
-        Label_SpecializationEntry.grid(row=2, column=1, padx=10, pady=15)
-        Label_GenderEntry = Entry(text_Input_Frame2,width=18,font=('Times New Roman', 16), bd=1, bg="#F0F8FF")
-        Label_GenderEntry.grid(row=3, column=1, padx=10, pady=15)
-        Label_expEntry = Entry(text_Input_Frame2,width=18,font=('Times New Roman', 16), bd=1, bg="#F0F8FF")
-        Label_expEntry.grid(row=4, column=1, padx=10, pady=15)
-        Add_button = Button(text_Input_Frame2,text="Add Doctor",font=("Times New Roman",18), bg="#008080",fg="white",
-                            command= lambda: addDoctor(Label_nameEntry.get(),
-                                                        Label_SpecializationEntry.get(),
-                                                        Label_GenderEntry.get(),
-                                                        Label_expEntry.get()))
-        Add_button.grid(row=5, column=0, padx=10, pady=15,columnspan=4)
-        
-       
-    elif selected_value == "Delete Doctor":
-        def delete_choosed_doctor():
-            messagebox.showinfo("Deletion Stopped", "Impact on exiting appointments\n Hence deletion is not supported")
-        
-        docter_delete = StringVar(text_Input_Frame2)
-        docter_delete.set("choose the doctor")
-        Label_SelectDoctor = Label(text_Input_Frame2,text="select Doctor    :", font=("Times New Roman", 17), bg="#F0F8FF").grid(row=1, column=0, padx=10, pady=5, sticky=E)
-        Label_DropDown = OptionMenu(text_Input_Frame2,docter_delete,*(list(Harsha_Hospital.get_doctors().values())))
-        Label_DropDown.config(width=18,font=("Times New Roman", 15), bg="#F0F8FF" )
-        Label_DropDown.grid(row=1, column=1, padx=10, pady=5)
-        delete_button = Button(text_Input_Frame2,text="delete Doctor",font=("Times New Roman",18), bg="#008080",fg="white",command=delete_choosed_doctor)
-        delete_button.grid(row=5, column=0,columnspan=4, padx=10, pady=15)
-        
-    elif selected_value == "View Appointments of all doctors":
-
-        # Text widget for displaying appointments
-        text_output2 = Text(text_Input_Frame2, height=10, width=80, font=("Times New Roman", 12), wrap=WORD)
-        text_output2.pack(fill=BOTH, expand=True, padx=20, pady=10)  # Adjust padding and packing options for appearance
-
-        # Function to fetch and display appointments
-        def view_Appointments2():
-            appointments = Admin.view_appointments_of_all_doctors()
-            appointment_text = "\n".join(appointments)  # Concatenate appointments with newline
-
-            # Updating the Text widget with the fetched appointments
-            text_output2.config(state=NORMAL)  
-            text_output2.delete(1.0, END)  
-            text_output2.insert(END, appointment_text)  
-            text_output2.config(state=DISABLED)  # Disable editing state again (read-only)
-
-        # Button to trigger fetching and displaying appointments
-        View_Appointments_button = Button(text_Input_Frame2, text="View Appointments", font=("Times New Roman", 18), command=view_Appointments2, bg="#008080",fg="white")
-        View_Appointments_button.pack(pady=20)
-        
-
-    else:
-        pass
-
-    
-
-option_Choosed.trace('w', onSelectionChange)
-show_Page(Home_page_frame)
-Back_Button = Button(admin_page_frame, text="Go Back", command=lambda :show_Page(Home_page_frame),font=("Times New Roman", 18), bg="black", fg="white")
-Back_Button.pack(pady = 30,side="bottom")
-
-
-text_Input_Frame2.pack()
-
-root.mainloop()
-# Close the connection
-connection.close()
+import time
+startup_began = time.perf_counter()
+
+import sqlite3
+from tkinter import *
+from tkinter import messagebox
+from datetime import date, datetime, timedelta
+
+from hospital_core import Admin, Appointment, BookingResult, CancelResult, Doctor, Harsha_Hospital
+from hospital_core import availability_index, branches, db, doctor_directory, formatting, metrics, seed_demo_data
+from hospital_core import patient_search
+from hospital_core.archive import archive_past_days
+from hospital_core.timeslots import format_slot
+from hospital_core.worker import BackgroundWorker
+from virtual_list import VirtualList
+
+
+# Open (and if needed create or upgrade) the database of this branch
+# (HARSHA_BRANCH, see hospital_core/branches.py), add the demo data on first
+# run and load the stored doctors. Moving past days to the archive and
+# building the free-slot index wait until the window is up (see the end of
+# the file). Latency metrics are written to HARSHA_METRICS_FILE, if set,
+# while the window is open.
+metrics.start_dump()
+try:
+    branches.use_configured_branch()
+    seed_demo_data()
+    doctor_directory.all()
+except (sqlite3.Error, ValueError) as e:
+    messagebox.showerror("Database Error", f"An error occurred: {e}")
+startup_database_done = time.perf_counter()
+
+#$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$    front end   $$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$
+
+
+
+root = Tk()
+root.geometry("1210x900")
+# Title and banner show the name of this process's branch
+hospital = Harsha_Hospital()
+root.title(hospital.name)
+root.configure(bg="#F0F8FF")
+
+icon_ico_path = "C:\\Users\\vinesh\\Desktop\\Capstone_project\\Hospital_Icon.ico"
+
+root.iconbitmap(icon_ico_path)
+
+# Button handlers never query SQLite themselves: the calls run on a
+# background worker and their results come back to the Tk thread through
+# this polling loop, so a slow disk or a locked database cannot freeze the
+# window.
+db_worker = BackgroundWorker()
+busy_counts = {}
+
+def poll_db_worker():
+    try:
+        db_worker.process_results()
+    finally:
+        root.after(50, poll_db_worker)
+
+def set_busy(busy_label, change):
+    busy_counts[busy_label] = busy_counts.get(busy_label, 0) + change
+    busy_label.config(text="Please wait..." if busy_counts[busy_label] else "")
+
+def run_in_background(busy_label, function, *args, on_done=None, on_error=None):
+    # Runs function(*args) on the worker, showing busy_label until it is done
+    set_busy(busy_label, +1)
+    def finished(result):
+        set_busy(busy_label, -1)
+        if on_done is not None:
+            on_done(result)
+    def failed(e):
+        set_busy(busy_label, -1)
+        messagebox.showerror("Database Error", f"An error occurred: {e}")
+        if on_error is not None:
+            on_error()
+    db_worker.submit(function, *args, on_done=finished, on_error=failed)
+
+def view_doctors():
+    doctors = "\n".join(list(Harsha_Hospital.get_doctors().values()))
+    messagebox.showinfo("View Available Doctors", doctors)
+
+def view_services():
+    messagebox.showinfo("Available Services", "\n".join(Harsha_Hospital.get_services()))
+
+menubar = Menu(root)
+
+# Adding menu items
+doctor_menu = Menu(menubar, tearoff=0)
+doctor_menu.add_command(label= "\n".join(list(Harsha_Hospital.get_doctors().values())), command=view_doctors)
+
+service_menu = Menu(menubar, tearoff=0)
+service_menu.add_command(label="Available Services", command=view_services)
+
+# Adding menu items to the menu bar
+menubar.add_cascade(label="Doctors", menu=doctor_menu)
+menubar.add_cascade(label="Services", menu=service_menu)
+
+# Configuring the root window to use the menu bar
+root.config(menu=menubar)
+
+header_frame = Frame(root, bg="#3498db")
+header_frame.pack(pady=5, padx=10,expand=True, fill='x')
+
+Label_pageIntro1 = Label(header_frame, text="Welcome to ", font=("Times New Roman", 20), bg="#3498db", fg="mediumspringgreen")
+Label_pageIntro1.pack()
+
+Label_pageIntro2 = Label(header_frame, text=hospital.name.upper(), font=("Times New Roman", 35, "bold"), bg="#3498db", fg="mediumspringgreen")
+Label_pageIntro2.pack(pady=10)
+
+Label_pageIntro3 = Label(header_frame, text="24 X 7 EMERGENCY AVAILABILITY", font=("Times New Roman", 20), bg="#3498db", fg="mediumspringgreen")
+Label_pageIntro3.pack()
+# defining all the available frames 
+
+
+Appointment_Booking_frame = Frame(root,bg="#F0F8FF")
+Doctor_login_page_frame = Frame(root,bg="#F0F8FF")
+Admin_login_page_frame = Frame(root,bg="#F0F8FF")
+doctor_page_frame = Frame(root,bg="#F0F8FF")
+admin_page_frame = Frame(root,bg="#F0F8FF")
+
+# Pages other than the home page are built the first time they are shown,
+# by the build_* function registered for them in page_builders below.
+# Showing a page also brings the doctor lists on every built page up to
+# date, so a doctor added or removed since the last visit shows up there.
+
+def show_Page(Given_Page):
+    builder = page_builders.pop(Given_Page, None)
+    if builder is not None:
+        with metrics.operation("ui.build_page"):
+            builder()
+    refresh_data_bound_widgets()
+    for page in [Home_page_frame,Appointment_Booking_frame,doctor_page_frame,Admin_login_page_frame,Doctor_login_page_frame,admin_page_frame]:
+        page.pack_forget()
+    Given_Page.pack(expand=True, fill='both')
+
+# Dropdowns whose choices come from the doctor directory:
+# [(option menu, its variable, function returning the choices)]. The
+# directory is reloaded after a doctor is added or leaves; each page shown
+# has the worker load it and refill these if it changed.
+data_bound_menus = []
+shown_directory_version = None
+
+def set_menu_options(option_menu, variable, values):
+    # Replaces the choices of an OptionMenu without recreating it
+    menu = option_menu["menu"]
+    menu.delete(0, END)
+    for value in values:
+        menu.add_command(label=value, command=lambda value=value: variable.set(value))
+
+def bind_menu(option_menu, variable, choices):
+    data_bound_menus.append((option_menu, variable, choices))
+
+# Menus built for one admin option are destroyed when another is picked
+def unbind_destroyed_menus():
+    data_bound_menus[:] = [entry for entry in data_bound_menus if entry[0].winfo_exists()]
+
+def refresh_data_bound_widgets():
+    unbind_destroyed_menus()
+    choice_functions = {choices for _, _, choices in data_bound_menus} | {doctor_labels, Harsha_Hospital.get_services}
+    db_worker.submit(load_menu_choices, choice_functions, on_done=fill_data_bound_widgets,
+                     on_error=show_database_error)
+
+# Runs on the worker. The version is read before the choices, so a reload
+# in between only makes the next refresh fill the menus again.
+def load_menu_choices(choice_functions):
+    doctor_directory.all()
+    version = doctor_directory.version
+    return version, {choices: choices() for choices in choice_functions}
+
+def fill_data_bound_widgets(loaded):
+    global shown_directory_version
+    version, values = loaded
+    if version == shown_directory_version:
+        return
+    shown_directory_version = version
+    unbind_destroyed_menus()
+    for option_menu, variable, choices in data_bound_menus:
+        if choices in values:  # else bound after the load, from a fresh directory
+            set_menu_options(option_menu, variable, values[choices])
+    doctor_menu.entryconfig(0, label="\n".join(values[doctor_labels]))
+    show_services(values[Harsha_Hospital.get_services])
+
+def doctor_labels():
+    return list(Harsha_Hospital.get_doctors().values())
+
+# Preparing Home_page_frame
+
+# Home page frame
+Home_page_frame = Frame(root, bg="#F0F8FF")
+Home_page_frame.pack(pady=5, padx=20)
+
+Label_pageIntro4 = Label(Home_page_frame, text="AVAILABLE SERVICES", font=("Times New Roman", 18, "bold"), fg="#3498db", bg="#F0F8FF")
+Label_pageIntro4.pack(pady=20)
+
+buttonframe = Frame(Home_page_frame, bg="#F0F8FF")
+buttonframe.columnconfigure(0, weight=1)
+buttonframe.columnconfigure(1, weight=1)
+buttonframe.columnconfigure(2, weight=1)
+
+def show_services(services):
+    for widget in buttonframe.winfo_children():
+        widget.destroy()
+    for i, service in enumerate(services):
+        label = Label(buttonframe, text=service, font=("Times New Roman", 16, "bold"), padx=15, pady=10, fg="#008000", bg="#F0F8FF")
+        label.grid(row=i // 3, column=i % 3, padx=10, pady=10)
+
+buttonframe.pack()
+
+Book_Appointment_Button = Button(Home_page_frame, text="BOOK YOUR APPOINTMENT", font=("Times New Roman", 18, "bold"), bg="#008080", fg="white", bd=2, relief="raised", padx=20, pady=10, command=lambda: show_Page(Appointment_Booking_frame))
+Book_Appointment_Button.pack(padx=50, pady=40)
+
+Login_as_Admin_button = Button(Home_page_frame, text="Admin Login", font=("Times New Roman", 14, "bold"), fg="white", bg="#2980b9", bd=2, relief="raised", padx=15, pady=8, command=lambda: show_Page(Admin_login_page_frame))
+Login_as_Admin_button.pack(pady=15)
+
+Login_as_Doctor_button = Button(Home_page_frame, text="Doctor Login", font=("Times New Roman", 14, "bold"), fg="white", bg="#2980b9", bd=2, relief="raised", padx=15, pady=8, command=lambda: show_Page(Doctor_login_page_frame))
+Login_as_Doctor_button.pack(pady=15)
+
+
+#preparing appointment page frame 
+
+def build_booking_page():
+    #----------------------------------------------------------------------------------------------------
+
+
+    # Title Label
+    Label_AppointmentPage1 = Label(Appointment_Booking_frame, text="Book Appointment", font=("Times New Roman", 23), bg="#F0F8FF", fg="#008080")  # Teal color text
+    Label_AppointmentPage1.pack(pady=40)
+
+    # Input frame for the form
+    text_Input_Frame = Frame(Appointment_Booking_frame, bg="#F0F8FF")
+    text_Input_Frame.columnconfigure(0, weight=1)
+    text_Input_Frame.columnconfigure(1, weight=1)
+
+    # Name entry
+    Label_Name = Label(text_Input_Frame, text="Name            :", font=("Times New Roman", 17), bg="#F0F8FF", fg="#006400")  # Dark green color text
+    Label_Name.grid(row=0, column=0, padx=10, pady=5, sticky=E)
+    Label_TextBox = Entry(text_Input_Frame, width=18, font=('Times New Roman', 16), bd=1, bg="#F0F8FF")
+    Label_TextBox.grid(row=0, column=1, padx=10, pady=5)
+
+    # Doctor selection
+    docter_choosed = StringVar(text_Input_Frame)
+    docter_choosed.set("choose the doctor")
+
+    Label_SelectDoctor = Label(text_Input_Frame, text="select Doctor    :", font=("Times New Roman", 17), bg="#F0F8FF", fg="#006400")  # Dark green color text
+    Label_SelectDoctor.grid(row=1, column=0, padx=10, pady=5, sticky=E)
+    Label_DropDown = OptionMenu(text_Input_Frame, docter_choosed, *(list(Harsha_Hospital.get_doctors().values())))
+    Label_DropDown.config(width=18, font=("Times New Roman", 15), bg="#F0F8FF" )
+    Label_DropDown.grid(row=1, column=1, padx=10, pady=5)
+    bind_menu(Label_DropDown, docter_choosed, doctor_labels)
+
+    # Day selection; free slots are offered one day at a time, for the next
+    # BOOKING_DAYS_SHOWN days
+    BOOKING_DAYS_SHOWN = 14
+    booking_days = {}
+    Choosed_day = StringVar(text_Input_Frame)
+    Label_Day = Label(text_Input_Frame, text="select Day       :", font=("Times New Roman", 17), bg="#F0F8FF", fg="#006400")  # Dark green color text
+    Label_Day.grid(row=2, column=0, padx=10, pady=5, sticky=E)
+
+    def show_booking_days():
+        # Rebuilt when the page is left, so the list moves on with the date
+        today = date.today()
+        booking_days.clear()
+        for n in range(BOOKING_DAYS_SHOWN):
+            day = today + timedelta(days=n)
+            booking_days[day.strftime("%Y-%m-%d  %A")] = day
+        Choosed_day.set(next(iter(booking_days)))
+        Label_DayDropDown = OptionMenu(text_Input_Frame, Choosed_day, *booking_days)
+        Label_DayDropDown.config(width=18, font=("Times New Roman", 15), bg="#F0F8FF")
+        Label_DayDropDown.grid(row=2, column=1, padx=10, pady=5)
+
+    show_booking_days()
+
+    # Time slot selection
+    Choosed_timeslot = StringVar(text_Input_Frame)
+    Choosed_timeslot.set("View Free Slots")
+    Label_Time_slot = Label(text_Input_Frame, text="select Time Slot :", font=("Times New Roman", 17), bg="#F0F8FF", fg="#006400")  # Dark green color text
+    Label_Time_slot.grid(row=3, column=0, padx=10, pady=5, sticky=E)
+
+    # Update time slots on doctor or day selection
+    def on_selection_change(*args):
+        selected_value = docter_choosed.get()
+        selected_day = Choosed_day.get()
+        if selected_value != "choose the doctor" and selected_day in booking_days:
+            doctor = doctor_directory.by_label(selected_value)
+            if doctor is None:
+                messagebox.showinfo("No Docter", "Choose the doctor")
+                return
+            doctor_id = doctor.id
+
+            def show_free_slots(free_slots):
+                # Ignore the answer if another doctor or day was picked meanwhile
+                if docter_choosed.get() != selected_value or Choosed_day.get() != selected_day:
+                    return
+                if Choosed_timeslot.get() not in free_slots:
+                    Choosed_timeslot.set("View Free Slots")
+                Label_timeSlotDropDown = OptionMenu(text_Input_Frame, Choosed_timeslot, *(free_slots or ["View Free Slots"]))
+                Label_timeSlotDropDown.config(width=18, font=("Times New Roman", 15), bg="#F0F8FF")
+                Label_timeSlotDropDown.grid(row=3, column=1, padx=10, pady=5)
+
+            run_in_background(Booking_busy_label, Appointment.view_free_slots, doctor_id, booking_days[selected_day],
+                              on_done=show_free_slots)
+
+    selected_value = docter_choosed.get()
+    docter_choosed.trace('w', on_selection_change)
+    Choosed_day.trace('w', on_selection_change)
+
+    # Earliest free slots of a whole specialization, so the patient does not
+    # have to try doctors one by one. Picking one fills in the doctor and slot.
+    earliest_choices = {}
+    Choosed_specialization = StringVar(text_Input_Frame)
+    Choosed_specialization.set("choose the service")
+    Choosed_earliest = StringVar(text_Input_Frame)
+    Choosed_earliest.set("Earliest Free Slots")
+
+    Label_Specialization = Label(text_Input_Frame, text="or first free in :", font=("Times New Roman", 17), bg="#F0F8FF", fg="#006400")
+    Label_Specialization.grid(row=4, column=0, padx=10, pady=5, sticky=E)
+    Label_SpecializationDropDown = OptionMenu(text_Input_Frame, Choosed_specialization, *Harsha_Hospital.get_services())
+    Label_SpecializationDropDown.config(width=18, font=("Times New Roman", 15), bg="#F0F8FF")
+    Label_SpecializationDropDown.grid(row=4, column=1, padx=10, pady=5)
+    bind_menu(Label_SpecializationDropDown, Choosed_specialization, Harsha_Hospital.get_services)
+
+    def on_specialization_change(*args):
+        specialization = Choosed_specialization.get()
+        if specialization == "choose the service":
+            return
+
+        def show_earliest(slots):
+            if Choosed_specialization.get() != specialization:
+                return
+            earliest_choices.clear()
+            for slot in slots:
+                label = doctor_directory.labels().get(slot.doctor_id)
+                if label is not None:
+                    earliest_choices[f"{format_slot(slot.time_slot)}  {label}"] = (label, format_slot(slot.time_slot))
+            if not earliest_choices:
+                messagebox.showinfo("No Free Slots", f"No {specialization} doctor has a free slot.")
+                return
+            Choosed_earliest.set("Earliest Free Slots")
+            Label_EarliestDropDown = OptionMenu(text_Input_Frame, Choosed_earliest, *earliest_choices)
+            Label_EarliestDropDown.config(width=40, font=("Times New Roman", 15), bg="#F0F8FF")
+            Label_EarliestDropDown.grid(row=5, column=0, columnspan=2, padx=10, pady=5)
+
+        run_in_background(Booking_busy_label, Appointment.earliest_slots, specialization, 5, on_done=show_earliest)
+
+    def on_earliest_change(*args):
+        choice = earliest_choices.get(Choosed_earliest.get())
+        if choice is not None:
+            doctor_label, time_slot = choice
+            Choosed_timeslot.set(time_slot)
+            for label, day in booking_days.items():
+                if day.isoformat() == time_slot[:10]:
+                    Choosed_day.set(label)
+            docter_choosed.set(doctor_label)
+
+    Choosed_specialization.trace('w', on_specialization_change)
+    Choosed_earliest.trace('w', on_earliest_change)
+
+    # Pack the input frame
+    text_Input_Frame.pack()
+
+    def show_confirmation_popup(patient_name, doctor_name, timeslot):
+        messagebox.showinfo("Appointment Confirmation", f"Appointment successfully booked!\n\nName: {patient_name}\nDoctor: {doctor_name}\nTime Slot: {timeslot}")
+        back_to_home_fromAppointment()
+
+    def back_to_home_fromAppointment():
+        Label_TextBox.delete(0,END)
+        docter_choosed.set("choose the doctor")
+        Choosed_specialization.set("choose the service")
+        Choosed_timeslot.set("View Free Slots")
+        show_booking_days()
+        show_Page(Home_page_frame)
+
+    # Function to book appointment
+    def book_appointment2():
+        patient_name = Label_TextBox.get()
+        selected_doctor = docter_choosed.get()
+        selected_timeslot = Choosed_timeslot.get()
+        if patient_name and selected_doctor != "choose the doctor" and selected_timeslot != "View Free Slots":
+            doctor = doctor_directory.by_label(selected_doctor)
+            if doctor is None:
+                messagebox.showinfo("No Docter", "Choose the doctor")
+                return
+            doctor_id = doctor.id
+            time_slot = datetime.strptime(selected_timeslot, '%Y-%m-%d %H:%M')
+
+            def show_booking_result(booked):
+                Submit_Appointment_Button.config(state=NORMAL)
+                if booked:
+                    if doctor_appointments is not None:
+                        doctor_appointments.refresh()
+                    show_confirmation_popup(patient_name, selected_doctor, selected_timeslot)
+                elif booked is BookingResult.NO_SUCH_SLOT:
+                    messagebox.showerror("Booking Failed", "This doctor has no such time slot.")
+                elif messagebox.askyesno("Booking Failed", "This time slot is already booked.\n\n"
+                                         "Join the doctor's waitlist? You get the next slot that is cancelled."):
+                    run_in_background(Booking_busy_label, Appointment.join_waitlist, patient_name, doctor_id,
+                                      on_done=show_waitlist_confirmation)
+
+            def show_waitlist_confirmation(entry):
+                messagebox.showinfo("Waitlist", f"{patient_name} is on the waitlist of {selected_doctor}.")
+
+            # Disabled until the answer arrives so the slot is not sent twice
+            Submit_Appointment_Button.config(state=DISABLED)
+            run_in_background(Booking_busy_label, Appointment.book_appointment, patient_name, doctor_id, time_slot,
+                              on_done=show_booking_result)
+        else:
+            messagebox.showerror("Data required", "Fill all data")
+
+
+    # Submit button
+    Submit_Appointment_Button = Button(Appointment_Booking_frame, text="BOOK SLOT", font=("Times New Roman", 18), command=book_appointment2, bg="#008080", fg="white")  # Teal background, white text
+    Submit_Appointment_Button.pack(pady=40)
+
+    Booking_busy_label = Label(Appointment_Booking_frame, text="", font=("Times New Roman", 14), bg="#F0F8FF", fg="#808080")
+    Booking_busy_label.pack()
+
+    Back_Button = Button(Appointment_Booking_frame, text="Go Back", command=back_to_home_fromAppointment, font=("Times New Roman", 18), bg="black", fg="white")  # Black background, white text
+    Back_Button.pack(pady=20)
+
+
+# Doctor_login_frame
+
+def build_doctor_login_page():
+    Label_Doctor_login_page1 = Label(Doctor_login_page_frame, text="Doctor Login Page", font=("Times New Roman", 23), bg="#F0F8FF", fg="#008080").pack(pady=30)
+
+    Doctor_login_Frame = Frame(Doctor_login_page_frame, bg="#F0F8FF")
+
+    Doctor_login_Frame.columnconfigure(0, weight=1)
+    Doctor_login_Frame.columnconfigure(1, weight=1)
+
+    Label_Name = Label(Doctor_login_Frame, text="Select Name       :", font=("Times New Roman", 17), bg="#F0F8FF").grid(row=0, column=0, padx=10, pady=5, sticky=E)
+
+    docter_choosed2 = StringVar(Doctor_login_Frame)
+    docter_choosed2.set("Select Your User name")
+
+    Label_DropDown = OptionMenu(Doctor_login_Frame, docter_choosed2, *(list(Harsha_Hospital.get_doctors().values())))
+    Label_DropDown.config(width=18, font=("Times New Roman", 15), bg="#F0F8FF" )
+    Label_DropDown.grid(row=0, column=1, padx=10, pady=5)
+    bind_menu(Label_DropDown, docter_choosed2, doctor_labels)
+
+    Label_Name = Label(Doctor_login_Frame, text="Enter Password  :", font=("Times New Roman", 17), bg="#F0F8FF").grid(row=1, column=0, padx=10, pady=5, sticky=E)
+    Password_Entry = Entry(Doctor_login_Frame, width=18, font=('Times New Roman', 16), bg="#F0F8FF", bd=1, show="*")
+    Password_Entry.grid(row=1, column=1, padx=10, pady=15)
+    Doctor_login_Frame.pack()
+
+    def set_logged_doctor(doctorUsername):
+        Doctor.logged_in_doctor = doctorUsername
+
+
+
+    def clear_fields():
+        docter_choosed2.set("Select Your User name")
+        Password_Entry.delete(0, 'end')
+
+    # Login function
+    def login():
+        username = docter_choosed2.get()
+        password = Password_Entry.get()
+        doctor = doctor_directory.by_label(username)
+        if doctor is not None and password == Doctor.password(doctor.id):
+            set_logged_doctor(username)
+            # Show success message (optional)
+            # messagebox.showinfo("Login Successful", "You have successfully logged in.")
+            show_Page(doctor_page_frame)
+            # Clear input fields after successful login
+            clear_fields()
+        else:
+            messagebox.showerror("Login Failed", "Invalid username or password.")
+            # Clear password field on login failure
+            Password_Entry.delete(0, 'end')
+
+    # Back button command to clear fields and go back to Home page
+    def back_to_home():
+        clear_fields()
+        show_Page(Home_page_frame)
+
+    Login_Button = Button(Doctor_login_page_frame, text="Login", font=("Times New Roman", 18), command=login, fg="white", bg="#2980b9")
+    Login_Button.pack(pady=20)
+    Back_Button = Button(Doctor_login_page_frame, text="Go Back", command=back_to_home, font=("Times New Roman", 18), bg="black", fg="white")
+    Back_Button.pack(pady=20)
+
+
+# preparing admin login frame
+
+def build_admin_login_page():
+    Admin_Id_password = {"Admin" : 00000000}
+
+    Label_Admin_login_page1 = Label(Admin_login_page_frame,text="Admin Login Page", font=("Times New Roman", 23), bg="#F0F8FF", fg="#008080").pack(pady=10)
+    admin_login_Frame = Frame(Admin_login_page_frame,bg="#F0F8FF")
+    admin_login_Frame.columnconfigure(0,weight=1)
+    admin_login_Frame.columnconfigure(1,weight=1)
+
+    def clearAdminLogin_fields():
+        Admin_username.delete(0, 'end')
+        Admin_Password.delete(0, 'end')
+
+    def back_to_homeFromAdmin():
+        clearAdminLogin_fields()
+        show_Page(Home_page_frame)
+
+
+    def admin_login():
+        username = Admin_username.get()
+        password = Admin_Password.get()
+        if username == "Admin" and password == "00000000":
+            #messagebox.showinfo("Login Successful", "You have successfully logged in.")
+            clearAdminLogin_fields()
+            show_Page(admin_page_frame)
+        else:
+            messagebox.showerror("Login Failed", "Invalid username or password.")
+            clearAdminLogin_fields()
+
+    Label(admin_login_Frame,text="Enter User name :", font=("Times New Roman", 17), bg="#F0F8FF").grid(row=0, column=0, padx=10, pady=5, sticky=E)
+    Admin_username = Entry(admin_login_Frame,width=18,font=('Times New Roman', 16))
+    Admin_username.grid(row=0, column=1, padx=10, pady=15)
+
+    Label(admin_login_Frame,text="Enter Password  :", font=("Times New Roman", 17), bg="#F0F8FF").grid(row=1, column=0, padx=10, pady=5, sticky=E)
+    Admin_Password = Entry(admin_login_Frame,width=18,font=('Times New Roman', 16),show="*")
+    Admin_Password.grid(row=1, column=1, padx=10, pady=15)
+    admin_login_Frame.pack()
+    Login_Button = Button(Admin_login_page_frame,text="Login",font=("Times New Roman",18),command=admin_login, fg="white", bg="#2980b9").pack(pady=30)
+
+    Back_Button = Button(Admin_login_page_frame, text="Go Back", command=back_to_homeFromAdmin,font=("Times New Roman", 18), bg="black", fg="white")
+    Back_Button.pack(pady=20)
+
+
+# prepareing doctor page
+
+def build_doctor_page():
+    global doctor_appointments
+    def back_to_home_fromDoctor():
+        doctor_appointments.clear()
+        show_Page(Home_page_frame)
+
+    # The appointment list only draws the rows in view and fetches further pages
+    # as it is scrolled, so a doctor with thousands of bookings opens instantly.
+    def view_Appointments():
+        doctor = doctor_directory.by_label(Doctor.logged_in_doctor)  # Retrieve doctor's ID
+        if doctor is not None:
+            doctor_id = doctor.id
+
+            def fetch(after, on_done, on_error):
+                run_in_background(Doctor_busy_label, Appointment.appointments_page, doctor_id, None, None, after,
+                                  on_done=on_done, on_error=on_error)
+
+            doctor_appointments.reset(fetch)
+
+    # Creating doctor page GUI components
+    Label_Doctor_page1 = Label(doctor_page_frame, text="Doctor Page", font=("Times New Roman", 23),bg="#F0F8FF", fg="#008080")
+    Label_Doctor_page1.pack()
+
+
+    label_result2 = Label(doctor_page_frame, text="Today's Appointments", font=("Times New Roman", 15), bg="#F0F8FF")
+    label_result2.pack()
+
+    # Scrollable list for displaying appointments
+    doctor_appointments = VirtualList(doctor_page_frame, None, formatting.doctor_listing_line,
+                                      formatting.doctor_listing_header, height=10, width=50, bg="#F0F8FF")
+    doctor_appointments.pack(fill=BOTH, expand=True)
+
+    # Button to trigger fetching and displaying appointments
+    View_Appointments_button = Button(doctor_page_frame, text="View Appointments", font=("Times New Roman", 18), command=view_Appointments, bg="#008080",fg="white")
+    View_Appointments_button.pack(pady=20)
+
+    # Cancelling a booking hands the slot to the doctor's next waitlisted patient
+    def cancel_appointment2():
+        doctor = doctor_directory.by_label(Doctor.logged_in_doctor)
+        try:
+            time_slot = datetime.strptime(Cancel_TextBox.get().strip(), '%Y-%m-%d %H:%M')
+        except ValueError:
+            messagebox.showerror("Invalid Time Slot", "Enter the time slot as YYYY-MM-DD HH:MM")
+            return
+        if doctor is None:
+            return
+
+        def show_cancel_result(outcome):
+            result, waiter = outcome
+            if result is CancelResult.NOT_BOOKED:
+                messagebox.showerror("Cancel Failed", "No appointment is booked at that time.")
+                return
+            Cancel_TextBox.delete(0, END)
+            view_Appointments()
+            if waiter is not None:
+                messagebox.showinfo("Appointment Cancelled", f"The slot was given to {waiter.patient_name} from the waitlist.")
+            else:
+                messagebox.showinfo("Appointment Cancelled", "The slot is free again.")
+
+        run_in_background(Doctor_busy_label, Appointment.cancel_appointment, doctor.id, time_slot,
+                          on_done=show_cancel_result)
+
+    Cancel_Frame = Frame(doctor_page_frame, bg="#F0F8FF")
+    Label_Cancel = Label(Cancel_Frame, text="Slot to cancel :", font=("Times New Roman", 15), bg="#F0F8FF")
+    Label_Cancel.grid(row=0, column=0, padx=10)
+    Cancel_TextBox = Entry(Cancel_Frame, width=18, font=('Times New Roman', 16), bd=1, bg="#F0F8FF")
+    Cancel_TextBox.grid(row=0, column=1, padx=10)
+    Cancel_Button = Button(Cancel_Frame, text="Cancel Appointment", font=("Times New Roman", 15), command=cancel_appointment2, bg="#008080", fg="white")
+    Cancel_Button.grid(row=0, column=2, padx=10)
+    Cancel_Frame.pack(pady=10)
+    Doctor_busy_label = Label(doctor_page_frame, text="", font=("Times New Roman", 14), bg="#F0F8FF", fg="#808080")
+    Doctor_busy_label.pack()
+    # Back button
+    Back_Button = Button(doctor_page_frame, text="Go Back", command=back_to_home_fromDoctor, font=("Times New Roman", 18), bg="black", fg="white")
+    Back_Button.pack(side="bottom")
+
+
+# preparing admin page
+
+def build_admin_page():
+    Label_Admin_page1 = Label(admin_page_frame,text="Admin Page", font=("Times New Roman", 23), bg="#F0F8FF", fg="#008080").pack(pady=20)
+
+    Admin_choice_Frame = Frame(admin_page_frame,bg="#F0F8FF")
+    Admin_choice_Frame.columnconfigure(0,weight=1)
+    Admin_choice_Frame.columnconfigure(1,weight=1)
+
+    text_Input_Frame2 = Frame(admin_page_frame,bg="#F0F8FF")
+
+    text_Input_Frame2.columnconfigure(0,weight=1)
+    text_Input_Frame2.columnconfigure(1,weight=1)
+    text_Input_Frame2.columnconfigure(2,weight=1)
+
+    List_of_options = ["Add Doctor", "Delete Doctor","View Appointments of all doctors", "Search Patient", "Utilization Report"]
+    option_Choosed = StringVar(text_Input_Frame2)
+    option_Choosed.set("What do you want to do")
+
+    Label_SelectOption = Label(Admin_choice_Frame,text="Choice    :", font=("Times New Roman", 17), bg="#F0F8FF").grid(row=0, column=0, padx=10, pady=5, sticky=E)
+    Label_DropDown = OptionMenu(Admin_choice_Frame,option_Choosed,*List_of_options)
+    Label_DropDown.config(font=("Times New Roman", 15), bg="#F0F8FF"  )
+    Label_DropDown.grid(row=0, column=1, padx=10, pady=5)
+
+    Admin_choice_Frame.pack()
+    Admin_busy_label = Label(admin_page_frame, text="", font=("Times New Roman", 14), bg="#F0F8FF", fg="#808080")
+    Admin_busy_label.pack()
+
+    UTILIZATION_REFRESH_MS = 5000
+
+    def clear_previous_widgets():
+        for widget in text_Input_Frame2.winfo_children():
+            widget.destroy()
+        unbind_destroyed_menus()
+
+    def onSelectionChange(*args):
+        clear_previous_widgets()
+        selected_value = option_Choosed.get()
+        if selected_value == "Add Doctor":
+            def addDoctor(name,specialization,gender,age):
+                if not Label_nameEntry.get():
+                    messagebox.showinfo("No Docter", f"Give Doctor details")
+                    return
+
+                def show_added(added):
+                    if added:
+                        messagebox.showinfo("Doctor Added", f"Doctor successfully added!\n\nName: {name}\nspecialization: {specialization}\ngender: {gender}")
+                        show_Page(Home_page_frame)
+                    else:
+                        messagebox.showerror("doctor name exists", "Give different name")
+
+                run_in_background(Admin_busy_label, Admin.add_doctor, name, specialization, gender, age, on_done=show_added)
+
+
+            Label(text_Input_Frame2,text="Enter doctor name     :", font=("Times New Roman", 17), bg="#F0F8FF").grid(row=1, column=0, padx=10, pady=5, sticky=E)
+            Label(text_Input_Frame2,text="Enter doctor specilization :", font=("Times New Roman", 17), bg="#F0F8FF").grid(row=2, column=0, padx=10, pady=5, sticky=E)
+            Label(text_Input_Frame2,text="Enter doctor Gender     :", font=("Times New Roman", 17), bg="#F0F8FF").grid(row=3, column=0, padx=10, pady=5, sticky=E)
+            Label(text_Input_Frame2,text="Enter doctor experience    :", font=("Times New Roman", 17), bg="#F0F8FF").grid(row=4, column=0, padx=10, pady=5, sticky=E)
+            Label_nameEntry = Entry(text_Input_Frame2,width=18,font=('Times New Roman', 16), bg="#F0F8FF", bd=1)
+            Label_nameEntry.grid(row=1, column=1, padx=10, pady=15)
+            Label_SpecializationEntry = Entry(text_Input_Frame2,width=18,font=('Times New Roman', 16), bd=1, bg="#F0F8FF")
+            Label_SpecializationEntry.grid(row=2, column=1, padx=10, pady=15)
+            Label_GenderEntry = Entry(text_Input_Frame2,width=18,font=('Times New Roman', 16), bd=1, bg="#F0F8FF")
+            Label_GenderEntry.grid(row=3, column=1, padx=10, pady=15)
+            Label_expEntry = Entry(text_Input_Frame2,width=18,font=('Times New Roman', 16), bd=1, bg="#F0F8FF")
+            Label_expEntry.grid(row=4, column=1, padx=10, pady=15)
+            Add_button = Button(text_Input_Frame2,text="Add Doctor",font=("Times New Roman",18), bg="#008080",fg="white",
+                                command= lambda: addDoctor(Label_nameEntry.get(),
+                                                            Label_SpecializationEntry.get(),
+                                                            Label_GenderEntry.get(),
+                                                            Label_expEntry.get()))
+            Add_button.grid(row=5, column=0, padx=10, pady=15,columnspan=4)
+
+
+        elif selected_value == "Delete Doctor":
+            UNPLACED_SHOWN = 10
+
+            def show_offboard_report(report):
+                lines = [str(report)]
+                if report.unplaced:
+                    lines += ["", "Call these patients, no other doctor has a slot for them:"]
+                    lines += [formatting.admin_listing_line(row) for row in report.unplaced[:UNPLACED_SHOWN]]
+                    if len(report.unplaced) > UNPLACED_SHOWN:
+                        lines.append(f"... and {len(report.unplaced) - UNPLACED_SHOWN} more")
+                messagebox.showinfo("Doctor Removed", "\n".join(lines))
+                docter_delete.set("choose the doctor")
+                refresh_data_bound_widgets()
+
+            def delete_choosed_doctor():
+                doctor = doctor_directory.by_label(docter_delete.get())
+                if doctor is None:
+                    messagebox.showinfo("No Docter", "Choose the doctor")
+                    return
+                if messagebox.askyesno("Remove Doctor", f"Remove Dr. {doctor.name}?\n\n"
+                                       f"Their future appointments move to other {doctor.specialization} doctors."):
+                    run_in_background(Admin_busy_label, Admin.offboard_doctors, [doctor.id],
+                                      on_done=show_offboard_report)
+
+            docter_delete = StringVar(text_Input_Frame2)
+            docter_delete.set("choose the doctor")
+            Label_SelectDoctor = Label(text_Input_Frame2,text="select Doctor    :", font=("Times New Roman", 17), bg="#F0F8FF").grid(row=1, column=0, padx=10, pady=5, sticky=E)
+            Label_DropDown = OptionMenu(text_Input_Frame2,docter_delete,*(list(Harsha_Hospital.get_doctors().values())))
+            Label_DropDown.config(width=18,font=("Times New Roman", 15), bg="#F0F8FF" )
+            Label_DropDown.grid(row=1, column=1, padx=10, pady=5)
+            bind_menu(Label_DropDown, docter_delete, doctor_labels)
+            delete_button = Button(text_Input_Frame2,text="delete Doctor",font=("Times New Roman",18), bg="#008080",fg="white",command=delete_choosed_doctor)
+            delete_button.grid(row=5, column=0,columnspan=4, padx=10, pady=15)
+
+        elif selected_value == "View Appointments of all doctors":
+
+            # Fetches one page of appointments for the list below
+            def fetch_appointments(after, on_done, on_error):
+                run_in_background(Admin_busy_label, Admin.appointments_page, None, None, None, None, after,
+                                  on_done=on_done, on_error=on_error)
+
+            # Scrollable list for displaying appointments; pages arriving after
+            # the admin picked another option are dropped by the list itself
+            all_appointments = VirtualList(text_Input_Frame2, fetch_appointments, formatting.admin_listing_line,
+                                           formatting.admin_listing_header, height=10, width=80, bg="#F0F8FF")
+            all_appointments.pack(fill=BOTH, expand=True, padx=20, pady=10)  # Adjust padding and packing options for appearance
+
+            def view_Appointments2():
+                all_appointments.reset()
+
+            # Button to trigger fetching and displaying appointments
+            View_Appointments_button = Button(text_Input_Frame2, text="View Appointments", font=("Times New Roman", 18), command=view_Appointments2, bg="#008080",fg="white")
+            View_Appointments_button.pack(pady=20)
+
+        elif selected_value == "Search Patient":
+            # Appointments, past and future, of patients whose name contains
+            # the typed words (or is close to them), newest first
+            Label(text_Input_Frame2, text="Patient name    :", font=("Times New Roman", 17), bg="#F0F8FF").pack(pady=5)
+            Search_TextBox = Entry(text_Input_Frame2, width=24, font=('Times New Roman', 16), bd=1, bg="#F0F8FF")
+            Search_TextBox.pack(pady=5)
+
+            def search_fetch(query):
+                def fetch(after, on_done, on_error):
+                    run_in_background(Admin_busy_label, Admin.search_patients, query, after,
+                                      on_done=on_done, on_error=on_error)
+                return fetch
+
+            search_results = VirtualList(text_Input_Frame2, None, formatting.admin_listing_line,
+                                         formatting.admin_listing_header, height=10, width=80, bg="#F0F8FF")
+
+            def search_patient(*args):
+                query = Search_TextBox.get().strip()
+                if not any(len(word) >= 3 for word in query.split()):
+                    messagebox.showinfo("Search Patient", "Type at least 3 letters of the name")
+                    return
+                search_results.reset(search_fetch(query))
+
+            Search_TextBox.bind("<Return>", search_patient)
+            Search_button = Button(text_Input_Frame2, text="Search", font=("Times New Roman", 18), command=search_patient, bg="#008080", fg="white")
+            Search_button.pack(pady=10)
+            search_results.pack(fill=BOTH, expand=True, padx=20, pady=10)
+
+        elif selected_value == "Utilization Report":
+            # Today's bookings against capacity. The report reads the summary
+            # tables only, so it can refresh every few seconds while shown.
+            report_text = Text(text_Input_Frame2, height=18, width=80, font=("Times New Roman", 13), bg="#F0F8FF", state=DISABLED)
+            report_text.pack(fill=BOTH, expand=True, padx=20, pady=10)
+
+            def show_report(lines):
+                if not report_text.winfo_exists():
+                    return
+                report_text.config(state=NORMAL)
+                report_text.delete("1.0", END)
+                report_text.insert(END, "\n".join(lines))
+                report_text.config(state=DISABLED)
+
+            def refresh_report():
+                # Stops once the admin picked another option and the text is gone
+                if report_text.winfo_exists():
+                    if report_text.winfo_ismapped():
+                        run_in_background(Admin_busy_label, Admin.view_utilization, on_done=show_report)
+                    report_text.after(UTILIZATION_REFRESH_MS, refresh_report)
+
+            refresh_report()
+
+        else:
+            pass
+
+
+
+    option_Choosed.trace('w', onSelectionChange)
+    Back_Button = Button(admin_page_frame, text="Go Back", command=lambda :show_Page(Home_page_frame),font=("Times New Roman", 18), bg="black", fg="white")
+    Back_Button.pack(pady = 30,side="bottom")
+
+
+    text_Input_Frame2.pack()
+
+
+# The doctor page's appointment list, once that page is built
+doctor_appointments = None
+
+page_builders = {
+    Appointment_Booking_frame: build_booking_page,
+    Doctor_login_page_frame: build_doctor_login_page,
+    Admin_login_page_frame: build_admin_login_page,
+    doctor_page_frame: build_doctor_page,
+    admin_page_frame: build_admin_page,
+}
+
+shown_directory_version = doctor_directory.version
+show_services(Harsha_Hospital.get_services())
+
+def record_startup():
+    # Runs once the main loop has drawn the first window. Kept as gauges,
+    # so the metrics dump of a reception PC shows its time to first window.
+    now = time.perf_counter()
+    metrics.set_gauge("app.startup_database_ms", round((startup_database_done - startup_began) * 1000, 1))
+    metrics.set_gauge("app.time_to_first_window_ms", round((now - startup_began) * 1000, 1))
+
+root.after_idle(record_startup)
+
+# Housekeeping that the first window need not wait for. The worker runs
+# jobs in order, so anything the pages queue later finds the index built.
+def show_database_error(e):
+    messagebox.showerror("Database Error", f"An error occurred: {e}")
+
+db_worker.submit(archive_past_days, on_error=show_database_error)
+db_worker.submit(availability_index.rebuild, on_error=show_database_error)
+db_worker.submit(patient_search.sync, on_error=show_database_error)
+
+poll_db_worker()
+root.mainloop()
+# Finish queued database work, then close the connections
+db_worker.stop()
+metrics.stop_dump()
+db.close()
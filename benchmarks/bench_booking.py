@@ -0,0 +1,123 @@
+# Booking latency as the appointment table grows.
+#
+#   python -m benchmarks.bench_booking --sizes 10000 100000 1000000
+#
+# Each size gets a fresh temporary database whose doctors have that many
+# appointments booked, then a number of random bookings of the days after
+# those are timed. With the (doctor_id, time_slot) index the per-booking time
+# should stay flat as the table grows.
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date
+
+import hospital_core
+from hospital_core import Appointment, db
+from hospital_core.schedules import DEFAULT_END, DEFAULT_SLOT_MINUTES, DEFAULT_START, EVERY_DAY
+from hospital_core.timeslots import MINUTES_PER_DAY, day_number, to_minutes
+
+
+SLOTS_PER_DAY = (DEFAULT_END - DEFAULT_START) // DEFAULT_SLOT_MINUTES
+
+
+def slot_at(start, day, number):
+    # Epoch minutes of slot number n on the given day after start
+    return start + day * MINUTES_PER_DAY + DEFAULT_START + DEFAULT_SLOT_MINUTES * number
+
+
+def fill(rows, days=30):
+    # Inserts enough doctors, with the default working hours, to hold the
+    # requested number of booked rows in their first days; the next days
+    # are left free for the timed bookings
+    connection = db.get_connection()
+    doctors = max(1, rows // (SLOTS_PER_DAY * days))
+    start = to_minutes(date.today())
+    connection.execute("BEGIN")
+    connection.executemany("INSERT INTO doctor (id, name, specialization) VALUES (?, ?, ?)",
+                           ((d, f"Doctor {d}", "General") for d in range(1, doctors + 1)))
+    connection.executemany('''INSERT INTO schedule_rule (doctor_id, weekdays, start_minute, end_minute,
+                                                         slot_minutes, valid_from) VALUES (?, ?, ?, ?, ?, ?)''',
+                           ((d, EVERY_DAY, DEFAULT_START, DEFAULT_END, DEFAULT_SLOT_MINUTES, day_number(start))
+                            for d in range(1, doctors + 1)))
+
+    def slots():
+        count = 0
+        for d in range(1, doctors + 1):
+            for day in range(days):
+                for i in range(SLOTS_PER_DAY):
+                    if count == rows:
+                        return
+                    count += 1
+                    yield d, slot_at(start, day, i), f"Patient {count}"
+
+    connection.executemany("INSERT INTO appointment (doctor_id, time_slot, isBooked, patient_name) VALUES (?, ?, 1, ?)",
+                           slots())
+    connection.execute("COMMIT")
+    return doctors, days, start
+
+
+def run(rows, bookings):
+    with tempfile.TemporaryDirectory() as folder:
+        hospital_core.use_database(os.path.join(folder, "bench.db"))
+        doctors, days, start = fill(rows)
+        rng = random.Random(rows)
+        timings = []
+        for n in range(bookings):
+            doctor_id = rng.randint(1, doctors)
+            slot = slot_at(start, days + rng.randrange(days), rng.randrange(SLOTS_PER_DAY))
+            begin = time.perf_counter()
+            Appointment.book_appointment(f"Patient {n}", doctor_id, slot)
+            timings.append(time.perf_counter() - begin)
+        hospital_core.close()
+    timings.sort()
+    return {
+        "rows": rows,
+        "bookings": bookings,
+        "median_us": statistics.median(timings) * 1e6,
+        "p99_us": timings[int(len(timings) * 0.99) - 1] * 1e6,
+    }
+
+
+def run_batch(count):
+    # The same bookings made one auto-committed call at a time and with book_many
+    timings = {}
+    for mode in ("loop", "book_many"):
+        with tempfile.TemporaryDirectory() as folder:
+            hospital_core.use_database(os.path.join(folder, "bench.db"))
+            doctors, days, start = fill(count)
+            requests = [(f"Patient {n}", d, slot_at(start, days + day, i))
+                        for n, (d, day, i) in enumerate((d, day, i) for d in range(1, doctors + 1)
+                                                        for day in range(days) for i in range(SLOTS_PER_DAY))][:count]
+            begin = time.perf_counter()
+            if mode == "loop":
+                for request in requests:
+                    Appointment.book_appointment(*request)
+            else:
+                Appointment.book_many(requests)
+            timings[mode] = time.perf_counter() - begin
+            hospital_core.close()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Booking latency as the appointment table grows")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--bookings", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=0, help="also compare book_many with N single bookings")
+    args = parser.parse_args()
+    print(f"{'rows':>10} {'median us':>10} {'p99 us':>10}")
+    for rows in args.sizes:
+        result = run(rows, args.bookings)
+        print(f"{result['rows']:>10} {result['median_us']:>10.1f} {result['p99_us']:>10.1f}")
+    if args.batch:
+        timings = run_batch(args.batch)
+        print(f"{args.batch} bookings: one by one {timings['loop'] * 1000:.1f} ms, "
+              f"book_many {timings['book_many'] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# Head-office queries across branch databases.
+#
+#   python -m benchmarks.bench_federation --branches 1 2 4 8 --doctors 200 --days 30
+#
+# Generates one synthetic database per branch, then for each branch count
+# times the federated queries over that many branches: an admin listing page
+# (the first one and one 50 pages in), the earliest-slot search and the
+# doctor directory. Each runs with one thread per branch and with a single
+# thread reading the branches one after another, so the table shows what
+# the parallel fan-out saves as branches are added; on a single core it
+# can save nothing.
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import hospital_core
+from hospital_core import branches
+from hospital_core.federation import Federation
+
+from .synthetic import SPECIALIZATIONS, generate
+
+
+def timed(function, repeat):
+    # Best of repeat runs, in milliseconds
+    best = None
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        function()
+        elapsed = (time.perf_counter() - begin) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def measure(federation, start, repeat):
+    deep = None
+    for _ in range(50):
+        rows, deep = federation.appointments_page(start, after=deep, limit=100)
+    return {
+        "page 1": timed(lambda: federation.appointments_page(start, limit=100), repeat),
+        "page 50": timed(lambda: federation.appointments_page(start, after=deep, limit=100), repeat),
+        "earliest": timed(lambda: federation.earliest_slots(SPECIALIZATIONS[0], 10, start), repeat),
+        "doctors": timed(federation.doctors, repeat),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time federated queries over several branch databases")
+    parser.add_argument("--branches", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--doctors", type=int, default=200)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--booked", type=float, default=0.5)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as folder:
+        entries = []
+        for number in range(max(args.branches)):
+            hospital_core.use_database(os.path.join(folder, f"branch-{number}.db"))
+            start, _, _ = generate(args.doctors, args.days, args.booked, args.seed + number)
+            hospital_core.close()
+            entries.append({"id": f"branch-{number:02d}", "name": f"Branch {number}", "address": "-",
+                            "database": f"branch-{number}.db"})
+        path = os.path.join(folder, "branches.json")
+        with open(path, "w") as file:
+            json.dump(entries, file)
+        listed = branches.load(path)
+        print(f"{args.doctors} doctors and {args.days} days per branch, {args.booked:.0%} booked; best of {args.repeat}, ms")
+        columns = ("page 1", "page 50", "earliest", "doctors")
+        print(f"{'branches':>8} {'threads':>8} " + " ".join(f"{column:>9}" for column in columns))
+        for count in args.branches:
+            for workers in (count, 1) if count > 1 else (1,):
+                federation = Federation(listed[:count], workers)
+                try:
+                    results = measure(federation, start, args.repeat)
+                finally:
+                    federation.close()
+                print(f"{count:>8} {workers:>8} " + " ".join(f"{results[column]:>9.2f}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
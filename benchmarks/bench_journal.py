@@ -0,0 +1,99 @@
+# Booking throughput with the operation journal.
+#
+#   python -m benchmarks.bench_journal --doctors 200 --days 30 --threads 1 4 16 --bookings 4000
+#
+# Generates one synthetic database, then for each mode and thread count
+# opens a copy of it and books that many slots from that many threads at
+# once. The modes are
+#   normal   WAL with synchronous=NORMAL: no fsync per commit, so a power
+#            failure can lose the last commits
+#   full     synchronous=FULL: every commit is fsynced on its own
+#   journal  synchronous=NORMAL plus the journal: every booking waits until
+#            its journal record is fsynced, but one fsync covers the records
+#            of all the threads that committed meanwhile. A single thread
+#            has nothing to group with and pays one fsync per booking, like
+#            full; expect it level with or somewhat below full there, and
+#            ahead of it only with several threads.
+# For the journal it also prints how many records one fsync covered, and
+# the replay time of the whole journal.
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+import hospital_core
+from hospital_core import Appointment, db, replay
+
+from .synthetic import SLOTS_PER_DAY, generate, patient_name, slot_at
+
+
+MODES = ("normal", "full", "journal")
+
+
+def run(path, mode, threads, bookings, start, doctors, days, seed):
+    journal_path = path + ".journal"
+    db.use_journal(journal_path if mode == "journal" else None)
+    hospital_core.use_database(path)
+    rng = random.Random(seed)
+    # Days after the generated ones are all free; every slot is booked once
+    slots = rng.sample([(doctor_id, slot_at(start, day, number)) for doctor_id in range(1, doctors + 1)
+                        for day in range(days, 2 * days) for number in range(SLOTS_PER_DAY)], bookings)
+    ready = threading.Barrier(threads + 1)
+
+    def book(share):
+        if mode == "full":
+            db.get_connection().execute("PRAGMA synchronous=FULL")
+        Appointment.is_slot_free(*share[0])     # builds the availability index
+        ready.wait()
+        for doctor_id, slot in share:
+            Appointment.book_appointment(patient_name(rng), doctor_id, slot)
+
+    workers = [threading.Thread(target=book, args=(slots[n::threads],)) for n in range(threads)]
+    for worker in workers:
+        worker.start()
+    ready.wait()
+    begin = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - begin
+    journal = db.current_journal()
+    per_fsync = journal.records / journal.groups if journal is not None and journal.groups else None
+    hospital_core.close()
+    replay_s = None
+    if mode == "journal":
+        replay_s = replay.rebuild(journal_path, path + ".replayed").elapsed
+    db.use_journal(None)
+    return bookings / elapsed, per_fsync, replay_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time concurrent bookings with and without the journal")
+    parser.add_argument("--doctors", type=int, default=200)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--bookings", type=int, default=4000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as folder:
+        source = os.path.join(folder, "source.db")
+        hospital_core.use_database(source)
+        start, doctors, days = generate(args.doctors, args.days, seed=args.seed)
+        hospital_core.close()
+        print(f"{doctors} doctors, {days} days, {args.bookings} bookings")
+        print(f"{'mode':<8} {'threads':>8} {'bookings/s':>11} {'records/fsync':>14} {'replay s':>9}")
+        for threads in args.threads:
+            for mode in MODES:
+                path = os.path.join(folder, f"{mode}-{threads}.db")
+                shutil.copyfile(source, path)
+                rate, per_fsync, replay_s = run(path, mode, threads, args.bookings, start, doctors, days, args.seed)
+                print(f"{mode:<8} {threads:>8} {rate:>11.0f} "
+                      f"{'-' if per_fsync is None else f'{per_fsync:.1f}':>14} "
+                      f"{'-' if replay_s is None else f'{replay_s:.2f}':>9}")
+
+
+if __name__ == "__main__":
+    main()
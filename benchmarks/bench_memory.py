@@ -0,0 +1,95 @@
+# On-disk versus in-memory mode.
+#
+#   python -m benchmarks.bench_memory --doctors 200 --days 30 --bookings 2000
+#
+# Generates one synthetic database, then for each mode opens a copy of it
+# and times opening it (in-memory mode loads the whole file), single
+# auto-committed bookings, a listing page and cancellations. For in-memory
+# mode it also times writing the database back to the file, which is what
+# happens every BACKUP_INTERVAL seconds and on close.
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+import hospital_core
+from hospital_core import Admin, Appointment, db
+
+from .synthetic import SLOTS_PER_DAY, generate, patient_name, slot_at
+
+
+def stats(timings):
+    timings = sorted(timings)
+    return statistics.median(timings) * 1e6, timings[max(0, int(len(timings) * 0.99) - 1)] * 1e6
+
+
+def run_mode(path, in_memory, start, doctors, days, bookings, seed):
+    rng = random.Random(seed)
+    begin = time.perf_counter()
+    hospital_core.use_database(path, in_memory=in_memory)
+    Admin.appointments_page(limit=1)    # first query also builds the caches
+    result = {"open_ms": (time.perf_counter() - begin) * 1000}
+    booked, timings = [], []
+    for n in range(bookings):
+        doctor_id = rng.randint(1, doctors)
+        # Days after the generated ones are all free
+        slot = slot_at(start, days + rng.randrange(days), rng.randrange(SLOTS_PER_DAY))
+        begin = time.perf_counter()
+        if Appointment.book_appointment(patient_name(rng), doctor_id, slot):
+            booked.append((doctor_id, slot))
+        timings.append(time.perf_counter() - begin)
+    result["book"] = stats(timings)
+    timings = []
+    for n in range(200):
+        begin = time.perf_counter()
+        Admin.appointments_page()
+        timings.append(time.perf_counter() - begin)
+    result["page"] = stats(timings)
+    timings = []
+    for doctor_id, slot in booked[:500]:
+        begin = time.perf_counter()
+        Appointment.cancel_appointment(doctor_id, slot)
+        timings.append(time.perf_counter() - begin)
+    result["cancel"] = stats(timings)
+    memory = db.memory_database()
+    result["backup_ms"] = memory.save() * 1000 if memory is not None else None
+    begin = time.perf_counter()
+    hospital_core.close()
+    result["close_ms"] = (time.perf_counter() - begin) * 1000
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare on-disk and in-memory database mode")
+    parser.add_argument("--doctors", type=int, default=200)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--bookings", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as folder:
+        source = os.path.join(folder, "source.db")
+        hospital_core.use_database(source, in_memory=False)
+        start, doctors, days = generate(args.doctors, args.days, seed=args.seed)
+        hospital_core.close()
+        size_mb = os.path.getsize(source) / 2 ** 20
+        print(f"{doctors} doctors, {days} days, {size_mb:.1f} MB database")
+        print(f"{'mode':<8} {'open ms':>9} {'book us':>9} {'p99':>9} {'page us':>9} {'p99':>9} "
+              f"{'cancel us':>10} {'p99':>9} {'backup ms':>10} {'close ms':>9}")
+        for in_memory in (False, True):
+            path = os.path.join(folder, f"{'memory' if in_memory else 'disk'}.db")
+            shutil.copyfile(source, path)
+            result = run_mode(path, in_memory, start, doctors, days, args.bookings, args.seed)
+            backup = "-" if result["backup_ms"] is None else f"{result['backup_ms']:.1f}"
+            print(f"{'memory' if in_memory else 'disk':<8} {result['open_ms']:>9.1f} "
+                  f"{result['book'][0]:>9.1f} {result['book'][1]:>9.1f} "
+                  f"{result['page'][0]:>9.1f} {result['page'][1]:>9.1f} "
+                  f"{result['cancel'][0]:>10.1f} {result['cancel'][1]:>9.1f} "
+                  f"{backup:>10} {result['close_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# Offboarding doctors with many future bookings.
+#
+#   python -m benchmarks.bench_offboarding --doctors 400 --days 60 --booked 0.3 --leaving 1 5 20
+#
+# Generates one synthetic database, then for each count opens a fresh copy
+# of it and offboards that many doctors of one specialization, reporting
+# how many bookings were moved or left unplaced, how far they moved on
+# average and how long the single transaction took.
+
+import argparse
+import os
+import shutil
+import tempfile
+
+import hospital_core
+from hospital_core import Admin, availability_index, doctor_directory
+
+from .synthetic import SPECIALIZATIONS, generate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time offboarding doctors and moving their bookings")
+    parser.add_argument("--doctors", type=int, default=400)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--booked", type=float, default=0.3)
+    parser.add_argument("--leaving", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as folder:
+        source = os.path.join(folder, "source.db")
+        hospital_core.use_database(source)
+        generate(args.doctors, args.days, args.booked, args.seed)
+        hospital_core.close()
+        print(f"{args.doctors} doctors, {args.days} days, {args.booked:.0%} booked")
+        print(f"{'leaving':>8} {'bookings':>9} {'moved':>7} {'unplaced':>9} {'mean shift h':>13} {'ms':>8} {'us/booking':>11}")
+        for leaving in args.leaving:
+            path = os.path.join(folder, f"leaving-{leaving}.db")
+            shutil.copyfile(source, path)
+            hospital_core.use_database(path)
+            availability_index.rebuild()    # built at startup in the app and the service
+            doctor_ids = [doctor.id for doctor in doctor_directory.by_specialization(SPECIALIZATIONS[0])][:leaving]
+            report = Admin.offboard_doctors(doctor_ids)
+            hospital_core.close()
+            bookings = len(report.moved) + len(report.unplaced)
+            shift = sum(abs(move.to_slot - move.from_slot) for move in report.moved) / max(len(report.moved), 1) / 60
+            print(f"{len(report.doctors):>8} {bookings:>9} {len(report.moved):>7} {len(report.unplaced):>9} "
+                  f"{shift:>13.1f} {report.elapsed * 1000:>8.1f} {report.elapsed * 1e6 / max(bookings, 1):>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# Patient name search check.
+#
+#   python -m benchmarks.check_patient_search --patients 200
+#
+# Books appointments for synthetic patients, waits for the indexer to catch
+# up, then searches for every patient by full name, with two neighbouring
+# letters of the first name swapped and with one letter of it changed. Each
+# search must find that patient's appointment. Exits with status 1 on any
+# miss.
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import hospital_core
+from hospital_core import Admin, Appointment, BookingResult, Doctor, db, doctor_directory
+
+from .synthetic import patient_name
+
+INDEX_WAIT = 10.0       # seconds the indexer may take to catch up
+
+
+def transposed(name, rng):
+    # Two neighbouring letters of the first name swapped
+    first, last = name.split(" ", 1)
+    i = rng.randrange(1, len(first) - 1)
+    return f"{first[:i]}{first[i + 1]}{first[i]}{first[i + 2:]} {last}"
+
+
+def changed(name, rng):
+    # One letter of the first name changed to another
+    first, last = name.split(" ", 1)
+    i = rng.randrange(1, len(first))
+    letter = rng.choice([c for c in "aeiourstn" if c != first[i].lower()])
+    return f"{first[:i]}{letter}{first[i + 1:]} {last}"
+
+
+def wait_for_index():
+    connection = db.get_connection()
+    deadline = time.monotonic() + INDEX_WAIT
+    while connection.execute("SELECT 1 FROM patient_search_queue LIMIT 1").fetchone():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that misspelt patient names are found")
+    parser.add_argument("--patients", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    problems = []
+    with tempfile.TemporaryDirectory() as folder:
+        hospital_core.use_database(os.path.join(folder, "search.db"))
+        Doctor("Check Doctor", "General", None, 1)
+        doctor_id = next(iter(doctor_directory.labels()))
+        start = datetime.combine(date.today() + timedelta(days=1), datetime.min.time())
+        slots = (start + timedelta(days=day, hours=hour, minutes=minute)
+                 for day in range(args.patients) for hour in range(9, 17) for minute in (0, 30))
+        booked = set()
+        for _ in range(args.patients):
+            name = patient_name(rng)
+            if Appointment.book_appointment(name, doctor_id, next(slots)) is not BookingResult.BOOKED:
+                problems.append(f"could not book {name!r}")
+            booked.add(name)
+        if not wait_for_index():
+            problems.append(f"the index did not catch up within {INDEX_WAIT:.0f}s")
+        searches = 0
+        for name in booked:
+            for query in (name, transposed(name, rng), changed(name, rng)):
+                searches += 1
+                found = [row.patient_name for row in Admin.iter_search_patients(query)]
+                if name not in found:
+                    problems.append(f"{query!r} did not find {name!r} (found {found[:5]})")
+        hospital_core.close()
+
+    print(f"{args.patients} bookings of {len(booked)} names, {searches} searches")
+    for problem in problems[:20]:
+        print(problem)
+    print("FAILED" if problems else "OK")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
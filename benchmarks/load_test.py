@@ -0,0 +1,93 @@
+# Load-test client for hospital_core.service.
+#
+#   python -m hospital_core.service --port 8080 &
+#   python -m benchmarks.load_test --port 8080 --concurrency 32 --requests 20000
+#
+# Opens one keep-alive connection per simulated desk and fires a mix of
+# doctor listings, free-slot lookups and bookings. Reports requests/sec and
+# latency percentiles.
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+
+async def call(reader, writer, method, path, body=None):
+    payload = json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+                 f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n".encode() + payload)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = 0
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":", 1)[1])
+    data = await reader.readexactly(length)
+    return status, json.loads(data) if data else None
+
+
+async def desk(number, host, port, count, doctor_ids, latencies, statuses):
+    rng = random.Random(number)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for n in range(count):
+            choice = rng.random()
+            doctor_id = rng.choice(doctor_ids)
+            begin = time.perf_counter()
+            if choice < 0.2:
+                status, _ = await call(reader, writer, "GET", "/doctors")
+            elif choice < 0.8:
+                status, _ = await call(reader, writer, "GET", f"/doctors/{doctor_id}/free-slots")
+            else:
+                status, body = await call(reader, writer, "GET", f"/doctors/{doctor_id}/free-slots")
+                latencies.append(time.perf_counter() - begin)
+                statuses[status] = statuses.get(status, 0) + 1
+                if not body["free_slots"]:
+                    continue
+                begin = time.perf_counter()
+                status, _ = await call(reader, writer, "POST", "/appointments", {
+                    "patient_name": f"Desk {number} patient {n}", "doctor_id": doctor_id,
+                    "time_slot": rng.choice(body["free_slots"])})
+            latencies.append(time.perf_counter() - begin)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run(host, port, concurrency, requests):
+    reader, writer = await asyncio.open_connection(host, port)
+    _, doctors = await call(reader, writer, "GET", "/doctors")
+    writer.close()
+    doctor_ids = [doctor["id"] for doctor in doctors]
+    latencies, statuses = [], {}
+    per_desk = max(1, requests // concurrency)
+    begin = time.perf_counter()
+    await asyncio.gather(*(desk(n, host, port, per_desk, doctor_ids, latencies, statuses)
+                           for n in range(concurrency)))
+    elapsed = time.perf_counter() - begin
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print(f"{len(latencies)} requests from {concurrency} desks in {elapsed:.2f}s: "
+          f"{len(latencies) / elapsed:.0f} req/s")
+    print(f"latency ms  p50 {percentile(0.50):.2f}  p90 {percentile(0.90):.2f}  p99 {percentile(0.99):.2f}")
+    print("status codes", dict(sorted(statuses.items())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test client for the booking service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(run(args.host, args.port, args.concurrency, args.requests))
+
+
+if __name__ == "__main__":
+    main()
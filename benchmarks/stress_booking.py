@@ -0,0 +1,92 @@
+# Multi-threaded booking stress test.
+#
+#   python -m benchmarks.stress_booking --threads 16 --attempts 500
+#
+# Many threads race to book random slots of a few doctors, each thread on its
+# own pooled connection. Afterwards every slot a thread was told it booked
+# must hold that thread's patient (no lost bookings) and no slot may have been
+# reported as booked twice (no double bookings). Exits with status 1 on any
+# mismatch.
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import hospital_core
+from hospital_core import Appointment, BookingResult, Doctor, db, doctor_directory
+from hospital_core.timeslots import to_minutes
+
+
+def worker(number, slots, attempts, wins, errors):
+    rng = random.Random(number)
+    try:
+        for attempt in range(attempts):
+            doctor_id, slot = rng.choice(slots)
+            patient = f"T{number}-{attempt}"
+            if Appointment.book_appointment(patient, doctor_id, slot) is BookingResult.BOOKED:
+                wins.append((doctor_id, slot, patient))
+    except Exception as e:
+        errors.append(e)
+    finally:
+        db.get_pool().release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-threaded booking stress test")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--attempts", type=int, default=500)
+    parser.add_argument("--doctors", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        hospital_core.use_database(os.path.join(folder, "stress.db"))
+        for d in range(args.doctors):
+            Doctor(f"Doctor {d}", "General", None, 1)
+        start = datetime.combine(date.today(), datetime.min.time())
+        slots = [(doctor_id, start + timedelta(hours=i, minutes=j))
+                 for doctor_id in doctor_directory.labels()
+                 for i in range(9, 17) for j in [0, 30]]
+
+        wins, errors = [], []
+        threads = [threading.Thread(target=worker, args=(n, slots, args.attempts, wins, errors))
+                   for n in range(args.threads)]
+        begin = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - begin
+
+        rows = db.get_connection().execute(
+            "SELECT doctor_id, time_slot, patient_name FROM appointment WHERE isBooked != 0").fetchall()
+        hospital_core.close()
+
+    booked = {(doctor_id, slot): patient for doctor_id, slot, patient in rows}
+    claimed = {}
+    problems = [f"error: {e!r}" for e in errors]
+    for doctor_id, slot, patient in wins:
+        key = (doctor_id, to_minutes(slot))
+        if key in claimed:
+            problems.append(f"double booking of {key}: {claimed[key]} and {patient}")
+        claimed[key] = patient
+        if booked.get(key) != patient:
+            problems.append(f"lost booking of {key}: expected {patient}, found {booked.get(key)}")
+    if len(booked) != len(claimed):
+        problems.append(f"{len(booked)} booked rows but {len(claimed)} successful bookings")
+
+    total = args.threads * args.attempts
+    print(f"{args.threads} threads, {total} attempts, {len(claimed)} of {len(slots)} slots booked "
+          f"in {elapsed:.2f}s ({total / elapsed:.0f} attempts/s)")
+    for problem in problems[:20]:
+        print(problem)
+    print("FAILED" if problems else "OK")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
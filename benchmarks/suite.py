@@ -0,0 +1,201 @@
+# Benchmark suite for the booking and reporting hot paths.
+#
+#   python -m benchmarks.suite run --doctors 10 1000 10000 --days 60 -o new.json
+#   python -m benchmarks.suite compare old.json new.json
+#
+# "run" builds a fresh temporary database per size with benchmarks.synthetic
+# and times the operations the front desk uses every day:
+#
+#   startup                  loading the doctor directory and free-slot index
+#   save_in_db               adding a doctor (Doctor(...), with its hours)
+#   add_hours                adding a day of extra hours for an existing doctor
+#   book_appointment         booking a random slot (free or already taken)
+#   view_free_slots          every free slot of a random doctor
+#   view_free_slots_day      the free slots of a random doctor on one day
+#   appointments_page        the first page of the admin listing
+#   view_appointments_of_all_doctors   the full admin listing
+#   search_patients          the first page of a patient name search
+#   search_patients_fuzzy    the same with a misspelt name (similar-name fallback)
+#
+# The results, with the Python and SQLite versions they were measured on, are
+# written as JSON. "compare" matches two result files by operation and size
+# and exits with status 1 when a median got slower than the tolerance allows.
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import hospital_core
+from hospital_core import Admin, Appointment, Doctor, Schedule, availability_index, db, doctor_directory, patient_search
+
+from .synthetic import SLOTS_PER_DAY, generate, patient_name, slot_at
+
+
+def measure(function, count):
+    # Calls function(n) count times and returns the statistics in microseconds
+    timings = []
+    for n in range(count):
+        begin = time.perf_counter()
+        function(n)
+        timings.append((time.perf_counter() - begin) * 1e6)
+    timings.sort()
+    return {
+        "count": count,
+        "min_us": timings[0],
+        "median_us": statistics.median(timings),
+        "mean_us": statistics.fmean(timings),
+        "p90_us": timings[max(0, int(count * 0.9) - 1)],
+        "p99_us": timings[max(0, int(count * 0.99) - 1)],
+    }
+
+
+def run_size(doctors, days, booked, repeats, listing_repeats, seed):
+    # All operations against one freshly generated database
+    results = {}
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as folder:
+        hospital_core.use_database(os.path.join(folder, "bench.db"))
+        begin = time.perf_counter()
+        first_day = date.today()
+        start, doctors, days = generate(doctors, days, booked, seed, first_day)
+        # Indexed here, like at app startup, not by the indexer mid-measurement
+        patient_search.sync()
+        generate_s = time.perf_counter() - begin
+
+        def startup(n):
+            db.run_reset_hooks()
+            doctor_directory.all()
+            availability_index.rebuild()
+
+        def save_in_db(n):
+            Doctor(f"Bench doctor {n}", "General physician", "Female", 10)
+
+        def add_hours(n):
+            day = first_day + timedelta(days=days + n)
+            Schedule.add_hours(rng.randint(1, doctors), "18:00", "20:00", valid_from=day, valid_until=day)
+
+        def book_appointment(n):
+            slot = slot_at(start, rng.randrange(days), rng.randrange(SLOTS_PER_DAY))
+            Appointment.book_appointment(patient_name(rng), rng.randint(1, doctors), slot)
+
+        def view_free_slots(n):
+            Appointment.view_free_slots(rng.randint(1, doctors))
+
+        def view_free_slots_day(n):
+            Appointment.view_free_slots(rng.randint(1, doctors), first_day + timedelta(days=rng.randrange(days)))
+
+        def appointments_page(n):
+            Admin.appointments_page()
+
+        def view_appointments_of_all_doctors(n):
+            Admin.view_appointments_of_all_doctors()
+
+        def search_patients(n):
+            Admin.search_patients(patient_name(rng))
+
+        def search_patients_fuzzy(n):
+            # A doubled letter turns every name into one nobody has
+            name = patient_name(rng)
+            Admin.search_patients(name[:3] + name[2:])
+
+        # Reads first, on the generated data; the writes change it afterwards
+        operations = [
+            (startup, listing_repeats),
+            (view_free_slots, repeats),
+            (view_free_slots_day, repeats),
+            (appointments_page, repeats),
+            (view_appointments_of_all_doctors, listing_repeats),
+            (search_patients, repeats),
+            (search_patients_fuzzy, repeats),
+            (book_appointment, repeats),
+            (add_hours, repeats),
+            (save_in_db, repeats),
+        ]
+        for function, count in operations:
+            results[function.__name__] = measure(function, count)
+        hospital_core.close()
+    return {"doctors": doctors, "days": days, "slots": doctors * days * SLOTS_PER_DAY,
+            "generate_s": generate_s, "operations": results}
+
+
+def run(args):
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "settings": {"days": args.days, "booked": args.booked, "repeats": args.repeats,
+                     "listing_repeats": args.listing_repeats, "seed": args.seed},
+        "sizes": [],
+    }
+    for doctors in args.doctors:
+        size = run_size(doctors, args.days, args.booked, args.repeats, args.listing_repeats, args.seed)
+        report["sizes"].append(size)
+        print(f"{doctors} doctors, {size['slots']} slots (generated in {size['generate_s']:.1f}s)")
+        print(f"  {'operation':<34} {'median us':>12} {'p99 us':>12}")
+        for name, stats in size["operations"].items():
+            print(f"  {name:<34} {stats['median_us']:>12.1f} {stats['p99_us']:>12.1f}")
+    output = args.output or f"bench-{datetime.now():%Y%m%d-%H%M%S}.json"
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"results written to {output}")
+    return 0
+
+
+def load_medians(path):
+    with open(path) as file:
+        report = json.load(file)
+    return {(name, size["doctors"]): stats["median_us"]
+            for size in report["sizes"] for name, stats in size["operations"].items()}
+
+
+def compare(args):
+    old, new = load_medians(args.old), load_medians(args.new)
+    regressions = 0
+    print(f"{'operation':<34} {'doctors':>8} {'old us':>12} {'new us':>12} {'change':>8}")
+    for key in sorted(old.keys() & new.keys()):
+        name, doctors = key
+        change = new[key] / old[key] - 1 if old[key] else 0.0
+        slower = change > args.tolerance
+        regressions += slower
+        print(f"{name:<34} {doctors:>8} {old[key]:>12.1f} {new[key]:>12.1f} {change:>+8.0%}"
+              f"{'  REGRESSION' if slower else ''}")
+    for name, doctors in sorted(old.keys() ^ new.keys()):
+        print(f"{name:<34} {doctors:>8} only in {args.old if (name, doctors) in old else args.new}")
+    print(f"{regressions} regression(s) beyond {args.tolerance:.0%}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite for the booking and reporting hot paths")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="measure and write a JSON result file")
+    run_parser.add_argument("--doctors", type=int, nargs="+", default=[10, 1000, 10000])
+    run_parser.add_argument("--days", type=int, default=60, help="days of slots per doctor")
+    run_parser.add_argument("--booked", type=float, default=0.3, help="share of slots that are booked")
+    run_parser.add_argument("--repeats", type=int, default=200, help="calls per fast operation")
+    run_parser.add_argument("--listing-repeats", type=int, default=3,
+                            help="calls of the full admin listing and of startup")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("-o", "--output", help="result file (default bench-<time>.json)")
+    run_parser.set_defaults(handler=run)
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--tolerance", type=float, default=0.25,
+                                help="allowed slowdown of a median before it counts as a regression")
+    compare_parser.set_defaults(handler=compare)
+    args = parser.parse_args()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+# Synthetic hospital data for benchmarks.
+#
+#   python -m benchmarks.synthetic --doctors 1000 --days 90 big.db
+#
+# Fills a database with doctors, each with the default working hours from
+# today on, and a share of their slots booked over a number of days. The data depends only on
+# the arguments and the seed, so two runs generate the same database. The
+# rows are written with executemany straight into the tables, which is far
+# faster than going through Doctor(...) one doctor at a time.
+
+import argparse
+import random
+from datetime import date
+
+import hospital_core
+from hospital_core import db
+from hospital_core.schedules import DEFAULT_END, DEFAULT_SLOT_MINUTES, DEFAULT_START, EVERY_DAY
+from hospital_core.timeslots import MINUTES_PER_DAY, day_number, to_minutes
+
+
+SPECIALIZATIONS = ["General physician", "Orthopaedic", "Gynaecology", "Cardiology",
+                   "Dermatology", "Neurology", "Paediatrics", "ENT"]
+FIRST_NAMES = ["Asha", "Ravi", "Kiran", "Meena", "Suresh", "Lakshmi", "Arjun", "Divya", "Naveen", "Priya"]
+LAST_NAMES = ["Reddy", "Rao", "Sharma", "Kumar", "Naidu", "Patel", "Gupta", "Verma"]
+
+SLOTS_PER_DAY = (DEFAULT_END - DEFAULT_START) // DEFAULT_SLOT_MINUTES
+
+
+def slot_at(start, day, number):
+    # Epoch minutes of slot number n on the given day after start
+    return start + day * MINUTES_PER_DAY + DEFAULT_START + DEFAULT_SLOT_MINUTES * number
+
+
+def patient_name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def generate(doctors, days, booked=0.3, seed=0, start_date=None):
+    # Fills the current database and returns (start, doctors, days), where
+    # start is the epoch minute of the first day's midnight
+    rng = random.Random(seed)
+    start = to_minutes(start_date or date.today())
+    with db.transaction() as connection:
+        connection.executemany("INSERT INTO doctor (id, name, specialization, gender, exp) VALUES (?, ?, ?, ?, ?)",
+                               ((d, f"Doctor {d}", SPECIALIZATIONS[d % len(SPECIALIZATIONS)],
+                                 rng.choice(["Male", "Female"]), rng.randint(1, 40))
+                                for d in range(1, doctors + 1)))
+        connection.executemany('''INSERT INTO schedule_rule (doctor_id, weekdays, start_minute, end_minute,
+                                                             slot_minutes, valid_from) VALUES (?, ?, ?, ?, ?, ?)''',
+                               ((d, EVERY_DAY, DEFAULT_START, DEFAULT_END, DEFAULT_SLOT_MINUTES, day_number(start))
+                                for d in range(1, doctors + 1)))
+
+        def bookings():
+            for d in range(1, doctors + 1):
+                for day in range(days):
+                    for number in range(SLOTS_PER_DAY):
+                        if rng.random() < booked:
+                            yield d, slot_at(start, day, number), patient_name(rng)
+
+        connection.executemany("INSERT INTO appointment (doctor_id, time_slot, isBooked, patient_name) VALUES (?, ?, 1, ?)",
+                               bookings())
+    return start, doctors, days
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic hospital database")
+    parser.add_argument("path")
+    parser.add_argument("--doctors", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--booked", type=float, default=0.3, help="share of slots that are booked")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    hospital_core.use_database(args.path)
+    generate(args.doctors, args.days, args.booked, args.seed)
+    count = hospital_core.get_connection().execute("SELECT COUNT(*) FROM appointment").fetchone()[0]
+    hospital_core.close()
+    print(f"{args.path}: {args.doctors} doctors, {count} appointments over {args.days} days")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+# Headless core of the Harsha Hospital application.
+# Importing this package does not touch the database or Tk; the connection is
+# opened (and the schema migrated) on the first query.
+
+from .availability import availability_index
+from .db import close, connect, get_connection, use_database
+from .directory import doctor_directory
+from .metrics import metrics
+from .models import Admin, Appointment, BookingResult, CancelResult, Doctor, Harsha_Hospital, Patient, Schedule
+from .records import (AppointmentRecord, BranchAppointmentRecord, BranchDoctorRecord, BranchFreeSlotRecord,
+                      BranchRecord, DoctorRecord, DoctorUsageRecord, FreeSlotRecord, Leave, ReassignmentRecord,
+                      ScheduleBreak, ScheduleRule, SpecializationUsageRecord, WaitlistRecord)
+from .schedules import EVERY_DAY, WEEKDAYS, DoctorSchedule
+from .schema import SCHEMA_VERSION, migrate
+from .seed import seed_demo_data
+from .waitlist import waitlist
@@ -0,0 +1,101 @@
+# Moves past days out of the appointment table.
+#
+#   python -m hospital_core.archive --keep-days 0
+#
+# Booked rows of days before the cutoff are copied to appointment_archive
+# (same ids) and deleted from appointment; rows of freed slots are just
+# deleted, nobody can book them any more. The work is done in batches of
+# BATCH_SIZE rows, one short transaction each, so bookings made meanwhile
+# never wait long for the write lock. A single pass walks the table in id
+# order, so every batch starts where the previous one ended.
+#
+# The listings read the archive only when asked for history, or when their
+# start date reaches back into archived days; see listings.booked_page.
+
+import argparse
+import time
+from datetime import date, timedelta
+
+from . import db
+from .availability import availability_index
+from .timeslots import day_number, format_slot, to_minutes
+
+
+BATCH_SIZE = 5000
+KEEP_DAYS = 0   # past days left in appointment; 0 keeps today onwards
+
+
+class ArchiveReport:
+    def __init__(self, cutoff):
+        self.cutoff = cutoff
+        self.archived = 0
+        self.dropped = 0
+        self.batches = 0
+        self.elapsed = 0.0
+
+    def __str__(self):
+        return (f"before {format_slot(self.cutoff)}: {self.archived} booked appointments archived, "
+                f"{self.dropped} free slots dropped, {self.batches} batches, {self.elapsed:.2f}s")
+
+
+def archived_until():
+    # Epoch minutes just after the latest archived appointment, or None
+    row = db.get_connection().execute("SELECT MAX(time_slot) FROM appointment_archive").fetchone()
+    return None if row[0] is None else row[0] + 1
+
+
+def move_batch(connection, after_id, last_id, cutoff):
+    # Archives the rows with after_id < id <= last_id and time_slot < cutoff;
+    # returns (booked rows archived, rows deleted). replay.py applies
+    # journaled batches with it too.
+    batch = (after_id, last_id, cutoff)
+    archived = connection.execute(
+        '''INSERT INTO appointment_archive (id, doctor_id, time_slot, patient_name, isBooked)
+           SELECT id, doctor_id, time_slot, patient_name, isBooked FROM appointment
+           WHERE id > ? AND id <= ? AND time_slot < ? AND isBooked != 0''', batch).rowcount
+    deleted = connection.execute("DELETE FROM appointment WHERE id > ? AND id <= ? AND time_slot < ?", batch).rowcount
+    return archived, deleted
+
+
+def archive_before(cutoff, batch_size=BATCH_SIZE):
+    # Archives everything with time_slot < cutoff (anything to_minutes accepts)
+    report = ArchiveReport(to_minutes(cutoff))
+    begin = time.perf_counter()
+    last_id = 0
+    while True:
+        with db.transaction() as connection:
+            ids = [row[0] for row in connection.execute(
+                "SELECT id FROM appointment WHERE id > ? AND time_slot < ? ORDER BY id LIMIT ?",
+                (last_id, report.cutoff, batch_size))]
+            if not ids:
+                break
+            archived, deleted = move_batch(connection, last_id, ids[-1], report.cutoff)
+            db.record("archive", after_id=last_id, last_id=ids[-1], cutoff=report.cutoff)
+            report.archived += archived
+            report.dropped += deleted
+            last_id = ids[-1]
+        report.batches += 1
+    report.dropped -= report.archived
+    availability_index.forget_before(day_number(report.cutoff))
+    report.elapsed = time.perf_counter() - begin
+    return report
+
+
+def archive_past_days(keep_days=KEEP_DAYS, batch_size=BATCH_SIZE):
+    # The retention job: archives every day older than keep_days days ago
+    return archive_before(date.today() - timedelta(days=keep_days), batch_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move past days out of the appointment table")
+    parser.add_argument("--keep-days", type=int, default=KEEP_DAYS, help="past days to leave in place")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="rows per transaction")
+    args = parser.parse_args()
+    try:
+        print(archive_past_days(args.keep_days, args.batch_size))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
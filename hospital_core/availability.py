@@ -0,0 +1,183 @@
+import threading
+from datetime import datetime
+
+from . import db
+from .metrics import metrics
+from .schedules import DoctorSchedule, load_schedules
+from .timeslots import MINUTES_PER_DAY, day_number, to_minutes
+
+
+# Free slots listed when no day is asked for, and how far ahead the
+# earliest-slot search looks, in days from today
+BOOKING_DAYS = 28
+SEARCH_DAYS = 366
+
+_NO_SCHEDULE = DoctorSchedule()
+
+
+def _bits(mask):
+    # Positions of the set bits, lowest first
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class AvailabilityIndex:
+    # In-memory view of who is free when. Every doctor's schedule (see
+    # schedules.py) says which slots a day has, and the bookings are kept per
+    # doctor per day as a bitmask of booked start minutes, so a day's free
+    # slots are schedule mask AND NOT booked mask. It is built from the
+    # database on first use and then kept current by the booking code
+    # (write-through): the database stays the authority and is always
+    # written first, the index only answers reads.
+    #
+    # Given schedules and bookings, it is instead a fixed snapshot of them,
+    # as federation.py builds for another branch's database.
+    def __init__(self, schedules=None, booked=None):
+        self._lock = threading.Lock()
+        self._schedules = schedules     # {doctor_id: DoctorSchedule}
+        self._booked = booked           # {doctor_id: {day: booked minutes mask}}
+
+    def _load(self):
+        booked = {}
+        with metrics.operation("availability_index.load"):
+            connection = db.get_connection()
+            schedules = load_schedules(connection)
+            for doctor_id, time_slot in connection.execute(
+                    "SELECT doctor_id, time_slot FROM appointment WHERE isBooked != 0"):
+                day, minute = divmod(time_slot, MINUTES_PER_DAY)
+                days = booked.setdefault(doctor_id, {})
+                days[day] = days.get(day, 0) | 1 << minute
+        return schedules, booked
+
+    def _get(self):
+        booked = self._booked
+        if booked is None:
+            with self._lock:
+                if self._booked is None:
+                    self._schedules, self._booked = self._load()
+                booked = self._booked
+        return self._schedules, booked
+
+    def rebuild(self):
+        with self._lock:
+            self._schedules, self._booked = self._load()
+
+    def reset(self):
+        # Drops the index; it is rebuilt from the database on next use
+        with self._lock:
+            self._schedules = self._booked = None
+
+    def reload_schedule(self, doctor_id):
+        # Called after the doctor's schedule rows changed
+        if self._booked is None:
+            return
+        schedule = load_schedules(db.get_connection(), doctor_id).get(doctor_id)
+        with self._lock:
+            if self._schedules is not None:
+                if schedule is None:
+                    self._schedules.pop(doctor_id, None)
+                else:
+                    self._schedules[doctor_id] = schedule
+
+    def schedule(self, doctor_id):
+        return self._get()[0].get(doctor_id, _NO_SCHEDULE)
+
+    def _update(self, doctor_id, time_slot, booked):
+        day, minute = divmod(to_minutes(time_slot), MINUTES_PER_DAY)
+        days = self._get()[1]
+        with self._lock:
+            doctor_days = days.setdefault(doctor_id, {})
+            mask = doctor_days.get(day, 0)
+            mask = mask | 1 << minute if booked else mask & ~(1 << minute)
+            if mask:
+                doctor_days[day] = mask
+            else:
+                doctor_days.pop(day, None)
+
+    def mark_booked(self, doctor_id, time_slot):
+        self._update(doctor_id, time_slot, True)
+
+    def mark_free(self, doctor_id, time_slot):
+        self._update(doctor_id, time_slot, False)
+
+    def mark_booked_many(self, slots):
+        # mark_booked for many (doctor_id, time_slot) pairs, under one lock
+        days = self._get()[1]
+        with self._lock:
+            for doctor_id, time_slot in slots:
+                day, minute = divmod(to_minutes(time_slot), MINUTES_PER_DAY)
+                doctor_days = days.setdefault(doctor_id, {})
+                doctor_days[day] = doctor_days.get(day, 0) | 1 << minute
+
+    def forget_doctor(self, doctor_id):
+        schedules, booked = self._get()
+        with self._lock:
+            schedules.pop(doctor_id, None)
+            booked.pop(doctor_id, None)
+
+    def forget_before(self, day):
+        # Drops the bookings of days before day number day, once archived
+        with self._lock:
+            if self._booked is None:
+                return
+            for days in self._booked.values():
+                for old in [old for old in days if old < day]:
+                    del days[old]
+
+    def has_slot(self, doctor_id, time_slot):
+        # Whether the doctor's schedule has a slot starting then
+        day, minute = divmod(to_minutes(time_slot), MINUTES_PER_DAY)
+        return bool(self.schedule(doctor_id).day_mask(day) >> minute & 1)
+
+    def free_mask(self, doctor_id, day):
+        schedules, booked = self._get()
+        slots = schedules.get(doctor_id, _NO_SCHEDULE).day_mask(day)
+        return slots & ~booked.get(doctor_id, {}).get(day, 0) if slots else 0
+
+    def is_free(self, doctor_id, time_slot):
+        day, minute = divmod(to_minutes(time_slot), MINUTES_PER_DAY)
+        return bool(self.free_mask(doctor_id, day) >> minute & 1)
+
+    def free_slots(self, doctor_id, day=None):
+        # Free slots as epoch minutes in time order: those of one day (a date
+        # or "YYYY-MM-DD"), or by default those not yet started in the next
+        # BOOKING_DAYS days
+        if day is not None:
+            day = day_number(day)
+            return [day * MINUTES_PER_DAY + minute for minute in _bits(self.free_mask(doctor_id, day))]
+        now = to_minutes(datetime.now())
+        first_day = now // MINUTES_PER_DAY
+        result = []
+        for slot_day in range(first_day, first_day + BOOKING_DAYS):
+            start = slot_day * MINUTES_PER_DAY
+            result.extend(start + minute for minute in _bits(self.free_mask(doctor_id, slot_day))
+                          if start + minute >= now)
+        return result
+
+    def next_free(self, doctor_id, start, days=SEARCH_DAYS):
+        # The doctor's first free slot starting at or after start (epoch
+        # minutes) within the given number of days, or None
+        schedules, booked = self._get()
+        schedule = schedules.get(doctor_id)
+        if schedule is None:
+            return None
+        booked_days = booked.get(doctor_id, {})
+        first_day, minute_of_day = divmod(start, MINUTES_PER_DAY)
+        for day in range(first_day, first_day + days):
+            free = schedule.day_mask(day)
+            if free:
+                free &= ~booked_days.get(day, 0)
+                if day == first_day:
+                    # Slots of the first day that start before start are skipped
+                    free &= -1 << minute_of_day
+                if free:
+                    return day * MINUTES_PER_DAY + (free & -free).bit_length() - 1
+        return None
+
+
+availability_index = AvailabilityIndex()
+
+# A rolled back transaction or a different database invalidates the index
+db.add_reset_hook(availability_index.reset)
@@ -0,0 +1,100 @@
+import json
+import logging
+import os
+
+from . import db
+from .records import BranchRecord
+
+
+# The branches of the hospital. Every branch has its own database file and
+# runs its own app or service, started for one branch with HARSHA_BRANCH (or
+# use_branch()); head office queries all of them at once with federation.py.
+#
+# The branches are listed in a JSON file, HARSHA_BRANCHES (default
+# branches.json), in the order head office shows them:
+#
+#   [{"id": "nirmal", "name": "Harsha Multi Speciality Hospital",
+#     "address": "Doctors Lane, Nirmal, Telangana", "database": "nirmal.db"},
+#    {"id": "adilabad", ...}]
+#
+# Relative database paths are relative to the file. Without the file there
+# is one branch, the original hospital, on the HARSHA_DB database.
+
+BRANCHES_PATH = os.environ.get("HARSHA_BRANCHES", "branches.json")
+BRANCH_ID = os.environ.get("HARSHA_BRANCH") or None
+
+DEFAULT_ID = "nirmal"
+DEFAULT_NAME = "Harsha Multi Speciality Hospital"
+DEFAULT_ADDRESS = "Doctors Lane, Nirmal, Telangana"
+
+FIELDS = ("id", "name", "address", "database")
+
+log = logging.getLogger(__name__)
+
+_current = None
+
+
+def load(path=None):
+    # The listed branches as BranchRecords, in file order; raises ValueError
+    # for a malformed file
+    path = path or BRANCHES_PATH
+    if not os.path.exists(path):
+        return [BranchRecord(DEFAULT_ID, DEFAULT_NAME, DEFAULT_ADDRESS, db.DB_PATH)]
+    with open(path, encoding="utf-8") as file:
+        try:
+            entries = json.load(file)
+        except ValueError as e:
+            raise ValueError(f"{path}: {e}") from None
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"{path}: expected a list of branches")
+    folder = os.path.dirname(os.path.abspath(path))
+    branches = []
+    for number, entry in enumerate(entries, 1):
+        missing = [field for field in FIELDS if not isinstance(entry, dict) or not entry.get(field)]
+        if missing:
+            raise ValueError(f"{path}: branch {number} has no {', '.join(missing)}")
+        branches.append(BranchRecord(str(entry["id"]), entry["name"], entry["address"],
+                                     os.path.join(folder, entry["database"])))
+    ids = [branch.id for branch in branches]
+    if len(set(ids)) < len(ids):
+        raise ValueError(f"{path}: branch ids must be unique")
+    return branches
+
+
+def get(branch_id, path=None):
+    for branch in load(path):
+        if branch.id == branch_id:
+            return branch
+    raise ValueError(f"No branch {branch_id!r}")
+
+
+def use_branch(branch_id, path=None):
+    # Switches this process to the branch's database; returns its BranchRecord
+    global _current
+    branch = get(branch_id, path)
+    db.use_database(branch.database)
+    _current = branch
+    return branch
+
+
+def use_configured_branch():
+    # Entry points call this at startup: switches to HARSHA_BRANCH, if set
+    if BRANCH_ID is not None:
+        return use_branch(BRANCH_ID)
+    return current()
+
+
+def current():
+    # The branch this process serves: the one switched to, else the listed
+    # branch whose database is open, else the original hospital
+    if _current is not None and os.path.abspath(_current.database) == os.path.abspath(db.DB_PATH):
+        return _current
+    try:
+        listed = load()
+    except ValueError as e:
+        log.warning("ignoring the branch list: %s", e)
+        listed = []
+    for branch in listed:
+        if os.path.abspath(branch.database) == os.path.abspath(db.DB_PATH):
+            return branch
+    return BranchRecord(DEFAULT_ID, DEFAULT_NAME, DEFAULT_ADDRESS, db.DB_PATH)
@@ -0,0 +1,352 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+
+from . import journal
+from .metrics import metrics
+from .schema import migrate
+
+
+# The database file can be changed with the HARSHA_DB environment variable,
+# or from code with use_database() before the first query runs.
+DB_PATH = os.environ.get("HARSHA_DB", "Harsha_Hospital2.db")
+
+# In-memory mode (HARSHA_IN_MEMORY=1, or use_database(path, in_memory=True))
+# for kiosks and demos: the file is copied into memory at startup, every
+# query runs there, and the memory copy is written back to the file every
+# BACKUP_INTERVAL seconds and on close(). BACKUP_INTERVAL is the durability
+# window: a crash loses at most that many seconds of bookings.
+IN_MEMORY = os.environ.get("HARSHA_IN_MEMORY", "") not in ("", "0")
+BACKUP_INTERVAL = float(os.environ.get("HARSHA_BACKUP_INTERVAL", "10"))
+BACKUP_PAGES = 256          # pages copied per backup step; writers get in between steps
+
+# Every change is also written to an operation journal (see journal.py and
+# replay.py) when HARSHA_JOURNAL names its file, or after use_journal(path).
+JOURNAL_PATH = os.environ.get("HARSHA_JOURNAL") or None
+
+# Connection settings shared by every connection the pool opens
+BUSY_TIMEOUT = 10.0         # seconds a writer waits for a lock before failing
+CACHED_STATEMENTS = 256     # prepared statements kept per connection
+
+
+log = logging.getLogger(__name__)
+
+
+def connect(path=None):
+    path = path or DB_PATH
+    connection = sqlite3.connect(path, isolation_level=None, timeout=BUSY_TIMEOUT, uri=path.startswith("file:"),
+                                 cached_statements=CACHED_STATEMENTS, check_same_thread=False)
+    # WAL lets readers run while one thread writes; NORMAL sync is safe with WAL
+    # and only skips the fsync on every commit, not on checkpoints. (An
+    # in-memory database keeps its journal in memory and ignores both.)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    metrics.install(connection)
+    migrate(connection)
+    return connection
+
+
+class ConnectionPool:
+    # Hands out one connection per thread. sqlite3 connections must not be
+    # shared between threads that use them at the same time, so every thread
+    # (Tk main loop, worker, HTTP executor, ...) gets its own.
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = {}
+
+    def connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # The lock keeps two threads from migrating the schema at once
+            with self._lock:
+                connection = connect(self.path)
+                self._connections[threading.get_ident()] = connection
+            self._local.connection = connection
+        return connection
+
+    def release(self):
+        # Closes the calling thread's connection; worker threads call this on exit
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            self._local.connection = None
+            with self._lock:
+                self._connections.pop(threading.get_ident(), None)
+            connection.close()
+
+    def close_all(self):
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections.clear()
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+
+
+class MemoryDatabase:
+    # The working copy of a database file in memory, shared by all the
+    # pool's connections. It uses SQLite's memdb VFS, so the connections lock
+    # each other like connections to a file do (and wait BUSY_TIMEOUT), and
+    # it lives as long as the connection kept here. save() writes it back
+    # with the online backup API, a few pages per step so bookings are not
+    # held up while it runs. Only this process may write to the file while
+    # it is in use; anything else written there is overwritten by the next
+    # save.
+    def __init__(self, path, interval=None):
+        self.path = path
+        self.interval = BACKUP_INTERVAL if interval is None else interval
+        self.uri = f"file:/harsha-{os.getpid()}-{id(self)}?vfs=memdb"
+        self._keeper = sqlite3.connect(self.uri, uri=True, isolation_level=None, check_same_thread=False)
+        if os.path.exists(path):
+            self._load()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.saves = 0
+        self.last_save = None   # time.time() of the last completed save
+
+    def _load(self):
+        # A file in WAL mode says so in its header, and a database with that
+        # header cannot be opened in memory, so the header bytes are set back
+        # to the rollback journal format on a private copy before it is
+        # copied into the shared one
+        with closing(sqlite3.connect(self.path, timeout=BUSY_TIMEOUT)) as disk:
+            image = bytearray(disk.serialize())
+        if len(image) >= 20:
+            image[18] = image[19] = 1
+        with closing(sqlite3.connect(":memory:")) as private:
+            private.deserialize(bytes(image))
+            private.backup(self._keeper)
+
+    def save(self):
+        # Copies the memory database to the file; returns the seconds it took
+        begin = time.perf_counter()
+        with self._lock, metrics.operation("db.backup"):
+            with closing(sqlite3.connect(self.path, timeout=BUSY_TIMEOUT)) as disk:
+                self._keeper.backup(disk, pages=BACKUP_PAGES)
+            self.saves += 1
+            self.last_save = time.time()
+        return time.perf_counter() - begin
+
+    def start(self):
+        # Saves every interval seconds from a background thread
+        if self._thread is not None or self.interval <= 0:
+            return
+
+        def run():
+            while not self._stop.wait(self.interval):
+                try:
+                    self.save()
+                except sqlite3.Error as e:
+                    log.warning("could not back up the database to %s: %s", self.path, e)
+
+        self._thread = threading.Thread(target=run, name="db-backup", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        # Stops the timer, saves one last time and drops the memory copy
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        try:
+            self.save()
+        finally:
+            self._keeper.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_memory = None      # the MemoryDatabase in in-memory mode
+_journal = None     # the Journal when journaling is on
+
+# Changes recorded by the transaction open on each thread's connection
+_local = threading.local()
+# Held by the thread with a write transaction open. The threads of this
+# process queue for it and are woken as soon as it is free, instead of
+# polling SQLite's lock with the sleeps of its busy handler; it also keeps
+# the journal in commit order.
+_write_lock = threading.Lock()
+
+# In-memory caches register here to be dropped when a transaction rolls back
+# or the database is switched, so they never outlive the data they mirror.
+_reset_hooks = []
+
+
+def add_reset_hook(hook):
+    _reset_hooks.append(hook)
+
+
+def run_reset_hooks():
+    for hook in _reset_hooks:
+        hook()
+
+
+# Called after every committed write transaction, on the committing thread
+# while it still holds the write lock, so they must be quick (patient_search
+# only wakes its indexer).
+_commit_hooks = []
+
+
+def add_commit_hook(hook):
+    _commit_hooks.append(hook)
+
+
+def get_pool():
+    global _pool, _memory, _journal
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                if IN_MEMORY:
+                    _memory = MemoryDatabase(DB_PATH)
+                    pool = ConnectionPool(_memory.uri)
+                    # Migrate before the first backup can write the file
+                    pool.connection()
+                    _memory.start()
+                else:
+                    pool = ConnectionPool(DB_PATH)
+                if JOURNAL_PATH:
+                    _journal = _open_journal(pool)
+                _pool = pool
+    return _pool
+
+
+def _open_journal(pool):
+    # Nothing can write before the pool is handed out, so a new journal's
+    # base is the database as the first journaled change finds it
+    opened = journal.Journal(JOURNAL_PATH)
+    try:
+        if opened.seq == 0:
+            opened.start(pool.connection(), DB_PATH)
+        elif opened.database() != os.path.abspath(DB_PATH):
+            raise ValueError(f"{JOURNAL_PATH} is the journal of {opened.database()}, not of {DB_PATH}")
+    except BaseException:
+        opened.close()
+        pool.close_all()
+        raise
+    return opened
+
+
+def memory_database():
+    # The MemoryDatabase in in-memory mode, otherwise None
+    get_pool()
+    return _memory
+
+
+def current_journal():
+    # The Journal when journaling is on, otherwise None
+    get_pool()
+    return _journal
+
+
+def get_connection():
+    return get_pool().connection()
+
+
+def get_cursor():
+    return get_connection().cursor()
+
+
+def _changes():
+    changes = getattr(_local, "changes", None)
+    if changes is None:
+        changes = _local.changes = []
+    return changes
+
+
+def record(op, **fields):
+    # Journals a change made by the open transaction: it is written when the
+    # transaction commits and dropped if it rolls back. Does nothing when
+    # journaling is off.
+    if _journal is not None:
+        if not get_connection().in_transaction:
+            raise RuntimeError("db.record() needs an open transaction")
+        _changes().append({"op": op, **fields})
+
+
+@contextmanager
+def transaction():
+    # Runs the block in one write transaction on this thread's connection.
+    # Nested use becomes a savepoint, so an error inside it undoes only the
+    # inner block and the outer transaction can carry on. With journaling on,
+    # returning from the block also waits until its changes are in the journal
+    # on disk.
+    connection = get_connection()
+    changes = _changes()
+    if connection.in_transaction:
+        recorded = len(changes)
+        connection.execute("SAVEPOINT nested")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK TO nested")
+            connection.execute("RELEASE nested")
+            del changes[recorded:]
+            run_reset_hooks()
+            raise
+        connection.execute("RELEASE nested")
+        return
+    if not _write_lock.acquire(timeout=BUSY_TIMEOUT):
+        raise sqlite3.OperationalError("database is locked")
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            run_reset_hooks()
+            raise
+        connection.execute("COMMIT")
+        writer = _journal if changes else None
+        if writer is not None:
+            seq = writer.append(changes)
+        for hook in _commit_hooks:
+            hook()
+    finally:
+        del changes[:]
+        _write_lock.release()
+    # Other threads commit while this one waits, and their changes go to
+    # disk with the next fsync
+    if writer is not None:
+        writer.wait(seq)
+
+
+def use_database(path, in_memory=None):
+    # in_memory switches in-memory mode on or off; None keeps the current mode
+    global DB_PATH, IN_MEMORY
+    close()
+    DB_PATH = path
+    if in_memory is not None:
+        IN_MEMORY = in_memory
+    return get_connection()
+
+
+def use_journal(path):
+    # Journals every change to path from now on; None turns journaling off
+    global JOURNAL_PATH
+    close()
+    JOURNAL_PATH = path
+
+
+def close():
+    # Closes every connection; in in-memory mode this also writes the
+    # database back to its file
+    global _pool, _memory, _journal
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close_all()
+            _pool = None
+        memory, _memory = _memory, None
+        writer, _journal = _journal, None
+    try:
+        if writer is not None:
+            writer.close()
+        if memory is not None:
+            memory.close()
+    finally:
+        run_reset_hooks()
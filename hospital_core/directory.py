@@ -0,0 +1,80 @@
+import threading
+
+from . import db
+from .metrics import metrics
+from .records import DoctorRecord
+
+
+def display_name(doctor):
+    # The label doctors are shown and picked by in menus and the login screen
+    return f"{doctor.id} Dr. {doctor.name}, {doctor.specialization} "
+
+
+class _Snapshot:
+    # Lookup tables built from one read of the doctor table; never modified
+    def __init__(self, doctors):
+        self.doctors = doctors
+        self.by_id = {doctor.id: doctor for doctor in doctors}
+        self.by_name = {doctor.name: doctor for doctor in doctors}
+        self.by_label = {display_name(doctor): doctor for doctor in doctors}
+        self.labels = {doctor.id: display_name(doctor) for doctor in doctors}
+        self.by_specialization = {}
+        for doctor in doctors:
+            self.by_specialization.setdefault(doctor.specialization, []).append(doctor)
+
+
+class DoctorDirectory:
+    # Cached copy of the doctors on staff (not the ones who left) with
+    # lookups by id, name, menu label and specialization. It is loaded from
+    # the database on first use and dropped whenever a doctor is added or
+    # leaves, so the next lookup reloads it. version changes on every reload
+    # so that screens can tell when their menus are out of date.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self.version = 0
+
+    def _get(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    with metrics.operation("doctor_directory.load"):
+                        cursor = db.get_cursor()
+                        cursor.execute('''SELECT id, name, specialization, gender, exp FROM doctor
+                                          WHERE left_on IS NULL ORDER BY id''')
+                        self._snapshot = _Snapshot([DoctorRecord._make(row) for row in cursor.fetchall()])
+                    self.version += 1
+                snapshot = self._snapshot
+        return snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+    def all(self):
+        return self._get().doctors
+
+    def get(self, doctor_id):
+        return self._get().by_id.get(doctor_id)
+
+    def by_name(self, name):
+        return self._get().by_name.get(name)
+
+    def by_label(self, label):
+        return self._get().by_label.get(label)
+
+    def by_specialization(self, specialization):
+        return self._get().by_specialization.get(specialization, [])
+
+    def specializations(self):
+        return sorted(self._get().by_specialization)
+
+    def labels(self):
+        # {id: menu label} of every doctor, in id order
+        return self._get().labels
+
+
+doctor_directory = DoctorDirectory()
+
+db.add_reset_hook(doctor_directory.invalidate)
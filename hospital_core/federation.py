@@ -0,0 +1,243 @@
+# Head-office queries over every branch of the hospital at once.
+#
+#   python -m hospital_core.federation doctors
+#   python -m hospital_core.federation appointments --start 2024-06-01 --end 2024-06-08
+#   python -m hospital_core.federation earliest-slots Cardiology --limit 5
+#
+# Every branch keeps its own database (see branches.py) and nothing is
+# copied between them. A query runs on all the branch files at once, one
+# pool thread per branch, over read-only connections (WAL lets them read
+# while the branch's own app or service writes), and the per-branch results,
+# each already in order, are merged with heapq.merge. SQLite releases the GIL
+# while it reads, so with cores (or disks) to spare a query takes about as
+# long as its slowest branch rather than the sum of them all.
+#
+# Listings are keyset pages like those of listings.py, in (time_slot, branch
+# id, id) order with that as the cursor. Each branch reads one page past the
+# cursor and the merge keeps the first `limit` rows, so any page reads at
+# most `limit` rows per branch.
+#
+# The earliest-slot search runs the search.py merge on each branch over a
+# snapshot of the specialization's schedules and bookings, reading bookings
+# only for the first SEARCH_WINDOW days and more days only while those have
+# too few free slots; the branches' lists are then merged.
+#
+# The connections do not migrate: the branches must be on the schema
+# version of this code, which their own app or service upgrades them to.
+
+import argparse
+import heapq
+import os
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+from urllib.request import pathname2url
+
+from . import branches, db, formatting, listings
+from .availability import SEARCH_DAYS, AvailabilityIndex
+from .metrics import metrics
+from .records import BranchAppointmentRecord, BranchDoctorRecord, BranchFreeSlotRecord, DoctorRecord
+from .schedules import load_schedules
+from .search import merge_free_slots
+from .timeslots import MINUTES_PER_DAY, format_slot, to_minutes
+
+
+PAGE_SIZE = listings.PAGE_SIZE
+SEARCH_WINDOW = 2       # days of bookings read first by the earliest-slot search; widened 4x at a time
+
+
+def _branch_after(after, branch_id):
+    # The (time_slot, id) cursor within one branch for a (time_slot, branch,
+    # id) cursor: that branch continues after the row, earlier branches
+    # after the row's time and later branches from its time on
+    if after is None:
+        return None
+    time_slot, after_branch, after_id = after
+    if branch_id < after_branch:
+        return time_slot, sys.maxsize
+    if branch_id == after_branch:
+        return time_slot, after_id
+    return time_slot - 1, sys.maxsize
+
+
+def _doctors(branch, connection, specialization):
+    where, params = ("AND specialization = ?", (specialization,)) if specialization is not None else ("", ())
+    return [BranchDoctorRecord(branch.id, *row) for row in connection.execute(
+        f'''SELECT id, name, specialization, gender, exp FROM doctor
+            WHERE left_on IS NULL {where} ORDER BY id''', params)]
+
+
+def _appointments(branch, connection, start, end, specialization, after, limit, history):
+    rows, _ = listings.booked_page(start, end, None, specialization, _branch_after(after, branch.id), limit,
+                                   history, connection)
+    return [BranchAppointmentRecord(branch.id, *row) for row in rows]
+
+
+def _earliest_slots(branch, connection, specialization, start, limit):
+    # The branch's `limit` earliest free slots from start, read in one
+    # transaction so the schedules and bookings agree
+    connection.execute("BEGIN")
+    try:
+        doctors = [DoctorRecord._make(row) for row in connection.execute(
+            '''SELECT id, name, specialization, gender, exp FROM doctor
+               WHERE specialization = ? AND left_on IS NULL ORDER BY id''', (specialization,))]
+        if not doctors:
+            return []
+        schedules = load_schedules(connection, specialization=specialization)
+        first_day = start // MINUTES_PER_DAY
+        window = SEARCH_WINDOW
+        while True:
+            end_day = first_day + window
+            booked = {}
+            for doctor_id, time_slot in connection.execute(
+                    '''SELECT doctor_id, time_slot FROM appointment
+                       WHERE doctor_id IN (SELECT id FROM doctor WHERE specialization = ? AND left_on IS NULL)
+                       AND time_slot >= ? AND time_slot < ? AND isBooked != 0''',
+                    (specialization, start, end_day * MINUTES_PER_DAY)):
+                day, minute = divmod(time_slot, MINUTES_PER_DAY)
+                days = booked.setdefault(doctor_id, {})
+                days[day] = days.get(day, 0) | 1 << minute
+            slots = merge_free_slots(doctors, AvailabilityIndex(schedules, booked), start, limit, end_day)
+            if len(slots) == limit or window >= SEARCH_DAYS:
+                return [BranchFreeSlotRecord(branch.id, *slot) for slot in slots]
+            window = min(window * 4, SEARCH_DAYS)
+    finally:
+        connection.execute("COMMIT")
+
+
+class Federation:
+    # Read-only queries over the databases of the given branches (default:
+    # every listed branch, see branches.load()). Thread-safe; close() when done.
+    def __init__(self, branch_list=None, workers=None):
+        self.branches = list(branches.load() if branch_list is None else branch_list)
+        if not self.branches:
+            raise ValueError("No branches to query")
+        self._executor = ThreadPoolExecutor(max_workers=workers or len(self.branches),
+                                            thread_name_prefix="federation")
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def _connection(self, branch):
+        # This thread's read-only connection to the branch's database
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+        connection = connections.get(branch.id)
+        if connection is None:
+            uri = f"file:{pathname2url(os.path.abspath(branch.database))}?mode=ro"
+            connection = sqlite3.connect(uri, uri=True, isolation_level=None, timeout=db.BUSY_TIMEOUT,
+                                         cached_statements=db.CACHED_STATEMENTS, check_same_thread=False)
+            metrics.install(connection)
+            with self._lock:
+                self._connections.append(connection)
+            connections[branch.id] = connection
+        return connection
+
+    def _fan_out(self, function, *args):
+        # [function(branch, connection, *args) for every branch], run on all
+        # of them at once; a failing branch fails the query, naming it
+        def run(branch):
+            with metrics.operation(f"federation.branch.{branch.id}"):
+                try:
+                    return function(branch, self._connection(branch), *args)
+                except sqlite3.Error as e:
+                    raise type(e)(f"branch {branch.id}: {e}") from e
+
+        return list(self._executor.map(run, self.branches))
+
+    def doctors(self, specialization=None):
+        # Doctors on staff at every branch, or those of one specialization,
+        # as BranchDoctorRecords in branch order, then by id
+        return [doctor for found in self._fan_out(_doctors, specialization) for doctor in found]
+
+    def specializations(self):
+        # Specializations that have doctors at any branch, in name order
+        return sorted({doctor.specialization for doctor in self.doctors()})
+
+    def appointments_page(self, start=None, end=None, specialization=None, after=None, limit=PAGE_SIZE,
+                          history=False):
+        # One page of booked appointments of every branch, as
+        # BranchAppointmentRecords in (time_slot, branch, id) order; the
+        # filters are those of listings.booked_page, and after is the cursor
+        # of the last row shown. Returns (rows, cursor); cursor is None after
+        # the last page.
+        pages = self._fan_out(_appointments, start, end, specialization, after, limit, history)
+        rows = list(islice(heapq.merge(*pages, key=BranchAppointmentRecord.cursor.fget), limit))
+        if len(rows) < limit:
+            return rows, None
+        return rows, rows[-1].cursor
+
+    def iter_appointments(self, start=None, end=None, specialization=None, page_size=PAGE_SIZE, history=False):
+        # Streams every matching row, holding only one page in memory
+        after = None
+        while True:
+            rows, after = self.appointments_page(start, end, specialization, after, page_size, history)
+            yield from rows
+            if after is None:
+                return
+
+    def earliest_slots(self, specialization, limit=5, after=None):
+        # The `limit` earliest free slots starting at or after `after`
+        # (default now) among the doctors of the specialization at every
+        # branch, as BranchFreeSlotRecords in time order; ties go to the
+        # lower branch id, then the lower doctor id
+        start = to_minutes(after if after is not None else datetime.now())
+        found = self._fan_out(_earliest_slots, specialization, start, limit)
+        return list(islice(heapq.merge(*found, key=lambda slot: (slot.time_slot, slot.branch, slot.doctor_id)),
+                           limit))
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+
+
+metrics.instrument(Federation)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query every branch of the hospital at once")
+    parser.add_argument("--branches", default=branches.BRANCHES_PATH,
+                        help="branch list (default HARSHA_BRANCHES or branches.json)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    doctors_parser = commands.add_parser("doctors", help="doctors on staff at every branch")
+    doctors_parser.add_argument("--specialization")
+    listing_parser = commands.add_parser("appointments", help="booked appointments of every branch, in time order")
+    listing_parser.add_argument("--start", help="YYYY-MM-DD[ HH:MM]")
+    listing_parser.add_argument("--end", help="YYYY-MM-DD[ HH:MM], not included")
+    listing_parser.add_argument("--specialization")
+    listing_parser.add_argument("--history", action="store_true", help="include archived appointments")
+    slots_parser = commands.add_parser("earliest-slots", help="earliest free slots of a specialization")
+    slots_parser.add_argument("specialization")
+    slots_parser.add_argument("--limit", type=int, default=5)
+    slots_parser.add_argument("--after", help="YYYY-MM-DD[ HH:MM] (default now)")
+    args = parser.parse_args()
+    try:
+        federation = Federation(branches.load(args.branches))
+    except ValueError as e:
+        sys.exit(f"error: {e}")
+    try:
+        if args.command == "doctors":
+            for doctor in federation.doctors(args.specialization):
+                print(f"{doctor.branch} \t {doctor.id} \t Dr.{doctor.name} \t {doctor.specialization}")
+        elif args.command == "appointments":
+            print("\n".join(formatting.branch_listing_header))
+            for row in federation.iter_appointments(args.start, args.end, args.specialization, history=args.history):
+                print(formatting.branch_listing_line(row))
+        else:
+            for slot in federation.earliest_slots(args.specialization, args.limit, args.after):
+                print(f"{slot.branch} \t {format_slot(slot.time_slot)} \t Dr.{slot.doctor_name}")
+    except (sqlite3.Error, ValueError) as e:
+        sys.exit(f"error: {e}")
+    finally:
+        federation.close()
+
+
+if __name__ == "__main__":
+    main()
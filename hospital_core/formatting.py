@@ -0,0 +1,43 @@
+from .timeslots import format_slot
+
+
+# Presentation of query results for the Tk text views. Query methods return
+# records; turning them into display strings happens only here, and only for
+# the rows actually shown.
+
+doctor_listing_header = ["\t\t\t\t\t\tTIME SLOT \t\t\t PATIENT NAME ",
+                         "\t\t\t\t\t\t*********** \t\t\t ***********"]
+
+admin_listing_header = ["TIME SLOT \t\t\t PATIENT NAME \t\t\t DOCTOR NAME",
+                        "*********** \t\t\t *********** \t\t\t ***********"]
+
+
+def doctor_listing_line(record):
+    return f"\t\t\t\t\t\t{format_slot(record.time_slot)} \t\t\t  {record.patient_name}"
+
+
+def admin_listing_line(record):
+    return f"{format_slot(record.time_slot)} \t\t\t {record.patient_name} \t\t\t Dr.{record.doctor_name}"
+
+
+branch_listing_header = ["BRANCH \t\t " + admin_listing_header[0], "****** \t\t " + admin_listing_header[1]]
+
+
+def branch_listing_line(record):
+    return f"{record.branch} \t\t {admin_listing_line(record)}"
+
+
+specialization_usage_header = ["SPECIALIZATION \t\t DOCTORS \t BOOKED / SLOTS \t FULL",
+                               "************** \t\t ******* \t ************** \t ****"]
+
+doctor_usage_header = ["DOCTOR NAME \t\t\t BOOKED / SLOTS \t FULL",
+                       "*********** \t\t\t ************** \t ****"]
+
+
+def specialization_usage_line(record):
+    return (f"{record.specialization} \t\t {record.doctors} \t\t {record.booked} / {record.capacity} "
+            f"\t\t {record.utilization:.0%}")
+
+
+def doctor_usage_line(record):
+    return f"Dr.{record.doctor_name} \t\t\t {record.booked} / {record.capacity} \t\t {record.utilization:.0%}"
@@ -0,0 +1,190 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from .metrics import metrics
+
+
+# Append-only journal of every change made to the database: an audit trail,
+# and what replay.py rebuilds or checks the database from.
+#
+# Each line is one JSON object with the sequence number ("seq"), the time of
+# the commit ("at", Unix seconds), the operation ("op") and the values it
+# wrote, row ids included, so that replaying the lines in order gives the
+# same rows. Model code adds its changes with db.record() inside its
+# transaction; they reach the journal only if the transaction commits, and
+# in commit order.
+#
+# Writes use group commit. A committing thread queues its lines and waits
+# until they are on disk. The first thread to wait while no write is running
+# writes everything queued so far and syncs it with one fsync, for itself
+# and for every thread that queued lines in the meantime; threads that queue
+# lines during that fsync are covered by the next one. Under load one fsync
+# covers many operations instead of one per booking as with PRAGMA
+# synchronous=FULL, and a booking that returned is never lost.
+#
+# With a single writer there is nothing to group: every commit waits for its
+# own fsync, on top of a commit that SQLite did not sync, and journaling
+# costs about as much as synchronous=FULL or a little more (see
+# benchmarks/bench_journal.py). It pays off with concurrent writers, and the
+# audit trail and replay come with it either way. To keep the single fsync
+# cheap, the file is extended PREALLOCATE bytes at a time ahead of the
+# records, so most syncs write only data and not a new file size; the
+# unused zero bytes at the end are cut off on close() and ignored by read().
+#
+# A new journal starts with a copy of the database as it was then, in
+# base_path(path), and a first record naming the database file; the journal
+# holds the changes since, and cannot be opened for another database. A
+# crash can leave the last line half written: it is cut off when the journal
+# is opened again and skipped by read(). Only this process may write to the
+# database while the journal is open, or the other writer's changes are
+# missing from it.
+
+log = logging.getLogger(__name__)
+
+# Syncs the data and the file size, not the other metadata, where it can
+_sync = getattr(os, "fdatasync", os.fsync)
+# Reserves file space without writing it, where the system can
+_preallocate = getattr(os, "posix_fallocate", None)
+
+PREALLOCATE = 1 << 20
+
+
+def base_path(path):
+    return path + ".base"
+
+
+def read(path):
+    # The records of the journal as dicts, in order
+    with open(path, "rb") as file:
+        for number, line in enumerate(file, 1):
+            if not line.endswith(b"\n"):
+                if line.strip(b"\0"):
+                    log.warning("%s:%d: skipping a half written last record", path, number)
+                return
+            try:
+                yield json.loads(line)
+            except ValueError:
+                raise ValueError(f"{path}:{number}: not a journal record") from None
+
+
+class Journal:
+    def __init__(self, path):
+        self.path = path
+        self.seq = self._recover()      # number of the last record handed over
+        self.durable = self.seq         # number of the last record on disk
+        self.groups = 0
+        self.records = 0
+        self._file = open(path, "r+b" if os.path.exists(path) else "w+b")
+        self._size = self._file.seek(0, os.SEEK_END)   # end of the records
+        self._allocated = self._size                    # end of the file
+        self._lock = threading.Lock()
+        self._synced = threading.Condition(self._lock)
+        self._lines = []
+        self._writing = False
+        self._error = None
+
+    def _recover(self):
+        # Cuts off a half written last line and the unused preallocated
+        # space, and returns the last sequence number in the file, 0 for a
+        # new journal. Only the tail is read.
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, "r+b") as file:
+            position = file.seek(0, os.SEEK_END)
+            tail = b""
+            while position > 0 and tail.count(b"\n") < 2:
+                step = min(65536, position)
+                position -= step
+                file.seek(position)
+                tail = file.read(step) + tail
+            complete = tail[:tail.rfind(b"\n") + 1]
+            if len(complete) < len(tail):
+                if tail[len(complete):].strip(b"\0"):
+                    log.warning("%s: cutting off a half written last record", self.path)
+                file.truncate(position + len(complete))
+            lines = complete.splitlines()
+        return json.loads(lines[-1])["seq"] if lines else 0
+
+    def start(self, connection, database):
+        # Begins a new journal: copies the database to the base file and
+        # writes the first record, naming the database. Call it before
+        # anything else writes.
+        with closing(sqlite3.connect(base_path(self.path))) as base:
+            connection.backup(base)
+        self.wait(self.append([{"op": "start", "database": os.path.abspath(database)}]))
+
+    def database(self):
+        # The database file the journal was started for
+        with open(self.path, "rb") as file:
+            return json.loads(file.readline())["database"]
+
+    def append(self, changes):
+        # Numbers and queues the changes; returns the last number, to wait()
+        # for. Must be called in commit order.
+        at = round(time.time(), 3)
+        bodies = [json.dumps({"at": at, **change}, separators=(",", ":"))[1:].encode() for change in changes]
+        with self._lock:
+            if self._error is not None:
+                raise self._error
+            for body in bodies:
+                self.seq += 1
+                self._lines.append(b'{"seq":%d,%s\n' % (self.seq, body))
+            return self.seq
+
+    def wait(self, seq):
+        # Blocks until the record numbered seq is on disk, writing the
+        # queued records itself when no other thread is writing
+        with self._lock:
+            while self.durable < seq:
+                if self._error is not None:
+                    raise self._error
+                if self._writing:
+                    self._synced.wait()
+                    continue
+                self._writing = True
+                lines, self._lines = self._lines, []
+                last = self.seq
+                self._lock.release()
+                try:
+                    with metrics.operation("journal.write"):
+                        self._write(b"".join(lines))
+                except OSError as e:
+                    log.error("could not write the journal %s: %s", self.path, e)
+                    self._error = e
+                finally:
+                    self._lock.acquire()
+                    self._writing = False
+                    self._synced.notify_all()
+                if self._error is None:
+                    self.durable = last
+                    self.groups += 1
+                    self.records += len(lines)
+                    metrics.set_gauge("journal.records_per_fsync", round(self.records / self.groups, 1))
+
+    def _write(self, data):
+        # Writes and syncs data after the records; only one thread at a time
+        end = self._size + len(data)
+        if end > self._allocated and _preallocate is not None:
+            # The new size is synced once here rather than with every record
+            _preallocate(self._file.fileno(), self._allocated, end - self._allocated + PREALLOCATE)
+            os.fsync(self._file.fileno())
+            self._allocated = end + PREALLOCATE
+        self._file.seek(self._size)
+        self._file.write(data)
+        self._file.flush()
+        _sync(self._file.fileno())
+        self._size = end
+
+    def close(self):
+        # Writes what is left, cuts off the unused space and closes the file
+        try:
+            self.wait(self.seq)
+            if self._error is None:
+                self._file.truncate(self._size)
+        finally:
+            self._file.close()
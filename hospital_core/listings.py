@@ -0,0 +1,94 @@
+import heapq
+from datetime import timedelta
+
+from . import db
+from .records import AppointmentRecord
+from .timeslots import to_minutes
+
+
+# Booked-appointment listings, read one page at a time.
+#
+# Pages use keyset pagination: rows come in (time_slot, id) order and the
+# cursor is the (time_slot, id) of the last row already shown, so fetching
+# page 1000 costs the same index seek as page 1. Nothing is ever read past
+# the page that was asked for. Rows are AppointmentRecord tuples.
+#
+# Past days may have been moved to appointment_archive (see archive.py). The
+# archive is read too when history=True, or automatically when start reaches
+# back into archived days. Each table is then read with the same keyset
+# query and the two pages are merged in order; archived rows keep their ids,
+# so the cursor works the same across both tables.
+
+PAGE_SIZE = 200
+
+
+def day_range(day):
+    # (start, end) covering one whole day, for the start/end filters
+    return day, day + timedelta(days=1)
+
+
+def _reads_archive(connection, start, history):
+    if history or start is None:
+        return history
+    row = connection.execute("SELECT MAX(time_slot) FROM appointment_archive").fetchone()
+    return row[0] is not None and to_minutes(start) <= row[0]
+
+
+def booked_page(start=None, end=None, doctor_id=None, specialization=None, after=None, limit=PAGE_SIZE,
+                history=False, connection=None):
+    # One page of booked appointments with start <= time_slot < end; start
+    # and end are anything timeslots.to_minutes accepts (a date means its
+    # midnight). Returns (rows, cursor); cursor is None after the last page.
+    # Reads another database when given its connection (see federation.py).
+    # Raises ValueError unless limit is at least 1.
+    if limit < 1:
+        raise ValueError(f"A page must hold at least one row, not {limit}")
+    conditions = ["appointment.isBooked != 0"]
+    params = []
+    if doctor_id is not None:
+        conditions.append("appointment.doctor_id = ?")
+        params.append(doctor_id)
+    if specialization is not None:
+        conditions.append("doctor.specialization = ?")
+        params.append(specialization)
+    if start is not None:
+        conditions.append("appointment.time_slot >= ?")
+        params.append(to_minutes(start))
+    if end is not None:
+        conditions.append("appointment.time_slot < ?")
+        params.append(to_minutes(end))
+    if after is not None:
+        conditions.append("(appointment.time_slot, appointment.id) > (?, ?)")
+        params.extend(after)
+    params.append(limit)
+    connection = connection or db.get_connection()
+    cursor = connection.cursor()
+
+    def read(table):
+        cursor.execute(f'''SELECT appointment.id, appointment.doctor_id, doctor.name, doctor.specialization,
+                                  appointment.patient_name, appointment.time_slot
+                           FROM {table} AS appointment
+                           JOIN doctor ON appointment.doctor_id = doctor.id
+                           WHERE {" AND ".join(conditions)}
+                           ORDER BY appointment.time_slot, appointment.id
+                           LIMIT ?''', params)
+        return [AppointmentRecord._make(row) for row in cursor.fetchall()]
+
+    rows = read("appointment")
+    if _reads_archive(connection, start, history):
+        rows = list(heapq.merge(read("appointment_archive"), rows, key=AppointmentRecord.cursor.fget))[:limit]
+    if len(rows) < limit:
+        return rows, None
+    return rows, rows[-1].cursor
+
+
+def iter_booked(start=None, end=None, doctor_id=None, specialization=None, page_size=PAGE_SIZE, history=False):
+    # Streams every matching row, holding only one page in memory
+    if page_size < 1:
+        raise ValueError(f"A page must hold at least one row, not {page_size}")
+    after = None
+    while True:
+        rows, after = booked_page(start, end, doctor_id, specialization, after, page_size, history)
+        yield from rows
+        if after is None:
+            return
@@ -0,0 +1,279 @@
+import functools
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+
+# Latency metrics for the domain operations and the SQL they run.
+#
+# Every public Doctor/Appointment/Admin method is timed (see instrument()),
+# and so are the loads of the in-memory caches. With statement tracing on
+# (HARSHA_TRACE=1, or metrics.trace_statements = True before the first
+# query) every connection also gets SQLite's trace callback and a progress
+# handler, so each SQL statement run inside an operation is timed and charged
+# with the number of virtual machine instructions it took, which grows with
+# the rows it had to scan. A statement's time runs from its start to the
+# start of the next statement or the end of the operation, so it includes
+# fetching its rows. Statements are grouped with their literals replaced by
+# "?", so patient names never end up in the metrics.
+#
+# Gauges are plain values a component sets when they change, such as the
+# number of patients on the waitlist.
+#
+# metrics.snapshot() returns everything as a dict; start_dump() writes that
+# snapshot to a JSON file every few seconds from a background thread.
+
+SLOW_MS = float(os.environ.get("HARSHA_SLOW_MS", "100"))    # slow-log threshold
+DUMP_PATH = os.environ.get("HARSHA_METRICS_FILE")
+DUMP_INTERVAL = float(os.environ.get("HARSHA_METRICS_INTERVAL", "60"))
+PROGRESS_STEP = 1000        # VM instructions between progress handler calls
+SLOW_LOG_SIZE = 200
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACES = re.compile(r"\s+")
+
+log = logging.getLogger(__name__)
+
+
+def normalize(sql):
+    # Statement text with literals replaced, used to group executions
+    return _SPACES.sub(" ", _LITERALS.sub("?", sql)).strip()
+
+
+class Histogram:
+    # Latencies in power-of-two microsecond buckets: bucket n holds times
+    # below 2**n us, the last one everything from about a minute up
+    BUCKETS = 27
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[min(self.BUCKETS - 1, int(seconds * 1e6).bit_length())] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, fraction):
+        # Upper bound of the bucket holding the given share of samples, in ms
+        rank = fraction * self.count
+        seen = 0
+        for n, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return round(min(2 ** n / 1000, self.max * 1000), 3)
+        return round(self.max * 1000, 3)
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p90_ms": self.percentile(0.9),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max * 1000, 3),
+            "buckets_us": {f"<{2 ** n}": count for n, count in enumerate(self.counts) if count},
+        }
+
+
+class _Statement:
+    def __init__(self):
+        self.latency = Histogram()
+        self.instructions = 0
+        self.operations = set()
+
+
+class Metrics:
+    def __init__(self):
+        self.trace_statements = os.environ.get("HARSHA_TRACE", "") not in ("", "0")
+        self.slow_ms = SLOW_MS
+        self._lock = threading.Lock()
+        self._local = threading.local()     # operation stack and open statement
+        self._dump_thread = None
+        self._dump_stop = threading.Event()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self._operations = {}   # {name: Histogram}
+            self._errors = {}       # {(operation, exception type): count}
+            self._statements = {}   # {normalized sql: _Statement}
+            self._gauges = {}       # {name: value}
+            self._slow = deque(maxlen=SLOW_LOG_SIZE)
+
+    # ---- operations ----
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+            self._local.statement = None
+        return stack
+
+    @contextmanager
+    def operation(self, name):
+        stack = self._stack()
+        stack.append(name)
+        begin = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            with self._lock:
+                key = (name, type(e).__name__)
+                self._errors[key] = self._errors.get(key, 0) + 1
+            raise
+        finally:
+            self._finish_statement()
+            elapsed = time.perf_counter() - begin
+            stack.pop()
+            with self._lock:
+                histogram = self._operations.get(name)
+                if histogram is None:
+                    histogram = self._operations[name] = Histogram()
+                histogram.record(elapsed)
+            if elapsed * 1000 >= self.slow_ms:
+                self._log_slow("operation", name, elapsed, None)
+
+    def timed(self, name, function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with self.operation(name):
+                return function(*args, **kwargs)
+        return wrapper
+
+    def instrument(self, cls):
+        # Times every public method of cls under "Class.method". Methods
+        # returning iterators (iter_*) are left alone: only creating the
+        # iterator would be timed, not reading it.
+        for name, value in list(vars(cls).items()):
+            if name.startswith(("_", "iter_")):
+                continue
+            label = f"{cls.__name__}.{name}"
+            if isinstance(value, staticmethod):
+                setattr(cls, name, staticmethod(self.timed(label, value.__func__)))
+            elif callable(value) and not isinstance(value, type):
+                setattr(cls, name, self.timed(label, value))
+        return cls
+
+    # ---- gauges ----
+
+    def set_gauge(self, name, value):
+        with self._lock:
+            self._gauges[name] = value
+
+    # ---- statements ----
+
+    def install(self, connection):
+        # Called by db.connect for every new connection
+        if self.trace_statements:
+            connection.set_trace_callback(self._on_statement)
+            connection.set_progress_handler(self._on_progress, PROGRESS_STEP)
+
+    def _on_statement(self, sql):
+        if not self._stack():
+            return      # outside any operation there is nothing to end it
+        self._finish_statement()
+        self._local.statement = [sql, time.perf_counter(), 0, self._local.stack[-1]]
+
+    def _on_progress(self):
+        statement = getattr(self._local, "statement", None)
+        if statement is not None:
+            statement[2] += PROGRESS_STEP
+        return 0
+
+    def _finish_statement(self):
+        statement = self._local.statement
+        if statement is None:
+            return
+        self._local.statement = None
+        sql, begin, instructions, operation = statement
+        elapsed = time.perf_counter() - begin
+        text = normalize(sql)
+        with self._lock:
+            entry = self._statements.get(text)
+            if entry is None:
+                entry = self._statements[text] = _Statement()
+            entry.latency.record(elapsed)
+            entry.instructions += instructions
+            entry.operations.add(operation)
+        if elapsed * 1000 >= self.slow_ms:
+            self._log_slow("statement", text, elapsed, operation, instructions)
+
+    def _log_slow(self, kind, what, elapsed, operation, instructions=None):
+        entry = {"time": datetime.now().isoformat(timespec="milliseconds"), "kind": kind,
+                 "what": what, "ms": round(elapsed * 1000, 3)}
+        if operation is not None:
+            entry["operation"] = operation
+        if instructions is not None:
+            entry["vm_instructions"] = instructions
+        with self._lock:
+            self._slow.append(entry)
+        log.warning("slow %s (%.1f ms): %s", kind, elapsed * 1000, what)
+
+    # ---- reporting ----
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "time": datetime.now().isoformat(timespec="seconds"),
+                "uptime_s": round(time.time() - self.started, 1),
+                "statement_tracing": self.trace_statements,
+                "slow_ms": self.slow_ms,
+                "operations": {name: histogram.snapshot() for name, histogram in sorted(self._operations.items())},
+                "gauges": dict(sorted(self._gauges.items())),
+                "errors": [{"operation": operation, "error": error, "count": count}
+                           for (operation, error), count in sorted(self._errors.items())],
+                "statements": sorted(({"sql": sql, **entry.latency.snapshot(),
+                                       "vm_instructions": entry.instructions,
+                                       "operations": sorted(entry.operations)}
+                                      for sql, entry in self._statements.items()),
+                                     key=lambda entry: entry["total_ms"], reverse=True),
+                "slow": list(self._slow),
+            }
+
+    def dump(self, path):
+        # Writes the snapshot atomically, so a reader never sees half a file
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as file:
+            json.dump(self.snapshot(), file, indent=2)
+        os.replace(temporary, path)
+
+    def start_dump(self, path=None, interval=None):
+        # Dumps the snapshot to path every interval seconds until stop_dump();
+        # does nothing when no path is given or set in HARSHA_METRICS_FILE
+        path = path or DUMP_PATH
+        if path is None or self._dump_thread is not None:
+            return
+        interval = interval or DUMP_INTERVAL
+        self._dump_stop.clear()
+
+        def run():
+            while not self._dump_stop.wait(interval):
+                try:
+                    self.dump(path)
+                except OSError as e:
+                    log.warning("could not write metrics to %s: %s", path, e)
+            self.dump(path)
+
+        self._dump_thread = threading.Thread(target=run, name="metrics-dump", daemon=True)
+        self._dump_thread.start()
+
+    def stop_dump(self):
+        if self._dump_thread is not None:
+            self._dump_stop.set()
+            self._dump_thread.join()
+            self._dump_thread = None
+
+
+metrics = Metrics()
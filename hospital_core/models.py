@@ -0,0 +1,474 @@
+from datetime import date, datetime
+from enum import Enum
+
+from . import branches, db, formatting, listings, offboarding, patient_search, search, utilization
+from .availability import availability_index
+from .directory import doctor_directory
+from .metrics import metrics
+from .schedules import DEFAULT_END, DEFAULT_SLOT_MINUTES, DEFAULT_START, EVERY_DAY, minute_of_day
+from .timeslots import day_number, format_slot, to_minutes
+from .waitlist import waitlist
+
+
+# The domain classes never talk to the user directly. sqlite3.Error is left
+# to propagate so that the caller (the Tk front end, a script or a worker)
+# decides how to report it.
+
+BOOK_MANY_CHUNK = 400       # slots per lookup of book_many; two variables each
+
+class BookingResult(Enum):
+    BOOKED = "booked"
+    ALREADY_TAKEN = "already-taken"
+    NO_SUCH_SLOT = "no-such-slot"
+    INVALID = "invalid"
+    ROLLED_BACK = "rolled-back"
+
+    # Only a successful booking is truthy, so "if book_appointment(...)" works
+    def __bool__(self):
+        return self is BookingResult.BOOKED
+
+class CancelResult(Enum):
+    CANCELLED = "cancelled"     # the slot is free again
+    REFILLED = "refilled"       # the slot went to the next patient on the waitlist
+    NOT_BOOKED = "not-booked"
+
+    def __bool__(self):
+        return self is not CancelResult.NOT_BOOKED
+
+class _BatchFailed(Exception):
+    # Raised inside an all-or-nothing batch to roll it back
+    pass
+
+class Doctor:
+    logged_in_doctor = None
+    def __init__(self, name, specialization, gender, exp):
+        self.name = name
+        self.specialization = specialization
+        self.gender = gender
+        self.exp = exp
+        self.id = self.save_in_db()  # Save in DB after attributes are set
+
+    def save_in_db(self):
+        # The doctor row and its default working hours, from today on, are
+        # written in one transaction
+        with db.transaction() as connection:
+            cursor = connection.cursor()
+            cursor.execute('''INSERT INTO doctor (name, specialization, gender, exp)
+                              VALUES (?, ?, ?, ?)''', (self.name, self.specialization, self.gender, self.exp))
+            id = cursor.lastrowid
+            db.record("add_doctor", id=id, name=self.name, specialization=self.specialization, gender=self.gender,
+                      exp=self.exp)
+            Schedule.add_hours(id)
+        doctor_directory.invalidate()
+        return id
+
+    @staticmethod
+    def all_doctors():
+        # DoctorRecord of every doctor, from the directory cache
+        return doctor_directory.all()
+
+    @staticmethod
+    def password(doctor_id):
+        # Doctors log in with their id repeated eight times
+        return str(doctor_id) * 8
+
+class Schedule:
+    # A doctor's working hours, breaks and leave (see schedules.py). Times of
+    # day are minutes, datetime.time or "HH:MM"; days are dates, "YYYY-MM-DD"
+    # or day numbers. Changes apply to booking at once; bookings already made
+    # are kept even when their slot is no longer on the schedule.
+    @staticmethod
+    def add_hours(doctor_id, start=DEFAULT_START, end=DEFAULT_END, slot_minutes=DEFAULT_SLOT_MINUTES,
+                  weekdays=EVERY_DAY, valid_from=None, valid_until=None):
+        # Working hours on the given weekdays (MONDAY | ... bits), cut into
+        # slots, from valid_from (default today) until valid_until or for good
+        start, end = minute_of_day(start), minute_of_day(end)
+        valid_from = Schedule._day(date.today() if valid_from is None else valid_from)
+        valid_until = None if valid_until is None else Schedule._day(valid_until)
+        if not 0 < slot_minutes <= end - start:
+            raise ValueError(f"Slots of {slot_minutes} minutes do not fit between {start} and {end}")
+        if not 0 < weekdays <= EVERY_DAY:
+            raise ValueError(f"Not a set of weekdays: {weekdays!r}")
+        if valid_until is not None and valid_until < valid_from:
+            raise ValueError("The hours end before they start")
+        with db.transaction() as connection:
+            rule_id = connection.execute(
+                '''INSERT INTO schedule_rule (doctor_id, weekdays, start_minute, end_minute, slot_minutes,
+                                             valid_from, valid_until) VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                (doctor_id, weekdays, start, end, slot_minutes, valid_from, valid_until)).lastrowid
+            db.record("add_hours", id=rule_id, doctor_id=doctor_id, weekdays=weekdays, start_minute=start,
+                      end_minute=end, slot_minutes=slot_minutes, valid_from=valid_from, valid_until=valid_until)
+            availability_index.reload_schedule(doctor_id)
+        return rule_id
+
+    @staticmethod
+    def end_hours(rule_id, last_day):
+        # Working hours stop after last_day, e.g. before new ones take over
+        with db.transaction() as connection:
+            row = connection.execute("SELECT doctor_id, valid_from FROM schedule_rule WHERE id = ?",
+                                     (rule_id,)).fetchone()
+            if row is None:
+                return False
+            valid_until = max(row[1] - 1, Schedule._day(last_day))
+            connection.execute("UPDATE schedule_rule SET valid_until = ? WHERE id = ?", (valid_until, rule_id))
+            db.record("end_hours", id=rule_id, valid_until=valid_until)
+            availability_index.reload_schedule(row[0])
+        return True
+
+    @staticmethod
+    def add_break(doctor_id, start, end, weekdays=EVERY_DAY):
+        # No slot overlapping start..end on the given weekdays, e.g. lunch
+        start, end = minute_of_day(start), minute_of_day(end)
+        if not start < end:
+            raise ValueError("The break ends before it starts")
+        if not 0 < weekdays <= EVERY_DAY:
+            raise ValueError(f"Not a set of weekdays: {weekdays!r}")
+        with db.transaction() as connection:
+            break_id = connection.execute(
+                '''INSERT INTO schedule_break (doctor_id, weekdays, start_minute, end_minute)
+                   VALUES (?, ?, ?, ?)''', (doctor_id, weekdays, start, end)).lastrowid
+            db.record("add_break", id=break_id, doctor_id=doctor_id, weekdays=weekdays, start_minute=start,
+                      end_minute=end)
+            availability_index.reload_schedule(doctor_id)
+        return break_id
+
+    @staticmethod
+    def add_leave(doctor_id, first_day, last_day=None):
+        # No slots from first_day to last_day, both included
+        first_day = Schedule._day(first_day)
+        last_day = first_day if last_day is None else Schedule._day(last_day)
+        if last_day < first_day:
+            raise ValueError("The leave ends before it starts")
+        with db.transaction() as connection:
+            leave_id = connection.execute(
+                "INSERT INTO doctor_leave (doctor_id, first_day, last_day) VALUES (?, ?, ?)",
+                (doctor_id, first_day, last_day)).lastrowid
+            db.record("add_leave", id=leave_id, doctor_id=doctor_id, first_day=first_day, last_day=last_day)
+            availability_index.reload_schedule(doctor_id)
+        return leave_id
+
+    @staticmethod
+    def remove_hours(rule_id):
+        return Schedule._remove("schedule_rule", rule_id)
+
+    @staticmethod
+    def remove_break(break_id):
+        return Schedule._remove("schedule_break", break_id)
+
+    @staticmethod
+    def remove_leave(leave_id):
+        return Schedule._remove("doctor_leave", leave_id)
+
+    @staticmethod
+    def of(doctor_id):
+        # The doctor's DoctorSchedule, with its rules, breaks and leaves
+        return availability_index.schedule(doctor_id)
+
+    @staticmethod
+    def _day(value):
+        return value if isinstance(value, int) else day_number(value)
+
+    @staticmethod
+    def _remove(table, row_id):
+        with db.transaction() as connection:
+            row = connection.execute(f"SELECT doctor_id FROM {table} WHERE id = ?", (row_id,)).fetchone()
+            if row is None:
+                return False
+            connection.execute(f"DELETE FROM {table} WHERE id = ?", (row_id,))
+            db.record("remove", table=table, id=row_id)
+            availability_index.reload_schedule(row[0])
+        return True
+
+class Appointment:
+    @staticmethod
+    def book_appointment(patient_name, doctor_id, time_slot):
+        # Only bookings are stored, so booking inserts the row. A slot that
+        # was booked and freed again still has its row, which the upsert
+        # takes over only while it is free; either way the (doctor_id,
+        # time_slot) unique index makes sure two callers never both get it.
+        time_slot = to_minutes(time_slot)
+        if not availability_index.has_slot(doctor_id, time_slot):
+            return BookingResult.NO_SUCH_SLOT
+        with db.transaction() as connection:
+            booked = connection.execute(
+                '''INSERT INTO appointment (doctor_id, time_slot, patient_name, isBooked) VALUES (?, ?, ?, 1)
+                   ON CONFLICT (doctor_id, time_slot) DO UPDATE
+                   SET patient_name = excluded.patient_name, isBooked = 1 WHERE isBooked = 0''',
+                (doctor_id, time_slot, patient_name)).rowcount > 0
+            if booked:
+                db.record("book", doctor_id=doctor_id, time_slot=time_slot, patient_name=patient_name)
+        # Taken or not, the slot is booked now; if another process booked it
+        # this brings the index up to date
+        availability_index.mark_booked(doctor_id, time_slot)
+        return BookingResult.BOOKED if booked else BookingResult.ALREADY_TAKEN
+
+    @staticmethod
+    def cancel_appointment(doctor_id, time_slot, patient_name=None):
+        # Cancels the booking (only if it is the given patient's, when a name
+        # is given) and returns (CancelResult, WaitlistRecord or None). A slot
+        # that has not started yet goes straight to the doctor's next waiter,
+        # in the same transaction, so it is never seen free in between.
+        time_slot = to_minutes(time_slot)
+        with db.transaction() as connection:
+            row = connection.execute("SELECT patient_name FROM appointment WHERE doctor_id = ? AND time_slot = ? AND isBooked != 0",
+                                     (doctor_id, time_slot)).fetchone()
+            if row is None or (patient_name is not None and row[0] != patient_name):
+                return CancelResult.NOT_BOOKED, None
+            waiter = None
+            if time_slot >= to_minutes(datetime.now()) and availability_index.has_slot(doctor_id, time_slot):
+                with metrics.operation("waitlist.fill"):
+                    waiter = waitlist.pop(doctor_id)
+                    if waiter is not None:
+                        connection.execute("UPDATE appointment SET patient_name = ? WHERE doctor_id = ? AND time_slot = ?",
+                                           (waiter.patient_name, doctor_id, time_slot))
+            if waiter is None:
+                # Only bookings are stored; the free slot follows from the schedule
+                connection.execute("DELETE FROM appointment WHERE doctor_id = ? AND time_slot = ?", (doctor_id, time_slot))
+            db.record("cancel", doctor_id=doctor_id, time_slot=time_slot, waiter_id=waiter and waiter.id,
+                      patient_name=waiter and waiter.patient_name)
+        if waiter is None:
+            availability_index.mark_free(doctor_id, time_slot)
+            return CancelResult.CANCELLED, None
+        return CancelResult.REFILLED, waiter
+
+    @staticmethod
+    def join_waitlist(patient_name, doctor_id, urgency=0):
+        # Puts the patient on the doctor's waitlist; more urgent patients are
+        # served first, equally urgent ones in the order they asked. Returns
+        # the WaitlistRecord.
+        if not patient_name:
+            raise ValueError("patient_name is required")
+        if doctor_directory.get(doctor_id) is None:
+            raise ValueError(f"No doctor with id {doctor_id}")
+        with db.transaction():
+            entry = waitlist.join(doctor_id, patient_name, int(urgency))
+            db.record("join_waitlist", id=entry.id, doctor_id=doctor_id, patient_name=patient_name,
+                      urgency=entry.urgency, requested_at=entry.requested_at)
+        return entry
+
+    @staticmethod
+    def leave_waitlist(entry_id):
+        with db.transaction():
+            left = waitlist.leave(entry_id)
+            if left:
+                db.record("leave_waitlist", id=entry_id)
+        return left
+
+    @staticmethod
+    def view_waitlist(doctor_id):
+        # The doctor's WaitlistRecords, next to be served first
+        return waitlist.waiting(doctor_id)
+
+    @staticmethod
+    def book_many(requests, all_or_nothing=False):
+        # Books (patient_name, doctor_id, time_slot) requests in one
+        # transaction and returns a BookingResult per request, in order.
+        # The slots already booked are read with one query per
+        # BOOK_MANY_CHUNK requests and the free ones taken with one
+        # executemany; the transaction's write lock keeps other writers out
+        # in between. With all_or_nothing any failure undoes the whole batch
+        # and the bookings that had succeeded are reported as ROLLED_BACK.
+        results = []
+        wanted = {}     # (doctor_id, time_slot): (patient_name, its index in results)
+        for request in requests:
+            try:
+                patient_name, doctor_id, time_slot = request
+                time_slot = to_minutes(time_slot)
+            except (TypeError, ValueError):
+                results.append(BookingResult.INVALID)
+                continue
+            if not patient_name or isinstance(doctor_id, bool) or not isinstance(doctor_id, int):
+                results.append(BookingResult.INVALID)
+            elif not availability_index.has_slot(doctor_id, time_slot):
+                results.append(BookingResult.NO_SUCH_SLOT)
+            elif (doctor_id, time_slot) in wanted:
+                results.append(BookingResult.ALREADY_TAKEN)
+            else:
+                wanted[doctor_id, time_slot] = patient_name, len(results)
+                results.append(None)
+        slots = list(wanted)
+        try:
+            with db.transaction() as connection:
+                taken = set()
+                for start in range(0, len(slots), BOOK_MANY_CHUNK):
+                    chunk = slots[start:start + BOOK_MANY_CHUNK]
+                    taken.update(connection.execute(
+                        f'''SELECT doctor_id, time_slot FROM appointment
+                            WHERE (doctor_id, time_slot) IN (VALUES {",".join(["(?, ?)"] * len(chunk))})
+                            AND isBooked != 0''', [value for slot in chunk for value in slot]))
+                free = [slot for slot in slots if slot not in taken]
+                connection.executemany(
+                    '''INSERT INTO appointment (doctor_id, time_slot, patient_name, isBooked) VALUES (?, ?, ?, 1)
+                       ON CONFLICT (doctor_id, time_slot) DO UPDATE
+                       SET patient_name = excluded.patient_name, isBooked = 1 WHERE isBooked = 0''',
+                    [(doctor_id, time_slot, wanted[doctor_id, time_slot][0]) for doctor_id, time_slot in free])
+                for doctor_id, time_slot in free:
+                    db.record("book", doctor_id=doctor_id, time_slot=time_slot,
+                              patient_name=wanted[doctor_id, time_slot][0])
+                for slot, (_, index) in wanted.items():
+                    results[index] = BookingResult.ALREADY_TAKEN if slot in taken else BookingResult.BOOKED
+                if all_or_nothing and not all(results):
+                    raise _BatchFailed
+        except _BatchFailed:
+            return [BookingResult.ROLLED_BACK if result else result for result in results]
+        # As in book_appointment, taken slots are marked too: another
+        # process booked them
+        availability_index.mark_booked_many(slots)
+        return results
+
+    @staticmethod
+    def is_slot_free(doctor_id, time_slot):
+        # Answered from the in-memory availability index, no database query
+        return availability_index.is_free(doctor_id, time_slot)
+
+    @staticmethod
+    def appointments_page(doctor_id, start=None, end=None, after=None, limit=listings.PAGE_SIZE, history=False):
+        # One page of the doctor's booked appointments; see listings.booked_page
+        return listings.booked_page(start, end, doctor_id, None, after, limit, history)
+
+    @staticmethod
+    def iter_appointments(doctor_id, start=None, end=None, history=False):
+        return listings.iter_booked(start, end, doctor_id, history=history)
+
+    @staticmethod
+    def view_all_appointments(doctor_id):
+        # Every appointment of the doctor as display lines, for the text view
+        my_appointments = [formatting.doctor_listing_line(row) for row in Appointment.iter_appointments(doctor_id)]
+        return formatting.doctor_listing_header + my_appointments
+
+    @staticmethod
+    def free_slots(doctor_id, day=None):
+        # Free slots of the doctor as epoch minutes, for one day (a date or
+        # "YYYY-MM-DD") or the coming weeks, computed from the schedule and
+        # the bookings in the availability index
+        return availability_index.free_slots(doctor_id, day)
+
+    @staticmethod
+    def view_free_slots(doctor_id, day=None):
+        # The same slots as "YYYY-MM-DD HH:MM" strings for the booking menu
+        return [format_slot(slot) for slot in Appointment.free_slots(doctor_id, day)]
+
+    @staticmethod
+    def earliest_slots(specialization, limit=5, after=None):
+        # The first free slots of any doctor of the specialization; see search.py
+        return search.earliest_slots(specialization, limit, after)
+
+class Harsha_Hospital:
+    def __init__(self):
+        # Name and address are those of the branch this process serves
+        branch = branches.current()
+        self.branch = branch.id
+        self.name = branch.name
+        self.shortname = "Harsha Hospital"
+        self.address = branch.address
+        self.owner = self.mainDoctor = "Dr. Prashanth Kokkula"
+
+    @staticmethod
+    def greetings():
+        return "Welcome to Harsha MultiSpeciality Hospital"
+
+    @staticmethod
+    def get_doctors():
+        # {id: menu label} of every doctor
+        return doctor_directory.labels()
+
+    @staticmethod
+    def get_services():
+        # The specializations of the doctors on staff, in name order
+        return doctor_directory.specializations()
+
+class Patient:
+    def __init__(self, name):
+        self.name = name
+
+    def book_appointment(self, doctor_id, time_slot):
+        result = Appointment.book_appointment(self.name, doctor_id, time_slot)
+        if result:
+            return f"Appointment successfully booked at {time_slot} with Dr. {doctor_directory.labels()[doctor_id]}"
+        elif result is BookingResult.NO_SUCH_SLOT:
+            return "Failed to book appointment. The doctor has no such time slot."
+        else:
+            return "Failed to book appointment. Please try another time slot."
+
+class Admin:
+    def __init__(self, name):
+        self.name = name
+
+    @staticmethod
+    def add_doctor(name, specialization, gender, exp):
+        # Returns False when a doctor with the same name already exists.
+        # The name check is one probe of the unique name index, inside the
+        # same write transaction as the insert.
+        with db.transaction() as connection:
+            if connection.execute("SELECT 1 FROM doctor WHERE name = ?", (name,)).fetchone():
+                return False
+            Doctor(name, specialization, gender, exp)
+        # Again after COMMIT, in case another thread reloaded in between
+        doctor_directory.invalidate()
+        return True
+
+    @staticmethod
+    def delete_doctor(name):
+        # Offboards the doctor with this name; see offboard_doctors. None
+        # when no doctor on staff has the name.
+        doctor = doctor_directory.by_name(name)
+        return None if doctor is None else Admin.offboard_doctors([doctor.id])
+
+    @staticmethod
+    def offboard_doctors(doctor_ids):
+        # The doctors leave: they are kept for the records but can no longer
+        # be booked, and their future appointments move to the nearest free
+        # slots of other doctors of the same specialization, all in one
+        # transaction. Returns an OffboardReport listing the moves and the
+        # appointments that found no slot; see offboarding.py.
+        return offboarding.offboard(doctor_ids)
+
+    @staticmethod
+    def appointments_page(start=None, end=None, doctor_id=None, specialization=None, after=None,
+                          limit=listings.PAGE_SIZE, history=False):
+        # One page of booked appointments of all doctors; see listings.booked_page
+        return listings.booked_page(start, end, doctor_id, specialization, after, limit, history)
+
+    @staticmethod
+    def iter_appointments(start=None, end=None, doctor_id=None, specialization=None, history=False):
+        return listings.iter_booked(start, end, doctor_id, specialization, history=history)
+
+    @staticmethod
+    def search_patients(query, after=None, limit=patient_search.PAGE_SIZE):
+        # One page of the booked appointments, live and archived, of patients
+        # whose name contains the words of query (or, failing that, is
+        # similar to it); see patient_search.search
+        return patient_search.search(query, after, limit)
+
+    @staticmethod
+    def iter_search_patients(query):
+        return patient_search.iter_search(query)
+
+    @staticmethod
+    def utilization_by_doctor(day=None):
+        # Booked slots and capacity of every doctor on the day (default
+        # today), from the summary tables; see utilization.py
+        return utilization.by_doctor(day)
+
+    @staticmethod
+    def utilization_by_specialization(day=None):
+        return utilization.by_specialization(day)
+
+    @staticmethod
+    def view_utilization(day=None):
+        # The utilization report as display lines, for the text view
+        return (formatting.specialization_usage_header
+                + [formatting.specialization_usage_line(row) for row in Admin.utilization_by_specialization(day)]
+                + [""] + formatting.doctor_usage_header
+                + [formatting.doctor_usage_line(row) for row in Admin.utilization_by_doctor(day)])
+
+    @staticmethod
+    def view_appointments_of_all_doctors():
+        # Every booked appointment as display lines, for the text view
+        output_list = [formatting.admin_listing_line(row) for row in Admin.iter_appointments()]
+        return formatting.admin_listing_header + output_list
+
+
+# Every public operation is timed; see metrics.py
+for cls in (Doctor, Schedule, Appointment, Admin):
+    metrics.instrument(cls)
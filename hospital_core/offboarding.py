@@ -0,0 +1,216 @@
+# Offboarding doctors who leave the hospital.
+#
+#   python -m hospital_core.offboarding --doctor-id 3 --doctor-id 7
+#
+# A departing doctor is not deleted. doctor.left_on is set (schema migration
+# 10), which takes them out of the doctor directory and so out of the menus,
+# searches and the service, while their past appointments, the archive and
+# the usage summaries still find their row. Their schedule rules end the
+# day before, so none of their slots can be booked again.
+#
+# Each of their bookings from now on moves to the free slot nearest in time
+# to the original one among the remaining doctors of the same
+# specialization; ties go to the earlier slot, then the lower doctor id.
+# Bookings are placed greedily in time order. The candidates' bookings are
+# read with one query into per-day bitmasks, and a free mask is the
+# schedule's day mask without them; with the union of those masks over the
+# candidates, the nearest free slot on a day is a couple of bit operations
+# however many doctors there are. Marking the doctors, moving the
+# bookings and dropping their waitlists is one transaction. A booking with
+# no free slot within SEARCH_DAYS of it stays with the departed doctor and
+# is listed in the report, so the patient can be called.
+
+import argparse
+import time
+from datetime import datetime
+
+from . import db
+from .availability import SEARCH_DAYS, availability_index
+from .directory import doctor_directory
+from .records import AppointmentRecord, DoctorRecord, ReassignmentRecord
+from .timeslots import MINUTES_PER_DAY, format_slot, to_minutes
+from .waitlist import waitlist
+
+
+class OffboardReport:
+    def __init__(self, doctors):
+        self.doctors = doctors          # DoctorRecords of the doctors who left
+        self.moved = []                 # ReassignmentRecords, in original time order
+        self.unplaced = []              # AppointmentRecords left with a departed doctor
+        self.waiters_dropped = 0
+        self.elapsed = 0.0
+
+    def __str__(self):
+        return (f"{len(self.doctors)} doctors offboarded: {len(self.moved)} appointments moved, "
+                f"{len(self.unplaced)} could not be placed, {self.waiters_dropped} waitlist entries dropped, "
+                f"{self.elapsed:.2f}s")
+
+
+def _nearest(mask, minute):
+    # Minutes of the set bits of mask just before and at or after minute
+    # (0..MINUTES_PER_DAY), either None when there is none
+    above = mask >> minute
+    below = mask & ((1 << minute) - 1)
+    return (below.bit_length() - 1 if below else None,
+            minute + (above & -above).bit_length() - 1 if above else None)
+
+
+class _FreeSlots:
+    # Free slots of the candidate doctors from `start` on, taken as bookings
+    # are placed. Besides each doctor's mask per day it keeps, per group of
+    # candidates (a tuple of doctor ids in id order) and day, the union of
+    # their masks, so finding the nearest slot does not look at every doctor.
+    def __init__(self, connection, doctor_ids, start):
+        self.first_day, first_minute = divmod(start, MINUTES_PER_DAY)
+        self.not_started = ~((1 << first_minute) - 1)
+        self.masks = {}
+        self.unions = {}
+        booked = {}
+        if doctor_ids:
+            marks = ",".join("?" * len(doctor_ids))
+            for doctor_id, time_slot in connection.execute(
+                    f'''SELECT doctor_id, time_slot FROM appointment
+                        WHERE isBooked != 0 AND time_slot >= ? AND doctor_id IN ({marks})''',
+                    (self.first_day * MINUTES_PER_DAY, *doctor_ids)):
+                day, minute = divmod(time_slot, MINUTES_PER_DAY)
+                booked[doctor_id, day] = booked.get((doctor_id, day), 0) | 1 << minute
+        self.booked = booked
+
+    def mask(self, doctor_id, day):
+        mask = self.masks.get((doctor_id, day))
+        if mask is None:
+            mask = availability_index.schedule(doctor_id).day_mask(day) & ~self.booked.get((doctor_id, day), 0)
+            if day == self.first_day:
+                mask &= self.not_started
+            self.masks[doctor_id, day] = mask
+        return mask
+
+    def union(self, doctor_ids, day):
+        mask = self.unions.get((doctor_ids, day))
+        if mask is None:
+            mask = 0
+            for doctor_id in doctor_ids:
+                mask |= self.mask(doctor_id, day)
+            self.unions[doctor_ids, day] = mask
+        return mask
+
+    def nearest(self, doctor_ids, time_slot):
+        # (time_slot, doctor_id) of the free slot nearest to time_slot among
+        # the doctors, or None
+        if not doctor_ids:
+            return None
+        day = time_slot // MINUTES_PER_DAY
+        best = None     # (distance, time_slot)
+        for offset in range(SEARCH_DAYS):
+            # Every slot offset days away is at least this far
+            if best is not None and (offset - 1) * MINUTES_PER_DAY >= best[0]:
+                break
+            for candidate_day in {day - offset, day + offset}:
+                if candidate_day < self.first_day:
+                    continue
+                minute = min(max(time_slot - candidate_day * MINUTES_PER_DAY, 0), MINUTES_PER_DAY)
+                for found in _nearest(self.union(doctor_ids, candidate_day), minute):
+                    if found is not None:
+                        slot = candidate_day * MINUTES_PER_DAY + found
+                        key = (abs(slot - time_slot), slot)
+                        if best is None or key < best:
+                            best = key
+        if best is None:
+            return None
+        day, minute = divmod(best[1], MINUTES_PER_DAY)
+        doctor_id = next(doctor_id for doctor_id in doctor_ids if self.mask(doctor_id, day) >> minute & 1)
+        return best[1], doctor_id
+
+    def take(self, doctor_ids, doctor_id, time_slot):
+        day, minute = divmod(time_slot, MINUTES_PER_DAY)
+        self.masks[doctor_id, day] = self.mask(doctor_id, day) & ~(1 << minute)
+        if not any(self.mask(other, day) >> minute & 1 for other in doctor_ids):
+            self.unions[doctor_ids, day] = self.union(doctor_ids, day) & ~(1 << minute)
+
+
+def apply(connection, doctor_ids, today, moves):
+    # Writes an offboarding: moves is [(doctor_id, time_slot, appointment_id)]
+    # of the bookings placed with other doctors. Returns the number of
+    # waitlist entries dropped. replay.py applies journaled offboardings
+    # with it too.
+    marks = ",".join("?" * len(doctor_ids))
+    # Rows of slots that are not booked would clash with the unique index
+    connection.executemany("DELETE FROM appointment WHERE doctor_id = ? AND time_slot = ? AND isBooked = 0",
+                           [move[:2] for move in moves])
+    connection.executemany("UPDATE appointment SET doctor_id = ?, time_slot = ? WHERE id = ?", moves)
+    connection.execute(f"UPDATE doctor SET left_on = ? WHERE id IN ({marks})", (today, *doctor_ids))
+    connection.execute(f'''UPDATE schedule_rule SET valid_until = ?
+                           WHERE doctor_id IN ({marks}) AND (valid_until IS NULL OR valid_until >= ?)''',
+                       (today - 1, *doctor_ids, today))
+    return connection.execute(f"DELETE FROM waitlist WHERE doctor_id IN ({marks})", doctor_ids).rowcount
+
+
+def offboard(doctor_ids, now=None):
+    # Offboards the doctors with these ids (unknown or departed ones are
+    # skipped) and returns an OffboardReport
+    begin = time.perf_counter()
+    start = to_minutes(now if now is not None else datetime.now())
+    today = start // MINUTES_PER_DAY
+    doctor_ids = sorted(set(doctor_ids))
+    marks = ",".join("?" * len(doctor_ids))
+    with db.transaction() as connection:
+        doctors = [DoctorRecord._make(row) for row in connection.execute(
+            f'''SELECT id, name, specialization, gender, exp FROM doctor
+                WHERE left_on IS NULL AND id IN ({marks}) ORDER BY id''', doctor_ids)] if doctor_ids else []
+        report = OffboardReport(doctors)
+        if not doctors:
+            return report
+        leaving = {doctor.id: doctor for doctor in doctors}
+        marks = ",".join("?" * len(leaving))
+        candidates = {}
+        for doctor in doctors:
+            candidates.setdefault(doctor.specialization, tuple(
+                other.id for other in doctor_directory.by_specialization(doctor.specialization)
+                if other.id not in leaving))
+        free = _FreeSlots(connection, sorted({other for ids in candidates.values() for other in ids}), start)
+
+        moves = []
+        for appointment_id, doctor_id, time_slot, patient_name in connection.execute(
+                f'''SELECT id, doctor_id, time_slot, patient_name FROM appointment
+                    WHERE isBooked != 0 AND time_slot >= ? AND doctor_id IN ({marks})
+                    ORDER BY time_slot, id''', (start, *leaving)).fetchall():
+            doctor = leaving[doctor_id]
+            found = free.nearest(candidates[doctor.specialization], time_slot)
+            if found is None:
+                report.unplaced.append(AppointmentRecord(appointment_id, doctor_id, doctor.name, doctor.specialization,
+                                                         patient_name, time_slot))
+                continue
+            new_slot, new_doctor_id = found
+            free.take(candidates[doctor.specialization], new_doctor_id, new_slot)
+            report.moved.append(ReassignmentRecord(appointment_id, patient_name, doctor_id, time_slot,
+                                                   new_doctor_id, new_slot))
+            moves.append((new_doctor_id, new_slot, appointment_id))
+
+        report.waiters_dropped = apply(connection, list(leaving), today, moves)
+        db.record("offboard", doctor_ids=list(leaving), day=today, moves=moves)
+
+    for doctor_id in leaving:
+        availability_index.forget_doctor(doctor_id)
+    for move in report.moved:
+        availability_index.mark_booked(move.to_doctor_id, move.to_slot)
+    waitlist.reset()
+    doctor_directory.invalidate()
+    report.elapsed = time.perf_counter() - begin
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offboard doctors and move their future appointments")
+    parser.add_argument("--doctor-id", type=int, action="append", required=True, help="doctor to offboard")
+    args = parser.parse_args()
+    try:
+        report = offboard(args.doctor_id)
+        print(report)
+        for record in report.unplaced:
+            print(f"  not placed: {format_slot(record.time_slot)} {record.patient_name} (Dr. {record.doctor_name})")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
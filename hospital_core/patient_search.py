@@ -0,0 +1,236 @@
+import logging
+import sqlite3
+import threading
+import time
+
+from . import db
+from .metrics import metrics
+from .records import AppointmentRecord
+
+
+# Finding patients by name among all booked appointments, live and archived.
+#
+# patient_search is an FTS5 table with the trigram tokenizer holding the
+# patient name of every booked appointment under the appointment's id
+# (schema migration 11). Bookings, cancellations and archive moves only
+# queue the ids they touched, through triggers; sync() brings the index up
+# to date from the queue in one transaction. Every commit wakes an indexer
+# thread that runs sync() SYNC_DELAY seconds later, so a burst of bookings
+# is indexed in one batch, no booking waits for the index and searches only
+# read; a new booking is found once the indexer has caught up. The app and
+# the service also sync at startup. A trigram index finds the names that
+# contain any text of three or more characters, so prefixes and parts of
+# names are found from the index alone, in any case. Every word of the
+# query must occur in the name; words shorter than three characters are
+# checked with LIKE on the rows the longer words found.
+#
+# Hits come newest booking first, one page at a time, keyed by appointment
+# id, so a later page costs the same as the first. Only the ids of the page
+# are then looked up in appointment and appointment_archive.
+#
+# When no name contains the query, the search falls back to similar names,
+# so a misspelt name still finds the patient. The names of the newest
+# FUZZY_SAMPLE rows containing each trigram of the query are candidates.
+# Each word of the query of MIN_WORD or more letters must be within one
+# typo per FUZZY_LETTERS_PER_TYPO letters (at least one) of a word of the
+# name or of its start, where a typo is a letter added, dropped, changed
+# or swapped with the next one; trigram similarity alone cannot do this,
+# as one typo in a short name leaves few of its trigrams. The appointments
+# of the FUZZY_NAMES names with the fewest typos are the hits, paged as
+# above. The work is bounded by the sample size, not by how common the
+# trigrams are, and ranking every row with bm25 is avoided.
+
+PAGE_SIZE = 50
+MIN_WORD = 3                # shortest word the trigram index can look up
+SYNC_BATCH = 5000
+SYNC_DELAY = 0.2            # seconds from a commit to the indexer's sync
+FUZZY_SAMPLE = 200          # newest rows read per trigram of a query with no hits
+FUZZY_NAMES = 10
+FUZZY_LETTERS_PER_TYPO = 4
+
+
+log = logging.getLogger(__name__)
+
+
+def _quote(text):
+    # An FTS5 string: matched as a whole, never parsed as query syntax
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _like(word):
+    return "%" + word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def _trigrams(text):
+    text = " ".join(text.lower().split())
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _similarity(a, b):
+    # Dice coefficient of two trigram sets, 0.0 to 1.0
+    return 2 * len(a & b) / (len(a) + len(b)) if a or b else 0.0
+
+
+def _edit_distance(a, b):
+    # Letters added, dropped, changed or swapped with a neighbour to turn a
+    # into b (optimal string alignment distance)
+    previous, row = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, row = previous, row, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            row[j] = min(previous[j] + 1, row[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                row[j] = min(row[j], before[j - 2] + 1)
+    return row[-1]
+
+
+def _typos(words, name):
+    # Typos in words taken as parts of name, or None if a word has too many
+    name_words = name.lower().split()
+    total = 0
+    for word in words:
+        typos = min(min(_edit_distance(word, other), _edit_distance(word, other[:len(word)]))
+                    for other in name_words)
+        if typos > max(1, len(word) // FUZZY_LETTERS_PER_TYPO):
+            return None
+        total += typos
+    return total
+
+
+def _records(ids):
+    # AppointmentRecords of the appointment ids, in the same order
+    if not ids:
+        return []
+    marks = ",".join("?" * len(ids))
+    found = {}
+    cursor = db.get_cursor()
+    for table in ("appointment", "appointment_archive"):
+        cursor.execute(f'''SELECT appointment.id, appointment.doctor_id, doctor.name, doctor.specialization,
+                                  appointment.patient_name, appointment.time_slot
+                           FROM {table} AS appointment
+                           JOIN doctor ON appointment.doctor_id = doctor.id
+                           WHERE appointment.id IN ({marks})''', ids)
+        for row in cursor.fetchall():
+            found[row[0]] = AppointmentRecord._make(row)
+    return [found[appointment_id] for appointment_id in ids if appointment_id in found]
+
+
+def _similar_names(query):
+    # Up to FUZZY_NAMES patient names similar to query, best first
+    trigrams = _trigrams(query)
+    cursor = db.get_cursor()
+    names = set()
+    for trigram in trigrams:
+        cursor.execute("SELECT patient_name FROM patient_search WHERE patient_search MATCH ? "
+                       "ORDER BY rowid DESC LIMIT ?", (_quote(trigram), FUZZY_SAMPLE))
+        names.update(row[0] for row in cursor.fetchall())
+    words = [word for word in query.lower().split() if len(word) >= MIN_WORD]
+    scored = []
+    for name in names:
+        typos = _typos(words, name)
+        if typos is not None:
+            scored.append((typos, -_similarity(trigrams, _trigrams(name)), name))
+    return [name for _, _, name in sorted(scored)[:FUZZY_NAMES]]
+
+
+def sync(batch_size=SYNC_BATCH):
+    # Re-indexes the queued appointments, batch_size per transaction so that
+    # bookings never wait long for the write lock; returns how many there were
+    count = 0
+    while True:
+        with db.transaction() as connection:
+            row = connection.execute("SELECT id FROM patient_search_queue ORDER BY id LIMIT 1 OFFSET ?",
+                                     (batch_size - 1,)).fetchone()
+            last = row[0] if row else connection.execute("SELECT MAX(id) FROM patient_search_queue").fetchone()[0]
+            if last is None:
+                return count
+            with metrics.operation("patient_search.sync"):
+                batch = "SELECT id FROM patient_search_queue WHERE id <= ?"
+                connection.execute(f"DELETE FROM patient_search WHERE rowid IN ({batch})", (last,))
+                for table in ("appointment_archive", "appointment"):
+                    connection.execute(f'''INSERT OR REPLACE INTO patient_search (rowid, patient_name)
+                                           SELECT id, patient_name FROM {table}
+                                           WHERE id IN ({batch}) AND isBooked != 0 AND patient_name IS NOT NULL''',
+                                       (last,))
+                count += connection.execute("DELETE FROM patient_search_queue WHERE id <= ?", (last,)).rowcount
+
+
+class _Indexer:
+    # The thread that runs sync() after commits; see the top of the file
+    def __init__(self):
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def committed(self):
+        if threading.current_thread() is self._thread:
+            return      # its own sync
+        self._wake.set()
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="patient-search-indexer", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            time.sleep(SYNC_DELAY)
+            self._wake.clear()
+            try:
+                if db.get_connection().execute("SELECT 1 FROM patient_search_queue LIMIT 1").fetchone():
+                    sync()
+            except sqlite3.Error as e:
+                log.warning("could not update the patient name index: %s", e)
+
+
+db.add_commit_hook(_Indexer().committed)
+
+
+def _page(conditions, params, after, limit):
+    # Appointment ids of one page of hits, newest first
+    where = " AND ".join(conditions)
+    if after is not None:
+        where += " AND rowid < ?"
+        params = (*params, after[1])
+    return [row[0] for row in db.get_connection().execute(
+        f"SELECT rowid FROM patient_search WHERE {where} ORDER BY rowid DESC LIMIT ?", (*params, limit))]
+
+
+def search(query, after=None, limit=PAGE_SIZE):
+    # One page of booked appointments whose patient name contains every
+    # word of query, as AppointmentRecords, newest booking first; or of
+    # patients with similar names when no name contains them. after is the
+    # cursor of the last row already shown. Returns (rows, cursor); cursor
+    # is None after the last page. Raises ValueError unless a word has at
+    # least MIN_WORD characters.
+    words = query.lower().split()
+    long_words = [word for word in words if len(word) >= MIN_WORD]
+    if not long_words:
+        raise ValueError(f"Give at least {MIN_WORD} letters of the patient name")
+    conditions = ["patient_search MATCH ?"]
+    params = [" AND ".join(_quote(word) for word in long_words)]
+    for word in words:
+        if len(word) < MIN_WORD:
+            conditions.append("patient_name LIKE ? ESCAPE '\\'")
+            params.append(_like(word))
+    ids = _page(conditions, params, after, limit)
+    if not ids and (after is None or not _page(conditions, params, None, 1)):
+        names = _similar_names(query)
+        if not names:
+            return [], None
+        # The phrase of a name also matches longer names containing it
+        ids = _page([f"patient_search MATCH ? AND patient_name IN ({','.join('?' * len(names))})"],
+                    [" OR ".join(_quote(name) for name in names), *names], after, limit)
+    rows = _records(ids)
+    return rows, rows[-1].cursor if len(ids) == limit and rows else None
+
+
+def iter_search(query, page_size=PAGE_SIZE):
+    # Streams every hit, holding only one page in memory
+    after = None
+    while True:
+        rows, after = search(query, after, page_size)
+        yield from rows
+        if after is None:
+            return
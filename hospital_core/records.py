@@ -0,0 +1,102 @@
+from collections import namedtuple
+
+from .timeslots import to_datetime
+
+
+# Lightweight rows returned by the query methods. They are plain tuples
+# (no per-row __dict__), so they are cheap to build in bulk and still read
+# by field name. time_slot is always epoch minutes; see timeslots.py.
+
+class DoctorRecord(namedtuple("DoctorRecord", "id name specialization gender exp")):
+    __slots__ = ()
+
+
+class ScheduleRule(namedtuple("ScheduleRule", "id doctor_id weekdays start_minute end_minute slot_minutes "
+                                              "valid_from valid_until")):
+    __slots__ = ()
+
+
+class ScheduleBreak(namedtuple("ScheduleBreak", "id doctor_id weekdays start_minute end_minute")):
+    __slots__ = ()
+
+
+class Leave(namedtuple("Leave", "id doctor_id first_day last_day")):
+    __slots__ = ()
+
+
+class WaitlistRecord(namedtuple("WaitlistRecord", "id doctor_id patient_name urgency requested_at")):
+    # requested_at is a Unix timestamp in seconds
+    __slots__ = ()
+
+
+class _Usage:
+    __slots__ = ()
+
+    @property
+    def utilization(self):
+        # Share of the day's slots that are booked, 0.0 to 1.0 (or more when
+        # bookings were kept after the schedule shrank)
+        return self.booked / self.capacity if self.capacity else 0.0
+
+
+class DoctorUsageRecord(_Usage, namedtuple("DoctorUsageRecord", "day doctor_id doctor_name specialization booked capacity")):
+    __slots__ = ()
+
+
+class SpecializationUsageRecord(_Usage, namedtuple("SpecializationUsageRecord",
+                                                   "day specialization doctors booked capacity")):
+    __slots__ = ()
+
+
+class ReassignmentRecord(namedtuple("ReassignmentRecord",
+                                    "appointment_id patient_name from_doctor_id from_slot to_doctor_id to_slot")):
+    # A booking moved to another doctor when its doctor left; see offboarding.py
+    __slots__ = ()
+
+
+class FreeSlotRecord(namedtuple("FreeSlotRecord", "time_slot doctor_id doctor_name specialization")):
+    __slots__ = ()
+
+
+class AppointmentRecord(namedtuple("AppointmentRecord",
+                                   "id doctor_id doctor_name specialization patient_name time_slot")):
+    __slots__ = ()
+
+    @property
+    def start(self):
+        return to_datetime(self.time_slot)
+
+    @property
+    def cursor(self):
+        # Keyset position of this row in time_slot, id order
+        return self.time_slot, self.id
+
+
+class BranchRecord(namedtuple("BranchRecord", "id name address database")):
+    # One branch of the hospital and its database file; see branches.py
+    __slots__ = ()
+
+
+# Rows of queries over several branches (see federation.py) carry the id of
+# the branch they come from; doctor and appointment ids are per branch.
+
+class BranchDoctorRecord(namedtuple("BranchDoctorRecord", "branch id name specialization gender exp")):
+    __slots__ = ()
+
+
+class BranchFreeSlotRecord(namedtuple("BranchFreeSlotRecord", "branch time_slot doctor_id doctor_name specialization")):
+    __slots__ = ()
+
+
+class BranchAppointmentRecord(namedtuple("BranchAppointmentRecord",
+                                         "branch id doctor_id doctor_name specialization patient_name time_slot")):
+    __slots__ = ()
+
+    @property
+    def start(self):
+        return to_datetime(self.time_slot)
+
+    @property
+    def cursor(self):
+        # Keyset position of this row in time_slot, branch, id order
+        return self.time_slot, self.branch, self.id
@@ -0,0 +1,250 @@
+# Rebuilding and checking the database from the operation journal.
+#
+#   python -m hospital_core.replay rebuild restored.db --journal hospital.journal
+#   python -m hospital_core.replay rebuild restored.db --journal hospital.journal --until 120000
+#   python -m hospital_core.replay verify --journal hospital.journal
+#
+# rebuild copies the journal's base (the database as it was when the journal
+# was started, see journal.py) to a new file and applies the journaled
+# changes to it in order, REPLAY_BATCH per transaction, up to the record
+# numbered --until if given. The copy is migrated to the current schema
+# first, and the usage summaries and the patient search queue follow from
+# the triggers as the changes are applied.
+#
+# verify rebuilds into a temporary file and compares every table the journal
+# covers with the database, row by row, reporting the ids of rows that are
+# missing or different. Run it while nothing writes to the database, or
+# changes committed after the last journal write show up as differences.
+
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import closing
+
+from . import archive, db, journal, offboarding
+
+
+REPLAY_BATCH = 10000
+SAMPLE_IDS = 5          # ids of differing rows listed per table
+
+# The tables written by journaled operations; the rest is derived from them
+TABLES = ("doctor", "schedule_rule", "schedule_break", "doctor_leave", "appointment", "appointment_archive",
+          "waitlist")
+SCHEDULE_TABLES = ("schedule_rule", "schedule_break", "doctor_leave")
+
+
+def _start(connection, change):
+    # The first record only names the database the journal belongs to
+    pass
+
+
+def _add_doctor(connection, change):
+    connection.execute("INSERT INTO doctor (id, name, specialization, gender, exp) VALUES (?, ?, ?, ?, ?)",
+                       (change["id"], change["name"], change["specialization"], change["gender"], change["exp"]))
+
+
+def _add_hours(connection, change):
+    connection.execute('''INSERT INTO schedule_rule (id, doctor_id, weekdays, start_minute, end_minute, slot_minutes,
+                                                     valid_from, valid_until) VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                       (change["id"], change["doctor_id"], change["weekdays"], change["start_minute"],
+                        change["end_minute"], change["slot_minutes"], change["valid_from"], change["valid_until"]))
+
+
+def _end_hours(connection, change):
+    connection.execute("UPDATE schedule_rule SET valid_until = ? WHERE id = ?", (change["valid_until"], change["id"]))
+
+
+def _add_break(connection, change):
+    connection.execute('''INSERT INTO schedule_break (id, doctor_id, weekdays, start_minute, end_minute)
+                          VALUES (?, ?, ?, ?, ?)''',
+                       (change["id"], change["doctor_id"], change["weekdays"], change["start_minute"],
+                        change["end_minute"]))
+
+
+def _add_leave(connection, change):
+    connection.execute("INSERT INTO doctor_leave (id, doctor_id, first_day, last_day) VALUES (?, ?, ?, ?)",
+                       (change["id"], change["doctor_id"], change["first_day"], change["last_day"]))
+
+
+def _remove(connection, change):
+    if change["table"] not in SCHEDULE_TABLES:
+        raise ValueError(f"cannot remove rows of {change['table']!r}")
+    connection.execute(f"DELETE FROM {change['table']} WHERE id = ?", (change["id"],))
+
+
+def _book(connection, change):
+    # Bookings are journaled by slot, like cancellations. Applied in the same
+    # order to the same rows, the inserts get the same ids as they did.
+    connection.execute('''INSERT INTO appointment (doctor_id, time_slot, patient_name, isBooked) VALUES (?, ?, ?, 1)
+                          ON CONFLICT (doctor_id, time_slot) DO UPDATE
+                          SET patient_name = excluded.patient_name, isBooked = 1''',
+                       (change["doctor_id"], change["time_slot"], change["patient_name"]))
+
+
+def _cancel(connection, change):
+    slot = (change["doctor_id"], change["time_slot"])
+    if change["waiter_id"] is None:
+        connection.execute("DELETE FROM appointment WHERE doctor_id = ? AND time_slot = ?", slot)
+    else:
+        connection.execute("UPDATE appointment SET patient_name = ? WHERE doctor_id = ? AND time_slot = ?",
+                           (change["patient_name"], *slot))
+        connection.execute("DELETE FROM waitlist WHERE id = ?", (change["waiter_id"],))
+
+
+def _join_waitlist(connection, change):
+    connection.execute("INSERT INTO waitlist (id, doctor_id, patient_name, urgency, requested_at) VALUES (?, ?, ?, ?, ?)",
+                       (change["id"], change["doctor_id"], change["patient_name"], change["urgency"],
+                        change["requested_at"]))
+
+
+def _leave_waitlist(connection, change):
+    connection.execute("DELETE FROM waitlist WHERE id = ?", (change["id"],))
+
+
+def _offboard(connection, change):
+    offboarding.apply(connection, change["doctor_ids"], change["day"], change["moves"])
+
+
+def _archive(connection, change):
+    archive.move_batch(connection, change["after_id"], change["last_id"], change["cutoff"])
+
+
+APPLY = {
+    "start": _start,
+    "add_doctor": _add_doctor,
+    "add_hours": _add_hours,
+    "end_hours": _end_hours,
+    "add_break": _add_break,
+    "add_leave": _add_leave,
+    "remove": _remove,
+    "book": _book,
+    "cancel": _cancel,
+    "join_waitlist": _join_waitlist,
+    "leave_waitlist": _leave_waitlist,
+    "offboard": _offboard,
+    "archive": _archive,
+}
+
+
+class ReplayReport:
+    def __init__(self):
+        self.applied = 0
+        self.last_seq = 0
+        self.operations = {}    # {op: count}
+        self.elapsed = 0.0
+
+    def __str__(self):
+        counts = ", ".join(f"{op} {count}" for op, count in sorted(self.operations.items()))
+        return f"{self.applied} changes replayed up to #{self.last_seq} ({counts or 'none'}), {self.elapsed:.2f}s"
+
+
+class VerifyReport:
+    def __init__(self, replay):
+        self.replay = replay
+        self.differences = {}   # {table: (rows differing, sample ids)}
+
+    def __bool__(self):
+        # True when the database matches the journal
+        return not self.differences
+
+    def __str__(self):
+        lines = [str(self.replay)]
+        if not self.differences:
+            lines.append("the database matches the journal")
+        for table, (count, ids) in self.differences.items():
+            lines.append(f"  {table}: {count} rows differ, ids {', '.join(map(str, ids))}")
+        return "\n".join(lines)
+
+
+def rebuild(journal_path, target, until=None):
+    # Writes the database the journal describes to target, which must not
+    # exist yet; returns a ReplayReport
+    base = journal.base_path(journal_path)
+    if not os.path.exists(base):
+        raise ValueError(f"{base} is missing; the journal cannot be replayed without its base")
+    if os.path.exists(target):
+        raise ValueError(f"{target} already exists")
+    begin = time.perf_counter()
+    report = ReplayReport()
+    shutil.copyfile(base, target)
+    with closing(db.connect(target)) as connection:
+        connection.execute("BEGIN IMMEDIATE")
+        for change in journal.read(journal_path):
+            if until is not None and change["seq"] > until:
+                break
+            if change["seq"] != report.last_seq + 1:
+                raise ValueError(f"{journal_path}: record #{change['seq']} follows #{report.last_seq}")
+            apply = APPLY.get(change["op"])
+            if apply is None:
+                raise ValueError(f"{journal_path}: record #{change['seq']} has an unknown operation {change['op']!r}")
+            apply(connection, change)
+            report.last_seq = change["seq"]
+            report.applied += 1
+            report.operations[change["op"]] = report.operations.get(change["op"], 0) + 1
+            if report.applied % REPLAY_BATCH == 0:
+                connection.execute("COMMIT")
+                connection.execute("BEGIN IMMEDIATE")
+        connection.execute("COMMIT")
+    report.elapsed = time.perf_counter() - begin
+    return report
+
+
+def compare(expected, actual):
+    # {table: (rows differing, sample ids)} of the tables where the two
+    # databases differ
+    differences = {}
+    with closing(sqlite3.connect(expected)) as connection:
+        connection.execute("ATTACH DATABASE ? AS actual", (actual,))
+        for table in TABLES:
+            differing = f'''SELECT id FROM (SELECT * FROM main.{table} EXCEPT SELECT * FROM actual.{table})
+                            UNION SELECT id FROM (SELECT * FROM actual.{table} EXCEPT SELECT * FROM main.{table})'''
+            count = connection.execute(f"SELECT COUNT(*) FROM ({differing})").fetchone()[0]
+            if count:
+                ids = [row[0] for row in connection.execute(f"{differing} ORDER BY id LIMIT ?", (SAMPLE_IDS,))]
+                differences[table] = (count, ids)
+    return differences
+
+
+def verify(journal_path, database=None):
+    # Rebuilds from the journal into a temporary file and compares it with
+    # database (by default the one the journal was started for); returns a
+    # VerifyReport, true when they match
+    if database is None:
+        database = next(journal.read(journal_path))["database"]
+    with tempfile.TemporaryDirectory() as folder:
+        rebuilt = os.path.join(folder, "replayed.db")
+        report = VerifyReport(rebuild(journal_path, rebuilt))
+        report.differences = compare(rebuilt, database)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild or check the database from the operation journal")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild_parser = commands.add_parser("rebuild", help="write the database the journal describes to a new file")
+    rebuild_parser.add_argument("target")
+    rebuild_parser.add_argument("--until", type=int, help="last record to apply")
+    verify_parser = commands.add_parser("verify", help="compare the database with the journal")
+    verify_parser.add_argument("--db", help="database to check (default: the one the journal was started for)")
+    for command in (rebuild_parser, verify_parser):
+        command.add_argument("--journal", default=db.JOURNAL_PATH, required=db.JOURNAL_PATH is None,
+                             help="journal file (default HARSHA_JOURNAL)")
+    args = parser.parse_args()
+    try:
+        if args.command == "rebuild":
+            print(rebuild(args.journal, args.target, args.until))
+        else:
+            report = verify(args.journal, args.db)
+            print(report)
+            if not report:
+                sys.exit(1)
+    except ValueError as e:
+        sys.exit(f"error: {e}")
+
+
+if __name__ == "__main__":
+    main()
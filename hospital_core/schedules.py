@@ -0,0 +1,115 @@
+from datetime import time
+
+from .records import Leave, ScheduleBreak, ScheduleRule
+from .timeslots import MINUTES_PER_DAY
+
+
+# A doctor's slots are not stored; they follow from the doctor's schedule:
+#
+#   working hours  recurring on some weekdays, from start to end, cut into
+#                  slots of slot_minutes, optionally only between two days
+#   breaks         recurring times on some weekdays where no slot may overlap
+#   leave          whole days off, from first_day to last_day
+#
+# Only bookings are rows in appointment; a free slot is a slot of the
+# schedule that has no booking. Days are day numbers (days since 1970-01-01,
+# see timeslots.py) and times are minutes since midnight.
+#
+# A day's slots are an integer bitmask with bit m set when a slot starts at
+# minute m of the day, so "slots minus bookings" is a single AND NOT.
+
+MONDAY, TUESDAY, WEDNESDAY, THURSDAY, FRIDAY, SATURDAY, SUNDAY = (1 << n for n in range(7))
+WEEKDAYS = MONDAY | TUESDAY | WEDNESDAY | THURSDAY | FRIDAY
+EVERY_DAY = WEEKDAYS | SATURDAY | SUNDAY
+
+# Working hours a new doctor gets
+DEFAULT_START = 9 * 60
+DEFAULT_END = 17 * 60
+DEFAULT_SLOT_MINUTES = 30
+
+
+def weekday(day):
+    # Monday is 0; day 0 (1970-01-01) was a Thursday
+    return (day + 3) % 7
+
+
+def minute_of_day(value):
+    # Accepts minutes since midnight, a datetime.time or "HH:MM"
+    if isinstance(value, int):
+        minutes = value
+    elif isinstance(value, time):
+        minutes = value.hour * 60 + value.minute
+    else:
+        hours, _, minutes = str(value).partition(":")
+        minutes = int(hours) * 60 + int(minutes or 0)
+    if not 0 <= minutes <= MINUTES_PER_DAY:
+        raise ValueError(f"Not a time of day: {value!r}")
+    return minutes
+
+
+class DoctorSchedule:
+    # The schedule rows of one doctor, answering which slots a day has
+    def __init__(self, rules=(), breaks=(), leaves=()):
+        self.rules = list(rules)
+        self.breaks = list(breaks)
+        self.leaves = list(leaves)
+        self._masks = {}    # {(weekday, rule ids): mask}; days repeat weekly
+
+    def on_leave(self, day):
+        return any(leave.first_day <= day <= leave.last_day for leave in self.leaves)
+
+    def day_mask(self, day):
+        # Bitmask of the slot start minutes of the day
+        if self.on_leave(day):
+            return 0
+        day_of_week = weekday(day)
+        rules = tuple(rule for rule in self.rules
+                      if rule.weekdays >> day_of_week & 1 and rule.valid_from <= day
+                      and (rule.valid_until is None or day <= rule.valid_until))
+        if not rules:
+            return 0
+        key = (day_of_week, tuple(rule.id for rule in rules))
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = self._masks[key] = self._build_mask(day_of_week, rules)
+        return mask
+
+    def _build_mask(self, day_of_week, rules):
+        breaks = [item for item in self.breaks if item.weekdays >> day_of_week & 1]
+        mask = 0
+        for rule in rules:
+            for start in range(rule.start_minute, rule.end_minute - rule.slot_minutes + 1, rule.slot_minutes):
+                end = start + rule.slot_minutes
+                if not any(item.start_minute < end and start < item.end_minute for item in breaks):
+                    mask |= 1 << start
+        return mask
+
+
+def load_schedules(connection, doctor_id=None, specialization=None):
+    # {doctor_id: DoctorSchedule} for every doctor with schedule rows, or
+    # only for the given doctor, or the doctors of the given specialization
+    if doctor_id is not None:
+        where, params = "WHERE doctor_id = ?", (doctor_id,)
+    elif specialization is not None:
+        where, params = "WHERE doctor_id IN (SELECT id FROM doctor WHERE specialization = ?)", (specialization,)
+    else:
+        where, params = "", ()
+    schedules = {}
+
+    def schedule(owner):
+        found = schedules.get(owner)
+        if found is None:
+            found = schedules[owner] = DoctorSchedule()
+        return found
+
+    for row in connection.execute(f'''SELECT id, doctor_id, weekdays, start_minute, end_minute, slot_minutes,
+                                             valid_from, valid_until
+                                      FROM schedule_rule {where} ORDER BY id''', params):
+        schedule(row[1]).rules.append(ScheduleRule._make(row))
+    for row in connection.execute(f'''SELECT id, doctor_id, weekdays, start_minute, end_minute
+                                      FROM schedule_break {where} ORDER BY id''', params):
+        schedule(row[1]).breaks.append(ScheduleBreak._make(row))
+    for row in connection.execute(f'''SELECT id, doctor_id, first_day, last_day
+                                      FROM doctor_leave {where} ORDER BY id''', params):
+        schedule(row[1]).leaves.append(Leave._make(row))
+    return schedules
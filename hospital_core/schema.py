@@ -0,0 +1,293 @@
+import sqlite3
+from datetime import date
+
+from .timeslots import day_number
+
+
+def _time_slots_to_minutes(connection):
+    # Rebuilds appointment with an INTEGER time_slot holding epoch minutes
+    # (see timeslots.py) in place of the "YYYY-MM-DD HH:MM:SS" text
+    connection.execute('''CREATE TABLE appointment_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            doctor_id INTEGER NOT NULL,
+            time_slot INTEGER NOT NULL,
+            patient_name TEXT,
+            isBooked INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (doctor_id) REFERENCES doctor(id)
+        )''')
+    connection.execute('''INSERT INTO appointment_new (id, doctor_id, time_slot, patient_name, isBooked)
+        SELECT id, doctor_id,
+               CASE WHEN typeof(time_slot) = 'integer' THEN time_slot
+                    ELSE CAST(round((julianday(time_slot) - 2440587.5) * 1440) AS INTEGER) END,
+               patient_name, isBooked
+        FROM appointment''')
+    connection.execute("DROP TABLE appointment")
+    connection.execute("ALTER TABLE appointment_new RENAME TO appointment")
+    # Dropping the old table dropped its indexes
+    connection.execute('''CREATE UNIQUE INDEX idx_appointment_doctor_slot
+        ON appointment (doctor_id, time_slot)''')
+    connection.execute('''CREATE INDEX idx_appointment_booked_time
+        ON appointment (time_slot, id) WHERE isBooked != 0''')
+    connection.execute('''CREATE INDEX idx_appointment_booked_doctor
+        ON appointment (doctor_id, time_slot, id) WHERE isBooked != 0''')
+
+
+def _schedule_tables(connection):
+    # Slots now follow from per-doctor schedules (see schedules.py) instead of
+    # being stored as free rows. Every existing doctor keeps the hours the old
+    # slot rows had, 09:00-17:00 in 30 minute slots, every day from the day
+    # of their first slot (or today) on; then the free rows go.
+    connection.execute('''CREATE TABLE IF NOT EXISTS schedule_rule (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            doctor_id INTEGER NOT NULL,
+            weekdays INTEGER NOT NULL,
+            start_minute INTEGER NOT NULL,
+            end_minute INTEGER NOT NULL,
+            slot_minutes INTEGER NOT NULL,
+            valid_from INTEGER NOT NULL,
+            valid_until INTEGER,
+            FOREIGN KEY (doctor_id) REFERENCES doctor(id)
+        )''')
+    connection.execute('''CREATE TABLE IF NOT EXISTS schedule_break (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            doctor_id INTEGER NOT NULL,
+            weekdays INTEGER NOT NULL,
+            start_minute INTEGER NOT NULL,
+            end_minute INTEGER NOT NULL,
+            FOREIGN KEY (doctor_id) REFERENCES doctor(id)
+        )''')
+    connection.execute('''CREATE TABLE IF NOT EXISTS doctor_leave (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            doctor_id INTEGER NOT NULL,
+            first_day INTEGER NOT NULL,
+            last_day INTEGER NOT NULL,
+            FOREIGN KEY (doctor_id) REFERENCES doctor(id)
+        )''')
+    for table in ("schedule_rule", "schedule_break", "doctor_leave"):
+        connection.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_doctor ON {table} (doctor_id)")
+    connection.execute('''INSERT INTO schedule_rule (doctor_id, weekdays, start_minute, end_minute, slot_minutes, valid_from)
+        SELECT id, 127, 540, 1020, 30,
+               COALESCE((SELECT MIN(time_slot) FROM appointment WHERE doctor_id = doctor.id) / 1440, ?)
+        FROM doctor''', (day_number(date.today()),))
+    connection.execute("DELETE FROM appointment WHERE isBooked = 0")
+
+
+# Each migration upgrades the database by one version. The version that has
+# been applied is kept in PRAGMA user_version, so running migrate() again on
+# an up-to-date database does nothing and existing rows are never dropped.
+# Only ever append to this list; never edit a migration that has shipped.
+MIGRATIONS = [
+    # 1: the original doctor / appointment tables
+    [
+        '''CREATE TABLE IF NOT EXISTS doctor (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            gender TEXT,
+            exp INTEGER,
+            specialization TEXT NOT NULL
+        )''',
+        '''CREATE TABLE IF NOT EXISTS appointment (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            doctor_id INTEGER NOT NULL,
+            time_slot DATETIME NOT NULL,
+            patient_name TEXT,
+            isBooked INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (doctor_id) REFERENCES doctor(id)
+        )''',
+    ],
+    # 2: one slot row per (doctor, time) so a booking is a single index probe.
+    # Duplicate free rows left by older versions are removed first.
+    [
+        '''DELETE FROM appointment
+           WHERE isBooked = 0 AND EXISTS (
+               SELECT 1 FROM appointment AS other
+               WHERE other.doctor_id = appointment.doctor_id
+                 AND other.time_slot = appointment.time_slot
+                 AND other.id != appointment.id
+                 AND (other.isBooked != 0 OR other.id < appointment.id))''',
+        '''CREATE UNIQUE INDEX IF NOT EXISTS idx_appointment_doctor_slot
+           ON appointment (doctor_id, time_slot)''',
+    ],
+    # 3: partial indexes holding only booked rows, in listing order, for the
+    # keyset-paginated appointment listings; and doctors by specialization
+    [
+        '''CREATE INDEX IF NOT EXISTS idx_appointment_booked_time
+           ON appointment (time_slot, id) WHERE isBooked != 0''',
+        '''CREATE INDEX IF NOT EXISTS idx_appointment_booked_doctor
+           ON appointment (doctor_id, time_slot, id) WHERE isBooked != 0''',
+        '''CREATE INDEX IF NOT EXISTS idx_doctor_specialization
+           ON doctor (specialization)''',
+    ],
+    # 4: time_slot as integer epoch minutes instead of text
+    [
+        _time_slots_to_minutes,
+    ],
+    # 5: doctor names are unique; older duplicates get their id appended
+    [
+        '''UPDATE doctor SET name = name || ' #' || id
+           WHERE id NOT IN (SELECT MIN(id) FROM doctor GROUP BY name)''',
+        '''CREATE UNIQUE INDEX IF NOT EXISTS idx_doctor_name ON doctor (name)''',
+    ],
+    # 6: booked appointments of past days are moved here (see archive.py),
+    # keeping their ids, so appointment only holds the working set
+    [
+        '''CREATE TABLE IF NOT EXISTS appointment_archive (
+            id INTEGER PRIMARY KEY,
+            doctor_id INTEGER NOT NULL,
+            time_slot INTEGER NOT NULL,
+            patient_name TEXT,
+            isBooked INTEGER NOT NULL DEFAULT 1
+        )''',
+        '''CREATE INDEX IF NOT EXISTS idx_archive_time
+           ON appointment_archive (time_slot, id)''',
+        '''CREATE INDEX IF NOT EXISTS idx_archive_doctor
+           ON appointment_archive (doctor_id, time_slot, id)''',
+    ],
+    # 7: schedule rules, breaks and leave; appointment keeps bookings only
+    [
+        _schedule_tables,
+    ],
+    # 8: patients waiting for a slot with a doctor (see waitlist.py)
+    [
+        '''CREATE TABLE IF NOT EXISTS waitlist (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            doctor_id INTEGER NOT NULL,
+            patient_name TEXT NOT NULL,
+            urgency INTEGER NOT NULL DEFAULT 0,
+            requested_at REAL NOT NULL,
+            FOREIGN KEY (doctor_id) REFERENCES doctor(id)
+        )''',
+        '''CREATE INDEX IF NOT EXISTS idx_waitlist_doctor ON waitlist (doctor_id)''',
+    ],
+    # 9: booked-appointment counts per doctor per day and per specialization
+    # per day, kept current by triggers (see utilization.py). Archived rows
+    # still count, so moving a row to the archive leaves the totals alone.
+    [
+        '''CREATE TABLE IF NOT EXISTS doctor_day_usage (
+            day INTEGER NOT NULL,
+            doctor_id INTEGER NOT NULL,
+            booked INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, doctor_id)
+        ) WITHOUT ROWID''',
+        '''CREATE TABLE IF NOT EXISTS specialization_day_usage (
+            day INTEGER NOT NULL,
+            specialization TEXT NOT NULL,
+            booked INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, specialization)
+        ) WITHOUT ROWID''',
+        '''INSERT INTO doctor_day_usage (day, doctor_id, booked)
+           SELECT time_slot / 1440, doctor_id, COUNT(*)
+           FROM (SELECT doctor_id, time_slot FROM appointment WHERE isBooked != 0
+                 UNION ALL SELECT doctor_id, time_slot FROM appointment_archive WHERE isBooked != 0)
+           GROUP BY 1, 2''',
+        '''INSERT INTO specialization_day_usage (day, specialization, booked)
+           SELECT usage.day, doctor.specialization, SUM(usage.booked)
+           FROM doctor_day_usage AS usage JOIN doctor ON doctor.id = usage.doctor_id
+           GROUP BY 1, 2''',
+        *(f'''CREATE TRIGGER IF NOT EXISTS {table}_usage_insert AFTER INSERT ON {table}
+              WHEN NEW.isBooked != 0
+              BEGIN
+                  INSERT INTO doctor_day_usage (day, doctor_id, booked) VALUES (NEW.time_slot / 1440, NEW.doctor_id, 1)
+                  ON CONFLICT (day, doctor_id) DO UPDATE SET booked = booked + 1;
+                  INSERT INTO specialization_day_usage (day, specialization, booked)
+                  SELECT NEW.time_slot / 1440, specialization, 1 FROM doctor WHERE id = NEW.doctor_id
+                  ON CONFLICT (day, specialization) DO UPDATE SET booked = booked + 1;
+              END''' for table in ("appointment", "appointment_archive")),
+        '''CREATE TRIGGER IF NOT EXISTS appointment_usage_delete AFTER DELETE ON appointment
+           WHEN OLD.isBooked != 0
+           BEGIN
+               UPDATE doctor_day_usage SET booked = booked - 1
+               WHERE day = OLD.time_slot / 1440 AND doctor_id = OLD.doctor_id;
+               UPDATE specialization_day_usage SET booked = booked - 1
+               WHERE day = OLD.time_slot / 1440
+                 AND specialization = (SELECT specialization FROM doctor WHERE id = OLD.doctor_id);
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS appointment_usage_update AFTER UPDATE OF doctor_id, time_slot, isBooked ON appointment
+           WHEN (OLD.isBooked != 0) != (NEW.isBooked != 0) OR OLD.doctor_id != NEW.doctor_id
+             OR OLD.time_slot != NEW.time_slot
+           BEGIN
+               UPDATE doctor_day_usage SET booked = booked - 1
+               WHERE OLD.isBooked != 0 AND day = OLD.time_slot / 1440 AND doctor_id = OLD.doctor_id;
+               UPDATE specialization_day_usage SET booked = booked - 1
+               WHERE OLD.isBooked != 0 AND day = OLD.time_slot / 1440
+                 AND specialization = (SELECT specialization FROM doctor WHERE id = OLD.doctor_id);
+               INSERT INTO doctor_day_usage (day, doctor_id, booked)
+               SELECT NEW.time_slot / 1440, NEW.doctor_id, 1 WHERE NEW.isBooked != 0
+               ON CONFLICT (day, doctor_id) DO UPDATE SET booked = booked + 1;
+               INSERT INTO specialization_day_usage (day, specialization, booked)
+               SELECT NEW.time_slot / 1440, specialization, 1 FROM doctor WHERE id = NEW.doctor_id AND NEW.isBooked != 0
+               ON CONFLICT (day, specialization) DO UPDATE SET booked = booked + 1;
+           END''',
+    ],
+    # 10: doctors who left keep their row, for their past appointments and
+    # the usage summaries; left_on is the day number they left on, NULL
+    # while they work here (see offboarding.py)
+    [
+        '''ALTER TABLE doctor ADD COLUMN left_on INTEGER''',
+    ],
+    # 11: trigram full-text index of the patient names of booked
+    # appointments, live and archived, keyed by appointment id (see
+    # patient_search.py). Triggers only queue the ids of changed rows in
+    # patient_search_queue; the index catches up on them in one batch
+    # shortly after, so a booking does not pay for an FTS5 segment write.
+    [
+        '''CREATE VIRTUAL TABLE IF NOT EXISTS patient_search
+           USING fts5(patient_name, tokenize = 'trigram')''',
+        '''CREATE TABLE IF NOT EXISTS patient_search_queue (id INTEGER PRIMARY KEY)''',
+        '''INSERT INTO patient_search (rowid, patient_name)
+           SELECT id, patient_name FROM appointment WHERE isBooked != 0 AND patient_name IS NOT NULL
+           UNION ALL
+           SELECT id, patient_name FROM appointment_archive WHERE isBooked != 0 AND patient_name IS NOT NULL''',
+        *(f'''CREATE TRIGGER IF NOT EXISTS {table}_search_insert AFTER INSERT ON {table}
+              WHEN NEW.isBooked != 0
+              BEGIN
+                  INSERT OR IGNORE INTO patient_search_queue (id) VALUES (NEW.id);
+              END''' for table in ("appointment", "appointment_archive")),
+        '''CREATE TRIGGER IF NOT EXISTS appointment_search_delete AFTER DELETE ON appointment
+           WHEN OLD.isBooked != 0
+           BEGIN
+               INSERT OR IGNORE INTO patient_search_queue (id) VALUES (OLD.id);
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS appointment_search_update AFTER UPDATE OF patient_name, isBooked ON appointment
+           WHEN OLD.patient_name IS NOT NEW.patient_name OR (OLD.isBooked != 0) != (NEW.isBooked != 0)
+           BEGIN
+               INSERT OR IGNORE INTO patient_search_queue (id) VALUES (OLD.id);
+           END''',
+    ],
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_version(connection):
+    return connection.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(connection):
+    # Creates the tables on a new database or upgrades an older one in place
+    version = get_version(connection)
+    if version > SCHEMA_VERSION:
+        raise sqlite3.DatabaseError(
+            f"Database schema version {version} is newer than this program ({SCHEMA_VERSION})")
+    while version < SCHEMA_VERSION:
+        connection.execute("BEGIN IMMEDIATE")
+        # Another process may have migrated while we waited for the lock
+        number = get_version(connection)
+        if number >= SCHEMA_VERSION:
+            connection.execute("COMMIT")
+            break
+        steps = MIGRATIONS[number]
+        try:
+            for step in steps:
+                if callable(step):
+                    step(connection)
+                else:
+                    connection.execute(step)
+            connection.execute(f"PRAGMA user_version = {number + 1}")
+            connection.execute("COMMIT")
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        version = number + 1
+    return SCHEMA_VERSION
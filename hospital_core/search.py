@@ -0,0 +1,52 @@
+import heapq
+from datetime import datetime
+
+from .availability import availability_index
+from .directory import doctor_directory
+from .records import FreeSlotRecord
+from .timeslots import MINUTES_PER_DAY, to_minutes
+
+
+# "First free slot" search across every doctor of a specialization.
+#
+# The doctor directory already groups doctors by specialization and the
+# availability index finds a doctor's next free slot from its per-day
+# bitmasks without a query. The search is a k-way merge of those per-doctor
+# streams: a heap holds each doctor's next free slot, the earliest is taken
+# and replaced by that doctor's following one, and it stops after `limit`
+# slots. The cost is one lookup per doctor plus log(doctors) per slot
+# returned, however many days of slots the doctors have.
+
+def earliest_slots(specialization, limit=5, after=None):
+    # The `limit` earliest free slots starting at or after `after` (default
+    # now) among the doctors of the specialization, as FreeSlotRecords in
+    # time order; ties go to the lower doctor id
+    start = to_minutes(after if after is not None else datetime.now())
+    return merge_free_slots(doctor_directory.by_specialization(specialization), availability_index, start, limit)
+
+
+def merge_free_slots(doctors, index, start, limit, end_day=None):
+    # The merge itself, over the given doctors and AvailabilityIndex; with
+    # end_day, slots from that day number on are not looked for
+    def next_free_before_end(doctor_id, time_slot):
+        days = end_day - time_slot // MINUTES_PER_DAY
+        return index.next_free(doctor_id, time_slot, days) if days > 0 else None
+
+    next_free = index.next_free if end_day is None else next_free_before_end
+
+    heap = []
+    for doctor in doctors:
+        time_slot = next_free(doctor.id, start)
+        if time_slot is not None:
+            heap.append((time_slot, doctor.id, doctor))
+    heapq.heapify(heap)
+    result = []
+    while heap and len(result) < limit:
+        time_slot, doctor_id, doctor = heap[0]
+        result.append(FreeSlotRecord(time_slot, doctor_id, doctor.name, doctor.specialization))
+        following = next_free(doctor_id, time_slot + 1)
+        if following is None:
+            heapq.heappop(heap)
+        else:
+            heapq.heapreplace(heap, (following, doctor_id, doctor))
+    return result
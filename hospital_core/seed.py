@@ -0,0 +1,38 @@
+from datetime import date, datetime
+
+from . import db
+from .models import Admin, Appointment
+
+
+time_format = '%Y-%m-%d %H:%M'
+
+
+def seed_demo_data():
+    # Adds the demo doctors and bookings, but only to an empty database so
+    # that restarting the application keeps whatever is already stored.
+    with db.transaction() as connection:
+        if connection.execute("SELECT 1 FROM doctor LIMIT 1").fetchone():
+            return False
+        _add_demo_data()
+    return True
+
+
+def _add_demo_data():
+    # Adding doctors
+    Admin.add_doctor("Prashanth", "Ortho", "Male", 4)
+    Admin.add_doctor("Rahul", "General", "Male", 5)
+    Admin.add_doctor("Rani", "Gyno", "Female", 1)
+    Admin.add_doctor("Raju", "Dentist", "Male", 2)
+    Admin.add_doctor("Laxmi", "Ortho", "Female", 3)
+    Admin.add_doctor("Salla Arvind", "neuro_Surgeon", "male", 1)
+
+    # Booking appointments
+    today = str(date.today())
+    Appointment.book_many([
+        ("Naga", 3, datetime.strptime(today + " 10:30", time_format)),
+        ("Vinesh", 1, datetime.strptime(today + " 09:30", time_format)),
+        ("Rahul", 1, datetime.strptime(today + " 11:30", time_format)),
+        ("Nani", 4, datetime.strptime(today + " 12:00", time_format)),
+        ("Bujji", 2, datetime.strptime(today + " 14:00", time_format)),
+        ("Rishi", 5, datetime.strptime(today + " 10:00", time_format)),
+    ])
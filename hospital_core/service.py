@@ -0,0 +1,464 @@
+# Local HTTP/JSON booking service.
+#
+#   python -m hospital_core.service --port 8080
+#
+#   GET  /doctors                       all doctors
+#   GET  /doctors/<id>/free-slots       free slots, optional ?day=YYYY-MM-DD
+#   GET  /specializations               specializations that have doctors
+#   GET  /earliest-slots                earliest free slots of a specialization
+#        ?specialization=&limit=&after=YYYY-MM-DD HH:MM
+#   POST /appointments                  {"patient_name", "doctor_id", "time_slot": "YYYY-MM-DD HH:MM"}
+#   POST /appointments/cancel           {"patient_name", "doctor_id", "time_slot"}; the slot goes to
+#                                       the doctor's next waitlisted patient, if any
+#   POST /waitlist                      {"patient_name", "doctor_id", "urgency": 0}
+#   GET  /admin/appointments            booked appointments, one page per call (HTTP basic auth)
+#        ?start=&end=&doctor_id=&specialization=&limit=&after_time=&after_id=&history=1
+#   GET  /admin/patients?q=             appointments of patients whose name contains q, or is
+#        &limit=&after_time=&after_id=  similar to it when none does; one page per call (HTTP basic auth)
+#   GET  /admin/waitlist?doctor_id=     the doctor's waitlist, next first (HTTP basic auth)
+#   POST /admin/doctors/offboard        {"doctor_ids": [...]}; the doctors leave and their future
+#                                       appointments move to other doctors (HTTP basic auth)
+#   GET  /admin/utilization?day=        bookings against capacity per specialization and doctor,
+#                                       from the summary tables (HTTP basic auth)
+#   GET  /admin/metrics                 latency metrics snapshot, see metrics.py (HTTP basic auth)
+#
+# Head-office views over every branch listed in HARSHA_BRANCHES (see
+# federation.py); rows carry their branch id:
+#
+#   GET  /branches                      the branches
+#   GET  /branches/doctors              doctors of every branch, optional ?specialization=
+#   GET  /branches/earliest-slots       earliest free slots of a specialization at any branch
+#        ?specialization=&limit=&after=YYYY-MM-DD HH:MM
+#   GET  /admin/branches/appointments   booked appointments of every branch in time order, one page
+#        ?start=&end=&specialization=   per call (HTTP basic auth)
+#        &limit=&after_time=&after_branch=&after_id=&history=1
+#
+# With --branch (or HARSHA_BRANCH) the service runs as that branch, on its
+# database.
+#
+# The event loop only parses requests and writes responses. Everything that
+# touches SQLite runs on a bounded thread pool, and each pool thread uses its
+# own pooled connection, so a slow query never stalls other clients.
+
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from . import branches, db, patient_search
+from .archive import archive_past_days
+from .availability import availability_index
+from .federation import Federation
+from .metrics import metrics
+from .models import Admin, Appointment, BookingResult, CancelResult, Doctor, Harsha_Hospital
+from .timeslots import format_slot
+
+
+ADMIN_USERNAME = "Admin"
+ADMIN_PASSWORD = "00000000"
+
+log = logging.getLogger(__name__)
+
+MAX_BODY = 64 * 1024
+time_format = '%Y-%m-%d %H:%M'
+
+BOOKING_STATUS = {
+    BookingResult.BOOKED: HTTPStatus.CREATED,
+    BookingResult.ALREADY_TAKEN: HTTPStatus.CONFLICT,
+    BookingResult.NO_SUCH_SLOT: HTTPStatus.NOT_FOUND,
+    BookingResult.INVALID: HTTPStatus.BAD_REQUEST,
+}
+
+CANCEL_STATUS = {
+    CancelResult.CANCELLED: HTTPStatus.OK,
+    CancelResult.REFILLED: HTTPStatus.OK,
+    CancelResult.NOT_BOOKED: HTTPStatus.NOT_FOUND,
+}
+
+
+def parse_limit(query, default, maximum):
+    # The ?limit= of a request, capped at maximum; ValueError below 1
+    limit = int(query.get("limit", default))
+    if limit < 1:
+        raise ValueError(f"limit must be at least 1, not {limit}")
+    return min(limit, maximum)
+
+
+class HttpError(Exception):
+    def __init__(self, status, message=None):
+        super().__init__(message or status.phrase)
+        self.status = status
+
+
+class BookingService:
+    def __init__(self, workers=8):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db")
+        self._federation = None
+
+    def federation(self):
+        # Opened on the first head-office request
+        if self._federation is None:
+            self._federation = Federation()
+        return self._federation
+
+    async def run_db(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    # ---- handlers; each returns (status, json-serialisable body) ----
+
+    async def get_doctors(self, request):
+        doctors = await self.run_db(Doctor.all_doctors)
+        return HTTPStatus.OK, [doctor._asdict() for doctor in doctors]
+
+    async def get_free_slots(self, request, doctor_id):
+        day = request["query"].get("day", [None])[0]
+        try:
+            slots = await self.run_db(Appointment.view_free_slots, doctor_id, day)
+        except ValueError as e:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Invalid day: {e}")
+        return HTTPStatus.OK, {"doctor_id": doctor_id, "free_slots": slots}
+
+    async def get_specializations(self, request):
+        return HTTPStatus.OK, await self.run_db(Harsha_Hospital.get_services)
+
+    async def get_earliest_slots(self, request):
+        query = {key: values[0] for key, values in request["query"].items()}
+        try:
+            specialization = query["specialization"]
+            limit = parse_limit(query, 5, 100)
+            after = datetime.strptime(query["after"], time_format) if "after" in query else None
+        except (ValueError, KeyError) as e:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Invalid search: {e}")
+        slots = await self.run_db(Appointment.earliest_slots, specialization, limit, after)
+        return HTTPStatus.OK, [dict(slot._asdict(), time_slot=format_slot(slot.time_slot)) for slot in slots]
+
+    async def post_appointment(self, request):
+        try:
+            data = json.loads(request["body"] or b"{}")
+            patient_name = str(data["patient_name"]).strip()
+            doctor_id = int(data["doctor_id"])
+            time_slot = datetime.strptime(data["time_slot"], time_format)
+        except (ValueError, KeyError, TypeError) as e:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Invalid booking request: {e}")
+        if not patient_name:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "patient_name is required")
+        result = await self.run_db(Appointment.book_appointment, patient_name, doctor_id, time_slot)
+        return BOOKING_STATUS[result], {"result": result.value, "doctor_id": doctor_id,
+                                        "time_slot": time_slot.strftime(time_format)}
+
+    async def post_cancel(self, request):
+        try:
+            data = json.loads(request["body"] or b"{}")
+            patient_name = str(data["patient_name"]).strip()
+            doctor_id = int(data["doctor_id"])
+            time_slot = datetime.strptime(data["time_slot"], time_format)
+        except (ValueError, KeyError, TypeError) as e:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Invalid cancellation: {e}")
+        result, waiter = await self.run_db(Appointment.cancel_appointment, doctor_id, time_slot, patient_name)
+        # The waiter's name is not sent back to the cancelling patient
+        return CANCEL_STATUS[result], {"result": result.value, "doctor_id": doctor_id,
+                                       "time_slot": time_slot.strftime(time_format)}
+
+    async def post_waitlist(self, request):
+        try:
+            data = json.loads(request["body"] or b"{}")
+            patient_name = str(data["patient_name"]).strip()
+            doctor_id = int(data["doctor_id"])
+            urgency = int(data.get("urgency", 0))
+        except (ValueError, KeyError, TypeError) as e:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Invalid waitlist request: {e}")
+        try:
+            entry = await self.run_db(Appointment.join_waitlist, patient_name, doctor_id, urgency)
+        except ValueError as e:
+            raise HttpError(HTTPStatus.BAD_REQUEST, str(e))
+        return HTTPStatus.CREATED, entry._asdict()
+
+    async def get_admin_waitlist(self, request):
+        self.check_admin(request)
+        try:
+            doctor_id = int(request["query"]["doctor_id"][0])
+        except (ValueError, KeyError) as e:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Invalid waitlist request: {e}")
+        entries = await self.run_db(Appointment.view_waitlist, doctor_id)
+        return HTTPStatus.OK, [entry._asdict() for entry in entries]
+
+    async def post_admin_offboard(self, request):
+        self.check_admin(request)
+        try:
+            data = json.loads(request["body"] or b"{}")
+            if not isinstance(data["doctor_ids"], list):
+                raise TypeError("doctor_ids must be a list")
+            doctor_ids = [int(doctor_id) for doctor_id in data["doctor_ids"]]
+        except (ValueError, KeyError, TypeError) as e:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Invalid offboarding request: {e}")
+        report = await self.run_db(Admin.offboard_doctors, doctor_ids)
+        return HTTPStatus.OK, {
+            "doctors": [doctor._asdict() for doctor in report.doctors],
+            "moved": [dict(move._asdict(), from_slot=format_slot(move.from_slot), to_slot=format_slot(move.to_slot))
+                      for move in report.moved],
+            "unplaced": [dict(row._asdict(), time_slot=format_slot(row.time_slot)) for row in report.unplaced],
+            "waiters_dropped": report.waiters_dropped,
+        }
+
+    async def get_admin_appointments(self, request):
+        # One page per call; pass the returned "next" values back as
+        # after_time / after_id to get the following page
+        self.check_admin(request)
+        query = {key: values[0] for key, values in request["query"].items()}
+        try:
+            limit = parse_limit(query, 100, 1000)
+            doctor_id = int(query["doctor_id"]) if "doctor_id" in query else None
+            after = (int(query["after_time"]), int(query["after_id"])) if "after_time" in query else None
+        except (ValueError, KeyError) as e:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Invalid listing request: {e}")
+        rows, after = await self.run_db(Admin.appointments_page, query.get("start"), query.get("end"),
+                                        doctor_id, query.get("specialization"), after, limit,
+                                        query.get("history") == "1")
+        return HTTPStatus.OK, {
+            "appointments": [dict(row._asdict(), time_slot=format_slot(row.time_slot)) for row in rows],
+            "next": {"after_time": after[0], "after_id": after[1]} if after else None,
+        }
+
+    async def get_admin_patients(self, request):
+        # Paged like /admin/appointments
+        self.check_admin(request)
+        query = {key: values[0] for key, values in request["query"].items()}
+        try:
+            limit = parse_limit(query, 50, 1000)
+            after = (int(query["after_time"]), int(query["after_id"])) if "after_time" in query else None
+            rows, after = await self.run_db(Admin.search_patients, query.get("q", ""), after, limit)
+        except (ValueError, KeyError) as e:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Invalid patient search: {e}")
+        return HTTPStatus.OK, {
+            "appointments": [dict(row._asdict(), time_slot=format_slot(row.time_slot)) for row in rows],
+            "next": {"after_time": after[0], "after_id": after[1]} if after else None,
+        }
+
+    async def get_admin_utilization(self, request):
+        self.check_admin(request)
+        day = request["query"].get("day", [None])[0]
+        try:
+            specializations = await self.run_db(Admin.utilization_by_specialization, day)
+            doctors = await self.run_db(Admin.utilization_by_doctor, day)
+        except ValueError as e:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Invalid day: {e}")
+        return HTTPStatus.OK, {
+            "specializations": [dict(row._asdict(), utilization=round(row.utilization, 3)) for row in specializations],
+            "doctors": [dict(row._asdict(), utilization=round(row.utilization, 3)) for row in doctors],
+        }
+
+    async def get_branches(self, request):
+        try:
+            return HTTPStatus.OK, [{"id": branch.id, "name": branch.name, "address": branch.address}
+                                   for branch in self.federation().branches]
+        except ValueError as e:
+            raise HttpError(HTTPStatus.SERVICE_UNAVAILABLE, str(e))
+
+    async def get_branch_doctors(self, request):
+        specialization = request["query"].get("specialization", [None])[0]
+        try:
+            doctors = await self.run_db(self.federation().doctors, specialization)
+        except ValueError as e:
+            raise HttpError(HTTPStatus.SERVICE_UNAVAILABLE, str(e))
+        return HTTPStatus.OK, [doctor._asdict() for doctor in doctors]
+
+    async def get_branch_earliest_slots(self, request):
+        query = {key: values[0] for key, values in request["query"].items()}
+        try:
+            specialization = query["specialization"]
+            limit = parse_limit(query, 5, 100)
+            after = datetime.strptime(query["after"], time_format) if "after" in query else None
+        except (ValueError, KeyError) as e:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Invalid search: {e}")
+        try:
+            slots = await self.run_db(self.federation().earliest_slots, specialization, limit, after)
+        except ValueError as e:
+            raise HttpError(HTTPStatus.SERVICE_UNAVAILABLE, str(e))
+        return HTTPStatus.OK, [dict(slot._asdict(), time_slot=format_slot(slot.time_slot)) for slot in slots]
+
+    async def get_admin_branch_appointments(self, request):
+        # Paged like /admin/appointments, with after_branch in the cursor
+        self.check_admin(request)
+        query = {key: values[0] for key, values in request["query"].items()}
+        try:
+            limit = parse_limit(query, 100, 1000)
+            after = ((int(query["after_time"]), query["after_branch"], int(query["after_id"]))
+                     if "after_time" in query else None)
+        except (ValueError, KeyError) as e:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Invalid listing request: {e}")
+        try:
+            rows, after = await self.run_db(self.federation().appointments_page, query.get("start"),
+                                            query.get("end"), query.get("specialization"), after, limit,
+                                            query.get("history") == "1")
+        except ValueError as e:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Invalid listing request: {e}")
+        return HTTPStatus.OK, {
+            "appointments": [dict(row._asdict(), time_slot=format_slot(row.time_slot)) for row in rows],
+            "next": {"after_time": after[0], "after_branch": after[1], "after_id": after[2]} if after else None,
+        }
+
+    async def get_admin_metrics(self, request):
+        self.check_admin(request)
+        return HTTPStatus.OK, metrics.snapshot()
+
+    def check_admin(self, request):
+        expected = base64.b64encode(f"{ADMIN_USERNAME}:{ADMIN_PASSWORD}".encode()).decode()
+        if request["headers"].get("authorization") != f"Basic {expected}":
+            raise HttpError(HTTPStatus.UNAUTHORIZED)
+
+    async def route(self, request):
+        parts = [part for part in request["path"].split("/") if part]
+        method = request["method"]
+        if parts == ["doctors"]:
+            handler = {"GET": self.get_doctors}
+        elif len(parts) == 3 and parts[0] == "doctors" and parts[2] == "free-slots" and parts[1].isdigit():
+            handler = {"GET": lambda request: self.get_free_slots(request, int(parts[1]))}
+        elif parts == ["specializations"]:
+            handler = {"GET": self.get_specializations}
+        elif parts == ["earliest-slots"]:
+            handler = {"GET": self.get_earliest_slots}
+        elif parts == ["appointments"]:
+            handler = {"POST": self.post_appointment}
+        elif parts == ["appointments", "cancel"]:
+            handler = {"POST": self.post_cancel}
+        elif parts == ["waitlist"]:
+            handler = {"POST": self.post_waitlist}
+        elif parts == ["admin", "waitlist"]:
+            handler = {"GET": self.get_admin_waitlist}
+        elif parts == ["admin", "doctors", "offboard"]:
+            handler = {"POST": self.post_admin_offboard}
+        elif parts == ["admin", "appointments"]:
+            handler = {"GET": self.get_admin_appointments}
+        elif parts == ["admin", "patients"]:
+            handler = {"GET": self.get_admin_patients}
+        elif parts == ["admin", "utilization"]:
+            handler = {"GET": self.get_admin_utilization}
+        elif parts == ["admin", "metrics"]:
+            handler = {"GET": self.get_admin_metrics}
+        elif parts == ["branches"]:
+            handler = {"GET": self.get_branches}
+        elif parts == ["branches", "doctors"]:
+            handler = {"GET": self.get_branch_doctors}
+        elif parts == ["branches", "earliest-slots"]:
+            handler = {"GET": self.get_branch_earliest_slots}
+        elif parts == ["admin", "branches", "appointments"]:
+            handler = {"GET": self.get_admin_branch_appointments}
+        else:
+            raise HttpError(HTTPStatus.NOT_FOUND)
+        if method not in handler:
+            raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED)
+        return await handler[method](request)
+
+    # ---- HTTP/1.1 plumbing ----
+
+    async def read_request(self, reader):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            return None
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST)
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0) or 0)
+        if length > MAX_BODY:
+            raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+        body = await reader.readexactly(length) if length else b""
+        url = urlsplit(target)
+        return {"method": method.upper(), "path": url.path, "query": parse_qs(url.query),
+                "headers": headers, "body": body}
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                keep_alive = True
+                request = None
+                try:
+                    request = await self.read_request(reader)
+                    if request is None:
+                        break
+                    keep_alive = request["headers"].get("connection", "").lower() != "close"
+                    status, body = await self.route(request)
+                except HttpError as e:
+                    status, body = e.status, {"error": str(e)}
+                    # A request rejected while reading it leaves the stream unusable
+                    keep_alive = keep_alive and request is not None
+                except sqlite3.Error as e:
+                    status, body = HTTPStatus.SERVICE_UNAVAILABLE, {"error": f"Database error: {e}"}
+                except (asyncio.LimitOverrunError, ValueError):
+                    status, body, keep_alive = HTTPStatus.BAD_REQUEST, {"error": "Malformed request"}, False
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    raise
+                except Exception:
+                    # A bug in a handler answers 500 instead of dropping the connection
+                    log.exception("error handling %s", request["path"] if request else "a request")
+                    status, body = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal server error"}
+                    keep_alive = keep_alive and request is not None
+                payload = json.dumps(body).encode()
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8080):
+        # Build the free-slot index before accepting the first client
+        await self.run_db(archive_past_days)
+        await self.run_db(availability_index.rebuild)
+        await self.run_db(patient_search.sync)
+        metrics.start_dump()
+        server = await asyncio.start_server(self.handle_client, host, port)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        if self._federation is not None:
+            self._federation.close()
+        metrics.stop_dump()
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Harsha Hospital booking service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=8, help="threads running database work")
+    parser.add_argument("--branch", default=branches.BRANCH_ID, help="branch to serve (default HARSHA_BRANCH)")
+    args = parser.parse_args()
+    if args.branch is not None:
+        try:
+            branches.use_branch(args.branch)
+        except ValueError as e:
+            parser.error(str(e))
+    service = BookingService(args.workers)
+    print(f"Serving on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
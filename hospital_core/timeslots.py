@@ -0,0 +1,49 @@
+from datetime import date, datetime, timedelta
+
+
+# Time slots are stored as whole minutes since 1970-01-01 00:00 of the
+# hospital's local wall-clock time (no time zone). Integers compare, sort and
+# index cheaply, and turning one into a day or a time of day is arithmetic
+# instead of string parsing.
+
+EPOCH = datetime(1970, 1, 1)
+MINUTES_PER_DAY = 24 * 60
+
+time_format = '%Y-%m-%d %H:%M'
+
+
+def to_minutes(value):
+    # Accepts epoch minutes, a datetime, a date (its midnight) or a
+    # "YYYY-MM-DD[ HH:MM[:SS]]" string
+    if isinstance(value, int):
+        return value
+    if isinstance(value, datetime):
+        return (value - EPOCH) // timedelta(minutes=1)
+    if isinstance(value, date):
+        return (value - EPOCH.date()).days * MINUTES_PER_DAY
+    if isinstance(value, str):
+        if len(value) == 10:
+            return to_minutes(date.fromisoformat(value))
+        try:
+            # Several times faster than strptime, which bulk imports notice
+            return to_minutes(datetime.fromisoformat(value[:16]))
+        except ValueError:
+            return to_minutes(datetime.strptime(value[:16], time_format))
+    raise TypeError(f"Not a time slot: {value!r}")
+
+
+def to_datetime(minutes):
+    return EPOCH + timedelta(minutes=minutes)
+
+
+def day_number(value):
+    # Days since 1970-01-01; a date, "YYYY-MM-DD" string or epoch minutes
+    return to_minutes(value) // MINUTES_PER_DAY
+
+
+def day_to_date(day):
+    return EPOCH.date() + timedelta(days=day)
+
+
+def format_slot(minutes):
+    return to_datetime(minutes).strftime(time_format)
@@ -0,0 +1,361 @@
+# Bulk import and export of doctors and appointments as CSV or JSON lines.
+#
+#   python -m hospital_core.transfer export doctors roster.csv
+#   python -m hospital_core.transfer export appointments history.jsonl --history --start 2024-01-01
+#   python -m hospital_core.transfer import doctors roster.csv --errors rejected.csv
+#   python -m hospital_core.transfer import appointments history.jsonl
+#
+# The format follows the file extension (.csv, or .jsonl / .ndjson). Files are
+# read and written one record at a time, so memory use does not grow with the
+# file. Imports commit every CHUNK_SIZE rows in one transaction. Each record
+# is validated on its own: a bad record is written to the error report with
+# its line number and skipped, and the rest of the file still goes in.
+#
+# Columns:
+#   doctors       id, name, specialization, gender, exp
+#                 (id may be left empty to get a new one; imported doctors
+#                  get the default working hours from today on; doctors
+#                  who left are not exported)
+#   appointments  doctor_id, time_slot ("YYYY-MM-DD HH:MM"), patient_name, booked
+#                 (booked defaults to whether a patient name is given;
+#                  exported files also have the id, which import ignores)
+#
+# Importing a booked appointment books the doctor's slot, whether or not it
+# is on the doctor's schedule, so past appointments can be brought in too.
+# Free ones need no row (free slots follow from the schedule) and are
+# skipped. A slot already booked for someone else is reported as an error,
+# so running the same import twice changes nothing.
+
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+import time
+from datetime import date
+
+from . import db
+from .availability import availability_index
+from .directory import doctor_directory
+from .schedules import DEFAULT_END, DEFAULT_SLOT_MINUTES, DEFAULT_START, EVERY_DAY
+from .timeslots import day_number, format_slot, to_minutes
+
+
+CHUNK_SIZE = 5000
+MAX_ERRORS_KEPT = 100   # errors kept in memory for the summary; all go to the report file
+
+DOCTOR_FIELDS = ["id", "name", "specialization", "gender", "exp"]
+APPOINTMENT_FIELDS = ["id", "doctor_id", "time_slot", "patient_name", "booked"]
+
+
+def file_format(path):
+    if path.endswith(".csv"):
+        return "csv"
+    if path.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    raise ValueError(f"Unknown file type (use .csv or .jsonl): {path}")
+
+
+def read_records(file, format):
+    # Yields (line number, record dict) one at a time
+    if format == "csv":
+        reader = csv.DictReader(file)
+        for record in reader:
+            yield reader.line_num, record
+    else:
+        for line, text in enumerate(file, 1):
+            if text.strip():
+                try:
+                    record = json.loads(text)
+                except ValueError as e:
+                    record = {"invalid JSON": str(e)}
+                yield line, record
+
+
+class RecordWriter:
+    def __init__(self, file, format, fields):
+        self.file = file
+        self.format = format
+        self.fields = fields
+        if format == "csv":
+            self.writer = csv.DictWriter(file, fields, extrasaction="ignore")
+            self.writer.writeheader()
+
+    def write(self, record):
+        if self.format == "csv":
+            self.writer.writerow(record)
+        else:
+            self.file.write(json.dumps(record) + "\n")
+
+
+class ImportReport:
+    # Counts of one import; rejected records go to the error file as they occur
+    def __init__(self, error_writer=None):
+        self.imported = 0
+        self.failed = 0
+        self.chunks = 0
+        self.errors = []
+        self.error_writer = error_writer
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def add_error(self, line, message, record):
+        self.failed += 1
+        if len(self.errors) < MAX_ERRORS_KEPT:
+            self.errors.append((line, message))
+        if self.error_writer is not None:
+            self.error_writer.write({"line": line, "error": message, "record": json.dumps(record)})
+
+    def __str__(self):
+        return (f"{self.imported} imported, {self.failed} rejected, {self.chunks} transactions, "
+                f"{self.elapsed:.2f}s")
+
+
+# ---- validation: record dict -> row tuple, ValueError with the reason ----
+
+def _text(record, field, required=False):
+    value = record.get(field)
+    value = "" if value is None else str(value).strip()
+    if required and not value:
+        raise ValueError(f"{field} is required")
+    return value or None
+
+
+def _integer(record, field, required=False):
+    value = _text(record, field, required)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{field} is not a whole number: {value!r}")
+
+
+def _flag(record, field):
+    value = record.get(field)
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ("1", "true", "yes", "y"):
+        return True
+    if text in ("0", "false", "no", "n"):
+        return False
+    raise ValueError(f"{field} is not a yes/no value: {value!r}")
+
+
+def doctor_row(record):
+    exp = _integer(record, "exp")
+    if exp is not None and exp < 0:
+        raise ValueError("exp must not be negative")
+    return (_integer(record, "id"), _text(record, "name", True), _text(record, "specialization", True),
+            _text(record, "gender"), exp)
+
+
+def appointment_row(record):
+    doctor_id = _integer(record, "doctor_id", True)
+    time_slot = _text(record, "time_slot", True)
+    try:
+        time_slot = int(time_slot) if time_slot.isdigit() else to_minutes(time_slot)
+    except ValueError:
+        raise ValueError(f"time_slot is not a date and time: {time_slot!r}")
+    patient_name = _text(record, "patient_name")
+    booked = _flag(record, "booked")
+    if booked is None:
+        booked = patient_name is not None
+    if booked and patient_name is None:
+        raise ValueError("a booked appointment needs a patient_name")
+    return doctor_id, time_slot, patient_name if booked else None, int(booked)
+
+
+# ---- import ----
+
+def _import(path, convert, store, chunk_size, errors_path):
+    format = file_format(path)
+    error_file = open(errors_path, "w", newline="") if errors_path else None
+    try:
+        error_writer = None
+        if error_file is not None:
+            error_writer = RecordWriter(error_file, file_format(errors_path), ["line", "error", "record"])
+        report = ImportReport(error_writer)
+        with open(path, newline="") as file:
+            chunk = []
+            for line, record in read_records(file, format):
+                try:
+                    chunk.append((line, record, convert(record)))
+                except ValueError as e:
+                    report.add_error(line, str(e), record)
+                    continue
+                if len(chunk) >= chunk_size:
+                    _store_chunk(chunk, store, report)
+                    chunk = []
+            if chunk:
+                _store_chunk(chunk, store, report)
+    finally:
+        if error_file is not None:
+            error_file.close()
+    report.elapsed = time.perf_counter() - report.started
+    return report
+
+
+def _store_chunk(chunk, store, report):
+    # One transaction per chunk, and a savepoint per record: a record that
+    # fails is undone as a whole, its journal entries included, and is
+    # reported while the chunk carries on.
+    with db.transaction() as connection:
+        for line, record, row in chunk:
+            try:
+                with db.transaction():
+                    store(connection, row)
+            except (sqlite3.IntegrityError, ValueError) as e:
+                report.add_error(line, str(e), record)
+            else:
+                report.imported += 1
+    report.chunks += 1
+
+
+def import_doctors(path, chunk_size=CHUNK_SIZE, errors_path=None):
+    # Adds every valid doctor with the default working hours from today,
+    # like Admin.add_doctor does for one doctor
+    today = day_number(date.today())
+
+    def store(connection, row):
+        doctor_id, name, specialization, gender, exp = row
+        if connection.execute("SELECT 1 FROM doctor WHERE name = ?", (name,)).fetchone():
+            raise ValueError(f"a doctor named {name!r} already exists")
+        doctor_id = connection.execute("INSERT INTO doctor (id, name, specialization, gender, exp) VALUES (?, ?, ?, ?, ?)",
+                                       row).lastrowid
+        # Journaled like Admin.add_doctor
+        db.record("add_doctor", id=doctor_id, name=name, specialization=specialization, gender=gender, exp=exp)
+        rule_id = connection.execute('''INSERT INTO schedule_rule (doctor_id, weekdays, start_minute, end_minute,
+                                                                   slot_minutes, valid_from) VALUES (?, ?, ?, ?, ?, ?)''',
+                                     (doctor_id, EVERY_DAY, DEFAULT_START, DEFAULT_END, DEFAULT_SLOT_MINUTES,
+                                      today)).lastrowid
+        db.record("add_hours", id=rule_id, doctor_id=doctor_id, weekdays=EVERY_DAY, start_minute=DEFAULT_START,
+                  end_minute=DEFAULT_END, slot_minutes=DEFAULT_SLOT_MINUTES, valid_from=today, valid_until=None)
+
+    try:
+        return _import(path, doctor_row, store, chunk_size, errors_path)
+    finally:
+        doctor_directory.invalidate()
+        availability_index.reset()
+
+
+def import_appointments(path, chunk_size=CHUNK_SIZE, errors_path=None):
+    known_doctors = set()   # bounded by the number of doctors, not the file
+
+    def store(connection, row):
+        doctor_id, time_slot, patient_name, booked = row
+        if doctor_id not in known_doctors:
+            if not connection.execute("SELECT 1 FROM doctor WHERE id = ?", (doctor_id,)).fetchone():
+                raise ValueError(f"no doctor with id {doctor_id}")
+            known_doctors.add(doctor_id)
+        if not booked:
+            return
+        cursor = connection.execute('''INSERT INTO appointment (doctor_id, time_slot, patient_name, isBooked)
+                                       VALUES (?, ?, ?, ?)
+                                       ON CONFLICT (doctor_id, time_slot) DO UPDATE
+                                       SET patient_name = excluded.patient_name, isBooked = excluded.isBooked
+                                       WHERE appointment.isBooked = 0
+                                          OR appointment.patient_name IS excluded.patient_name''', row)
+        if cursor.rowcount == 0:
+            raise ValueError(f"{format_slot(time_slot)} of doctor {doctor_id} is already booked for someone else")
+        db.record("book", doctor_id=doctor_id, time_slot=time_slot, patient_name=patient_name)
+
+    try:
+        return _import(path, appointment_row, store, chunk_size, errors_path)
+    finally:
+        # Cheaper to rebuild once on next use than to patch it row by row
+        availability_index.reset()
+
+
+# ---- export ----
+
+def _export(path, fields, query, params, to_record):
+    count = 0
+    with open(path, "w", newline="") as file:
+        writer = RecordWriter(file, file_format(path), fields)
+        cursor = db.get_cursor()
+        cursor.execute(query, params)
+        # The cursor steps through the result as it is written out
+        for row in cursor:
+            writer.write(to_record(row))
+            count += 1
+    return count
+
+
+def export_doctors(path):
+    # The doctors on staff; those who left (see offboarding.py) are not
+    # exported, so importing the file cannot bring them back
+    return _export(path, DOCTOR_FIELDS,
+                   "SELECT id, name, specialization, gender, exp FROM doctor WHERE left_on IS NULL ORDER BY id", (),
+                   lambda row: dict(zip(DOCTOR_FIELDS, row)))
+
+
+def export_appointments(path, start=None, end=None, booked_only=False, history=False):
+    # start and end are anything timeslots.to_minutes accepts; history adds
+    # the archived past days (see archive.py)
+    conditions = []
+    params = []
+    if booked_only:
+        conditions.append("isBooked != 0")
+    if start is not None:
+        conditions.append("time_slot >= ?")
+        params.append(to_minutes(start))
+    if end is not None:
+        conditions.append("time_slot < ?")
+        params.append(to_minutes(end))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    source = "appointment"
+    if history:
+        source = '''(SELECT id, doctor_id, time_slot, patient_name, isBooked FROM appointment
+                     UNION ALL
+                     SELECT id, doctor_id, time_slot, patient_name, isBooked FROM appointment_archive)'''
+    return _export(path, APPOINTMENT_FIELDS,
+                   f"SELECT id, doctor_id, time_slot, patient_name, isBooked FROM {source} {where} ORDER BY time_slot, id",
+                   params,
+                   lambda row: {"id": row[0], "doctor_id": row[1], "time_slot": format_slot(row[2]),
+                                "patient_name": row[3], "booked": int(bool(row[4]))})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import and export of doctors and appointments")
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("table", choices=["doctors", "appointments"])
+    parser.add_argument("path", help="a .csv or .jsonl file")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows per transaction on import")
+    parser.add_argument("--errors", help="write rejected records to this .csv or .jsonl file")
+    parser.add_argument("--start", help="export appointments from this date or time")
+    parser.add_argument("--end", help="export appointments before this date or time")
+    parser.add_argument("--booked-only", action="store_true", help="export only booked appointments")
+    parser.add_argument("--history", action="store_true", help="also export archived past days")
+    args = parser.parse_args()
+    try:
+        if args.action == "export":
+            begin = time.perf_counter()
+            if args.table == "doctors":
+                count = export_doctors(args.path)
+            else:
+                count = export_appointments(args.path, args.start, args.end, args.booked_only, args.history)
+            print(f"{count} {args.table} exported to {args.path} in {time.perf_counter() - begin:.2f}s")
+            return 0
+        if args.table == "doctors":
+            report = import_doctors(args.path, args.chunk_size, args.errors)
+        else:
+            report = import_appointments(args.path, args.chunk_size, args.errors)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"{args.action} failed: {e}", file=sys.stderr)
+        return 2
+    finally:
+        db.close()
+    print(report)
+    for line, message in report.errors[:10]:
+        print(f"  line {line}: {message}")
+    if report.failed > len(report.errors[:10]):
+        print(f"  ... {report.failed - len(report.errors[:10])} more" + (f", see {args.errors}" if args.errors else ""))
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+from datetime import date
+
+from . import db
+from .availability import availability_index
+from .directory import doctor_directory
+from .records import DoctorUsageRecord, SpecializationUsageRecord
+from .timeslots import day_number
+
+
+# How full each doctor and each specialization is on a day.
+#
+# Booked counts come from doctor_day_usage and specialization_day_usage,
+# which triggers on appointment keep current on every booking, cancellation
+# and reassignment (see schema migration 9), so a report reads one row per
+# doctor or specialization and never touches appointment. Capacity is the
+# number of slots the schedules give that day, counted from the
+# availability index's day masks, which are cached per weekday.
+
+def _day(day):
+    # A date, "YYYY-MM-DD" or day number; default today
+    if day is None:
+        return day_number(date.today())
+    return day if isinstance(day, int) else day_number(day)
+
+
+def _capacity(doctor_id, day):
+    return availability_index.schedule(doctor_id).day_mask(day).bit_count()
+
+
+def by_doctor(day=None):
+    # DoctorUsageRecord of every doctor for the day (default today), in id order
+    day = _day(day)
+    booked = dict(db.get_connection().execute(
+        "SELECT doctor_id, booked FROM doctor_day_usage WHERE day = ?", (day,)))
+    return [DoctorUsageRecord(day, doctor.id, doctor.name, doctor.specialization,
+                              booked.get(doctor.id, 0), _capacity(doctor.id, day))
+            for doctor in doctor_directory.all()]
+
+
+def by_specialization(day=None):
+    # SpecializationUsageRecord of every specialization for the day, in name order
+    day = _day(day)
+    booked = dict(db.get_connection().execute(
+        "SELECT specialization, booked FROM specialization_day_usage WHERE day = ?", (day,)))
+    records = []
+    for specialization in doctor_directory.specializations():
+        doctors = doctor_directory.by_specialization(specialization)
+        records.append(SpecializationUsageRecord(day, specialization, len(doctors), booked.get(specialization, 0),
+                                                 sum(_capacity(doctor.id, day) for doctor in doctors)))
+    return records
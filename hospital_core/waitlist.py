@@ -0,0 +1,132 @@
+import heapq
+import threading
+import time
+
+from . import db
+from .metrics import metrics
+from .records import WaitlistRecord
+
+
+# Patients waiting for a slot with a doctor who has none free.
+#
+# The waitlist table is the authority. In memory every doctor has a heap of
+# (-urgency, requested_at, id) keys, so the next waiter is the most urgent
+# one and, among equally urgent ones, the one who asked first. Taking the
+# next waiter is a heappop plus one DELETE by primary key, O(log n) in the
+# doctor's waitlist, which is what lets a cancellation hand its slot on
+# inside its own transaction (see Appointment.cancel_appointment). Waiters
+# who leave the list are removed from the table at once and skipped when
+# they come up in the heap.
+#
+# Like the availability index it is loaded on first use and dropped by the
+# database reset hooks, so a rolled back cancellation cannot leave a waiter
+# popped from memory but still in the table.
+
+class Waitlist:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._heaps = None      # {doctor_id: [(-urgency, requested_at, id, WaitlistRecord)]}
+        self._removed = set()   # ids left in a heap after leaving the list
+        self._waiting = 0
+        self.filled = 0
+        self.waited = 0.0       # seconds the filled waiters had waited, in total
+
+    def _load(self):
+        heaps = {}
+        with metrics.operation("waitlist.load"):
+            for row in db.get_connection().execute(
+                    "SELECT id, doctor_id, patient_name, urgency, requested_at FROM waitlist"):
+                entry = WaitlistRecord._make(row)
+                heaps.setdefault(entry.doctor_id, []).append((-entry.urgency, entry.requested_at, entry.id, entry))
+        for heap in heaps.values():
+            heapq.heapify(heap)
+        return heaps
+
+    def _get(self):
+        heaps = self._heaps
+        if heaps is None:
+            with self._lock:
+                if self._heaps is None:
+                    self._heaps = self._load()
+                    self._removed = set()
+                    self._waiting = sum(len(heap) for heap in self._heaps.values())
+                    self._report()
+                heaps = self._heaps
+        return heaps
+
+    def reset(self):
+        with self._lock:
+            self._heaps = None
+
+    def _report(self):
+        metrics.set_gauge("waitlist.waiting", self._waiting)
+        metrics.set_gauge("waitlist.filled", self.filled)
+        metrics.set_gauge("waitlist.mean_wait_s", round(self.waited / self.filled, 1) if self.filled else 0.0)
+
+    def join(self, doctor_id, patient_name, urgency=0):
+        # Adds a waiter and returns their WaitlistRecord
+        heaps = self._get()
+        cursor = db.get_cursor()
+        requested_at = time.time()
+        cursor.execute("INSERT INTO waitlist (doctor_id, patient_name, urgency, requested_at) VALUES (?, ?, ?, ?)",
+                       (doctor_id, patient_name, urgency, requested_at))
+        entry = WaitlistRecord(cursor.lastrowid, doctor_id, patient_name, urgency, requested_at)
+        with self._lock:
+            heapq.heappush(heaps.setdefault(doctor_id, []), (-urgency, requested_at, entry.id, entry))
+            self._waiting += 1
+            self._report()
+        return entry
+
+    def leave(self, entry_id):
+        # Takes a waiter off the list; False when they were not on it
+        heaps = self._get()
+        if db.get_cursor().execute("DELETE FROM waitlist WHERE id = ?", (entry_id,)).rowcount == 0:
+            return False
+        with self._lock:
+            if heaps is self._heaps:
+                self._removed.add(entry_id)
+                self._waiting -= 1
+                self._report()
+        return True
+
+    def pop(self, doctor_id):
+        # Removes and returns the doctor's next waiter, or None. Call it
+        # inside the transaction that gives the waiter their slot.
+        heaps = self._get()
+        heap = heaps.get(doctor_id)
+        connection = db.get_connection()
+        while heap:
+            with self._lock:
+                if not heap:
+                    break
+                entry = heapq.heappop(heap)[3]
+                if entry.id in self._removed:
+                    self._removed.discard(entry.id)
+                    continue
+                self._waiting -= 1
+            # Another process may have taken them off the list already
+            if connection.execute("DELETE FROM waitlist WHERE id = ?", (entry.id,)).rowcount:
+                with self._lock:
+                    self.filled += 1
+                    self.waited += max(0.0, time.time() - entry.requested_at)
+                    self._report()
+                return entry
+        return None
+
+    def waiting(self, doctor_id):
+        # The doctor's waiters, next one first
+        heap = self._get().get(doctor_id, [])
+        with self._lock:
+            return [item[3] for item in sorted(heap) if item[2] not in self._removed]
+
+    def length(self, doctor_id=None):
+        if doctor_id is None:
+            self._get()
+            return self._waiting
+        return len(self.waiting(doctor_id))
+
+
+waitlist = Waitlist()
+
+# A rolled back transaction may have popped waiters it did not delete
+db.add_reset_hook(waitlist.reset)
@@ -0,0 +1,76 @@
+import logging
+import queue
+import threading
+
+from . import db
+
+
+log = logging.getLogger(__name__)
+
+
+class BackgroundWorker:
+    # Runs database calls on one background thread so a GUI never waits on
+    # SQLite. Calls run one at a time in the order they were submitted.
+    # Results are not handed to the callbacks from the worker thread: they
+    # wait in a queue until the GUI thread calls process_results() (the Tk
+    # front end does this from a root.after timer), so callbacks can safely
+    # touch widgets. A callback that raises is logged and the rest still run.
+    def __init__(self, name="db-worker"):
+        self.name = name
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._thread = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, function, *args, on_done=None, on_error=None):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+        with self._lock:
+            self._pending += 1
+        self._requests.put((function, args, on_done, on_error))
+
+    def pending(self):
+        # Calls submitted whose callbacks have not run yet
+        return self._pending
+
+    def _run(self):
+        try:
+            while True:
+                request = self._requests.get()
+                if request is None:
+                    return
+                function, args, on_done, on_error = request
+                try:
+                    result = function(*args)
+                except Exception as e:
+                    self._results.put((on_error, e, True))
+                else:
+                    self._results.put((on_done, result, False))
+        finally:
+            db.get_pool().release()
+
+    def process_results(self):
+        # Runs the callbacks of finished calls; call from the GUI thread
+        while True:
+            try:
+                callback, value, failed = self._results.get_nowait()
+            except queue.Empty:
+                return
+            with self._lock:
+                self._pending -= 1
+            if callback is None:
+                if failed:
+                    log.error("%s: call failed", self.name, exc_info=value)
+                continue
+            try:
+                callback(value)
+            except Exception:
+                log.exception("%s: callback failed", self.name)
+
+    def stop(self):
+        if self._thread is not None:
+            self._requests.put(None)
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,147 @@
+from tkinter import *
+
+
+class VirtualList(Frame):
+    # Read-only list of appointment rows that only ever draws the rows in
+    # view. Rows are fetched page by page through fetch(after, on_done,
+    # on_error), where after is the keyset cursor of the last row already
+    # loaded (None for the first page), on_done receives (rows, next_cursor)
+    # and on_error is called without arguments if the fetch failed. The next page is
+    # asked for as the user scrolls close to the end of what is loaded, and
+    # each row is formatted with format_row only when it is drawn.
+    def __init__(self, master, fetch, format_row, header_lines, height=10, width=80,
+                 font=("Times New Roman", 12), refresh_ms=10000, **kwargs):
+        super().__init__(master, **kwargs)
+        self.fetch = fetch
+        self.format_row = format_row
+        self.visible = height
+        self.refresh_ms = refresh_ms
+        self.rows = []
+        self.top = 0
+        self.has_more = False
+        self.loading = False
+        self.generation = 0     # bumped on reset so stale answers are dropped
+        self.active = False
+
+        bg = kwargs.get("bg", "#F0F8FF")
+        self.header = Text(self, height=len(header_lines), width=width, font=font, bg=bg, bd=0)
+        self.header.insert(END, "\n".join(header_lines))
+        self.header.config(state=DISABLED)
+        self.header.pack(fill=X)
+        self.scrollbar = Scrollbar(self, orient=VERTICAL, command=self.on_scrollbar)
+        self.scrollbar.pack(side=RIGHT, fill=Y)
+        self.text = Text(self, height=height, width=width, font=font, wrap=NONE, state=DISABLED)
+        self.text.pack(fill=BOTH, expand=True)
+        self.text.bind("<MouseWheel>", self.on_mousewheel)
+        self.text.bind("<Button-4>", lambda event: self.scroll_by(-3))
+        self.text.bind("<Button-5>", lambda event: self.scroll_by(3))
+        self.text.bind("<Configure>", self.on_resize)
+
+    # ---- loading ----
+
+    def reset(self, fetch=None):
+        # Drops everything loaded and starts again from the first page
+        if fetch is not None:
+            self.fetch = fetch
+        self.generation += 1
+        self.rows = []
+        self.top = 0
+        self.has_more = True
+        self.loading = False
+        self.render()
+        self.load_more()
+        if not self.active:
+            self.active = True
+            self.after(self.refresh_ms, self.auto_refresh)
+
+    def clear(self):
+        self.generation += 1
+        self.active = False
+        self.rows = []
+        self.top = 0
+        self.has_more = False
+        self.loading = False
+        self.render()
+
+    def load_more(self):
+        if self.loading or not self.has_more:
+            return
+        after = self.rows[-1].cursor if self.rows else None
+        self.request(after, len(self.rows))
+
+    def refresh(self):
+        # Picks up bookings made since the rows were loaded. Rows above the
+        # view cannot have moved into it, so they are kept; everything from
+        # the first visible row on is fetched again, one page only.
+        if self.loading or not self.active:
+            return
+        keep = self.top
+        self.request(self.rows[keep - 1].cursor if keep else None, keep)
+
+    def request(self, after, keep):
+        self.loading = True
+        generation = self.generation
+
+        def loaded(page):
+            if generation != self.generation or not self.winfo_exists():
+                return
+            rows, cursor = page
+            self.loading = False
+            self.rows = self.rows[:keep] + rows
+            self.has_more = cursor is not None
+            self.render()
+
+        def failed():
+            if generation == self.generation:
+                self.loading = False
+
+        self.fetch(after, loaded, failed)
+
+    def auto_refresh(self):
+        if not self.active or not self.winfo_exists():
+            return
+        if self.winfo_ismapped():
+            self.refresh()
+        self.after(self.refresh_ms, self.auto_refresh)
+
+    # ---- scrolling and drawing ----
+
+    def scroll_to(self, top):
+        self.top = max(0, min(top, len(self.rows) - self.visible))
+        # Ask for the next page while a screenful is still left to show
+        if self.top + 2 * self.visible >= len(self.rows):
+            self.load_more()
+        self.render()
+
+    def scroll_by(self, lines):
+        self.scroll_to(self.top + lines)
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * self.total()))
+        elif action == "scroll":
+            step = self.visible if unit == "pages" else 1
+            self.scroll_by(int(amount) * step)
+
+    def on_mousewheel(self, event):
+        self.scroll_by(-3 if event.delta > 0 else 3)
+
+    def on_resize(self, event):
+        line_height = max(1, int(self.text.tk.call("font", "metrics", self.text.cget("font"), "-linespace")))
+        visible = max(1, event.height // line_height)
+        if visible != self.visible:
+            self.visible = visible
+            self.scroll_to(self.top)
+
+    def total(self):
+        # Unknown until the last page is in; one extra screen hints at more
+        return len(self.rows) + (self.visible if self.has_more else 0)
+
+    def render(self):
+        window = self.rows[self.top:self.top + self.visible]
+        self.text.config(state=NORMAL)
+        self.text.delete(1.0, END)
+        self.text.insert(END, "\n".join(self.format_row(row) for row in window))
+        self.text.config(state=DISABLED)
+        total = max(1, self.total())
+        self.scrollbar.set(self.top / total, min(1.0, (self.top + self.visible) / total))